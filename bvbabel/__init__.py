@@ -17,6 +17,11 @@ import bvbabel.sdm
 import bvbabel.mtc
 import bvbabel.poi
 import bvbabel.prt
+import bvbabel.nifti
+
+from bvbabel.utils import BufferPool
+from bvbabel.batch import read_many
+from bvbabel.patch import patch_header
 
 import pkg_resources
 __version__ = pkg_resources.require("bvbabel")[0].version
@@ -0,0 +1,154 @@
+"""Read many BrainVoyager files concurrently."""
+
+import os
+import inspect
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import bvbabel.vmr
+import bvbabel.v16
+import bvbabel.vmp
+import bvbabel.vtc
+import bvbabel.gtc
+import bvbabel.smp
+import bvbabel.srf
+import bvbabel.voi
+import bvbabel.ssm
+import bvbabel.fmr
+import bvbabel.msk
+import bvbabel.sdm
+import bvbabel.mtc
+import bvbabel.poi
+import bvbabel.prt
+import bvbabel.nifti
+
+
+# Readers returning (header, data), by file extension
+_READERS = {
+    "vmr": bvbabel.vmr.read_vmr,
+    "v16": bvbabel.v16.read_v16,
+    "vmp": bvbabel.vmp.read_vmp,
+    "vtc": bvbabel.vtc.read_vtc,
+    "gtc": bvbabel.gtc.read_gtc,
+    "smp": bvbabel.smp.read_smp,
+    "srf": bvbabel.srf.read_srf,
+    "voi": bvbabel.voi.read_voi,
+    "ssm": bvbabel.ssm.read_ssm,
+    "fmr": bvbabel.fmr.read_fmr,
+    "msk": bvbabel.msk.read_msk,
+    "sdm": bvbabel.sdm.read_sdm,
+    "mtc": bvbabel.mtc.read_mtc,
+    "poi": bvbabel.poi.read_poi,
+    "prt": bvbabel.prt.read_prt,
+    "nii": bvbabel.nifti.read_nifti,
+    }
+
+
+# =============================================================================
+def get_file_kind(filename):
+    """File format of a path from its extension.
+
+    Parameters
+    ----------
+    filename : string
+        Path to file. A trailing '.gz' is ignored.
+
+    Returns
+    -------
+    kind : string
+        Lower case extension without the dot, e.g. 'vmr'.
+
+    """
+    name = os.fspath(filename).lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    kind = os.path.splitext(name)[1][1:]
+    if kind not in _READERS:
+        raise ValueError("Unknown BrainVoyager file format of '{}'."
+                         .format(filename))
+    return kind
+
+
+# =============================================================================
+def read_many(paths, workers=4, kind=None, ordered=True, **kwargs):
+    """Read many files with a pool of reader threads.
+
+    Parameters
+    ----------
+    paths : iterable
+        Paths to files ('.gz' files are decompressed on the fly). Open file
+        objects and file contents are accepted when `kind` is given.
+    workers : int
+        Number of reader threads. File reads and decompression release the
+        GIL, so reads of different files overlap.
+    kind : string, optional
+        File format (e.g. 'vmr') used for all paths. By default the reader
+        is chosen from the extension of each path.
+    ordered : bool
+        When 'True', files are yielded in the order of `paths`. Otherwise
+        they are yielded as soon as they are read.
+    **kwargs
+        Passed on to the readers that accept them, e.g. `maps` for SMP and
+        VMP files or `out=bvbabel.BufferPool()` to recycle the data buffers
+        of volume files. Other readers are called without them.
+
+    Yields
+    ------
+    path : string
+        Item of `paths`.
+    header : dictionary
+        Header of the file.
+    data : numpy.array
+        Data of the file.
+
+    Notes
+    -----
+    At most twice `workers` files are read ahead of the consumer, so that
+    a large cohort is not loaded into memory at once.
+
+    """
+    if kind is not None and kind not in _READERS:
+        raise ValueError("Unknown BrainVoyager file format '{}'."
+                         .format(kind))
+    reader_kwargs = _get_reader_kwargs(kwargs, [kind] if kind else _READERS)
+    paths = iter(paths)
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            while True:
+                # Keep the readers busy without reading too far ahead
+                for path in paths:
+                    path_kind = kind or get_file_kind(path)
+                    future = executor.submit(_READERS[path_kind], path,
+                                             **reader_kwargs[path_kind])
+                    future.path = path
+                    pending.append(future)
+                    if len(pending) >= 2 * workers:
+                        break
+                if not pending:
+                    break
+
+                if ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = next(f for f in pending if f in done)
+                    pending.remove(future)
+                header, data = future.result()
+                yield future.path, header, data
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _get_reader_kwargs(kwargs, kinds):
+    """Keyword arguments accepted by the reader of each file format."""
+    reader_kwargs = dict()
+    for kind in kinds:
+        params = inspect.signature(_READERS[kind]).parameters
+        reader_kwargs[kind] = {key: value for key, value in kwargs.items()
+                               if key in params}
+    unknown = set(kwargs).difference(*reader_kwargs.values())
+    if unknown:
+        raise TypeError("No reader accepts the arguments {}."
+                        .format(sorted(unknown)))
+    return reader_kwargs
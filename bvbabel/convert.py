@@ -0,0 +1,289 @@
+"""Convert directory trees of BrainVoyager files (bvbabel-convert)."""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import bvbabel.vmr
+import bvbabel.v16
+import bvbabel.vmp
+import bvbabel.vtc
+import bvbabel.gtc
+import bvbabel.srf
+import bvbabel.fmr
+import bvbabel.msk
+import bvbabel.obj
+import bvbabel.nifti
+from bvbabel.batch import get_file_kind
+from bvbabel.utils import can_memmap
+
+MANIFEST_NAME = ".bvbabel-convert.json"
+
+
+# =============================================================================
+# Converters, (input path, output path)
+# =============================================================================
+def _volume_to_nifti(read):
+    """NIfTI export with an identity affine, as in the examples."""
+    def convert(in_path, out_path):
+        _, data = read(in_path)
+        nii_header = bvbabel.nifti.create_nifti_header(
+            data.shape, data.dtype, affine=np.eye(4))
+        bvbabel.nifti.write_nifti(out_path, nii_header, data)
+    return convert
+
+
+def _vtc_to_nifti(in_path, out_path):
+    """Streaming VTC export, or in memory for compressed input."""
+    if can_memmap(in_path):
+        bvbabel.vtc.export_nifti(in_path, out_path)
+    else:
+        header, data = bvbabel.vtc.read_vtc(in_path)
+        bvbabel.nifti.write_nifti(
+            out_path, bvbabel.vtc.get_nifti_header(header), data)
+
+
+def _srf_to_obj(in_path, out_path):
+    """Wavefront OBJ export of the SRF mesh."""
+    _, mesh_data = bvbabel.srf.read_srf(in_path)
+    bvbabel.obj.write_obj(out_path, mesh_data["vertices"],
+                          mesh_data["vertex normals"], mesh_data["faces"])
+
+
+# Output extension and converter, by input file format
+CONVERTERS = {
+    "vmr": (".nii.gz", _volume_to_nifti(bvbabel.vmr.read_vmr)),
+    "v16": (".nii.gz", _volume_to_nifti(bvbabel.v16.read_v16)),
+    "vmp": (".nii.gz", _volume_to_nifti(bvbabel.vmp.read_vmp)),
+    "gtc": (".nii.gz", _volume_to_nifti(bvbabel.gtc.read_gtc)),
+    "fmr": (".nii.gz", _volume_to_nifti(bvbabel.fmr.read_fmr)),
+    "msk": (".nii.gz", _volume_to_nifti(bvbabel.msk.read_msk)),
+    "vtc": (".nii.gz", _vtc_to_nifti),
+    "srf": (".obj", _srf_to_obj),
+    }
+
+
+# =============================================================================
+def get_file_hash(filename, chunk_size=2**20):
+    """SHA-256 of the file content, read in chunks."""
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _get_kind(filename):
+    """Input format of a path, or None when it is not converted."""
+    try:
+        kind = get_file_kind(filename)
+    except ValueError:
+        return None
+    return kind if kind in CONVERTERS else None
+
+
+def _get_output_path(rel_path, kind, out_dir):
+    """Output path, e.g. 'sub-01/anat_vmr.nii.gz' for 'sub-01/anat.vmr.gz'."""
+    stem = os.path.basename(rel_path)
+    if stem.lower().endswith(".gz"):
+        stem = stem[:-3]
+    stem = os.path.splitext(stem)[0]  # Only the format extension
+    name = "{}_{}{}".format(stem, kind, CONVERTERS[kind][0])
+    return os.path.join(out_dir, os.path.dirname(rel_path), name)
+
+
+def _convert_file(in_path, out_path, kind, entry):
+    """Convert one file unless its content is unchanged (worker process).
+
+    Returns the manifest entry of the input and whether it was converted.
+
+    """
+    stat = os.stat(in_path)
+    file_hash = get_file_hash(in_path)
+    if (entry is not None and entry["hash"] == file_hash
+            and os.path.exists(out_path)):
+        converted = False  # Only touched, e.g. copied with a new mtime
+    else:
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        CONVERTERS[kind][1](in_path, out_path)
+        converted = True
+    entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns,
+             "hash": file_hash, "output": out_path}
+    return entry, converted
+
+
+def load_manifest(filename):
+    """Manifest of converted inputs, empty when there is none yet."""
+    if not os.path.exists(filename):
+        return dict()
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def save_manifest(filename, manifest):
+    """Write manifest atomically, so that interrupted runs keep the old one."""
+    tmp_name = filename + ".tmp"
+    with open(tmp_name, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_name, filename)
+
+
+# =============================================================================
+def convert_tree(in_dir, out_dir=None, kinds=None, workers=None, force=False,
+                 manifest_path=None, verbose=False):
+    """Convert all BrainVoyager files of a directory tree in parallel.
+
+    Parameters
+    ----------
+    in_dir : string
+        Input directory, searched recursively.
+    out_dir : string, optional
+        Output directory, mirroring the input tree. By default outputs are
+        written next to the inputs.
+    kinds : list of strings, optional
+        Input formats to convert (see `CONVERTERS`). By default all.
+    workers : int, optional
+        Number of worker processes. By default the number of CPUs.
+    force : bool
+        When 'True', all inputs are converted even if they are unchanged.
+    manifest_path : string, optional
+        Manifest of the converted inputs. By default `MANIFEST_NAME` in the
+        output directory.
+    verbose : bool
+        When 'True', each converted file is printed.
+
+    Returns
+    -------
+    counts : dictionary
+        Number of "converted", "skipped" and "failed" inputs.
+
+    Notes
+    -----
+    The manifest records size, modification time and SHA-256 of each input.
+    Inputs whose size and modification time match the manifest (and whose
+    output exists) are skipped without reading them. When only the
+    modification time changed, the input is hashed and skipped if its
+    content is unchanged.
+
+    Inputs whose output path is already taken by another input (e.g.
+    'x.vmr' and 'x.vmr.gz') are reported and counted as failed. Manifest
+    entries of inputs that no longer exist are removed.
+
+    """
+    if out_dir is None:
+        out_dir = in_dir
+    if manifest_path is None:
+        manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    kinds = list(CONVERTERS) if kinds is None else kinds
+    for kind in kinds:
+        if kind not in CONVERTERS:
+            raise ValueError("Cannot convert '{}' files.".format(kind))
+
+    manifest = load_manifest(manifest_path)
+    counts = {"converted": 0, "skipped": 0, "failed": 0}
+
+    # Collect inputs that need to be checked
+    tasks = []
+    outputs = dict()  # output path -> input that writes it
+    inputs = set()
+    for root, dirs, files in os.walk(in_dir):
+        dirs.sort()
+        for name in sorted(files):
+            kind = _get_kind(name)
+            if kind is None:
+                continue
+            in_path = os.path.join(root, name)
+            rel_path = os.path.relpath(in_path, in_dir)
+            inputs.add(rel_path)
+            if kind not in kinds:
+                continue
+            out_path = _get_output_path(rel_path, kind, out_dir)
+
+            # NOTE: E.g. 'x.vmr' and 'x.vmr.gz' have the same output, only
+            # the first input (in sorted order) is converted.
+            key = os.path.normcase(os.path.abspath(out_path))
+            if key in outputs:
+                counts["failed"] += 1
+                print("Failed: {} (same output as {})"
+                      .format(rel_path, outputs[key]), file=sys.stderr)
+                continue
+            outputs[key] = rel_path
+
+            entry = None if force else manifest.get(rel_path)
+            stat = os.stat(in_path)
+            if (entry is not None and entry["size"] == stat.st_size
+                    and entry["mtime"] == stat.st_mtime_ns
+                    and os.path.exists(out_path)):
+                counts["skipped"] += 1
+            else:
+                if entry is not None and entry["size"] != stat.st_size:
+                    entry = None  # Content changed, no need to hash
+                tasks.append((rel_path, in_path, out_path, kind, entry))
+
+    # Forget inputs that were deleted (or renamed)
+    for rel_path in set(manifest) - inputs:
+        del manifest[rel_path]
+
+    # Check and convert in worker processes
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_convert_file, *task[1:]): task[0]
+                       for task in tasks}
+            for future in as_completed(futures):
+                rel_path = futures[future]
+                try:
+                    manifest[rel_path], converted = future.result()
+                except Exception as error:
+                    counts["failed"] += 1
+                    print("Failed: {} ({})".format(rel_path, error),
+                          file=sys.stderr)
+                    continue
+                if converted:
+                    counts["converted"] += 1
+                    if verbose:
+                        print("Converted: {}".format(rel_path))
+                else:
+                    counts["skipped"] += 1
+    finally:
+        os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+        save_manifest(manifest_path, manifest)
+    return counts
+
+
+# =============================================================================
+def main(argv=None):
+    """Command line interface of `convert_tree`."""
+    parser = argparse.ArgumentParser(
+        prog="bvbabel-convert",
+        description="Convert BrainVoyager files of a directory tree "
+                    "(VMR, V16, VMP, GTC, FMR, MSK, VTC to NIfTI, SRF to "
+                    "OBJ). Unchanged inputs are skipped on reruns.")
+    parser.add_argument("in_dir", help="Input directory.")
+    parser.add_argument("-o", "--out-dir", default=None,
+                        help="Output directory (default: next to inputs).")
+    parser.add_argument("-k", "--kinds", nargs="+", default=None,
+                        choices=sorted(CONVERTERS),
+                        help="Input formats to convert (default: all).")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPUs).")
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="Convert all inputs, even unchanged ones.")
+    parser.add_argument("-m", "--manifest", default=None,
+                        help="Manifest file (default: {} in the output "
+                             "directory).".format(MANIFEST_NAME))
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Print each converted file.")
+    args = parser.parse_args(argv)
+
+    counts = convert_tree(args.in_dir, args.out_dir, args.kinds, args.workers,
+                          args.force, args.manifest, args.verbose)
+    print("Converted: {converted}, skipped: {skipped}, failed: {failed}"
+          .format(**counts))
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,16 +3,22 @@
 import os
 import numpy as np
 from bvbabel.stc import read_stc, write_stc
+from bvbabel.utils import open_file, create_file
+from bvbabel.utils import is_path, is_gzip_path
 
 
 # =============================================================================
-def read_fmr(filename):
+def read_fmr(filename, zero_copy=False):
     """Read BrainVoyager FMR (and the paired STC) file.
 
     Parameters
     ----------
     filename : string
-        Path to file.
+        Path to file ('.gz' files are decompressed on the fly). The paired
+        STC file is looked up next to it, also as '.stc.gz'.
+    zero_copy : bool
+        When 'True', the STC file is mapped into memory once and the data is
+        returned as a view into the (copy-on-write) mapping instead of a copy.
 
     Returns
     -------
@@ -21,13 +27,50 @@ def read_fmr(filename):
     data : 4D numpy.array, (x, y, slices, time)
         Image data.
 
+    """
+    if not is_path(filename):
+        raise ValueError("FMR path is needed to find the paired STC file.")
+    header = read_fmr_header(filename)
+
+    # -------------------------------------------------------------------------
+    # Access data from the separate STC file
+    dirname = os.path.dirname(filename)
+    filename_stc = os.path.join(dirname, "{}.stc".format(header["Prefix"]))
+    if not os.path.isfile(filename_stc) and \
+            os.path.isfile(filename_stc + ".gz"):
+        filename_stc += ".gz"
+
+    data_img = read_stc(filename_stc, nr_slices=header["NrOfSlices"],
+                        nr_volumes=header["NrOfVolumes"],
+                        res_x=header["ResolutionX"],
+                        res_y=header["ResolutionY"],
+                        data_type=header["DataType"], zero_copy=zero_copy)
+
+    return header, data_img
+
+
+# =============================================================================
+def read_fmr_header(filename):
+    """Read BrainVoyager FMR file without reading the paired STC file.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Pre-data and post-data headers.
+
     """
     header = dict()
     info_pos = dict()
     info_tra = dict()
     info_multiband = dict()
 
-    with open(filename, 'r') as f:
+    with open_file(filename, text=True) as f:
         lines = f.readlines()
         for j in range(0, len(lines)):
             line = lines[j]
@@ -218,18 +261,7 @@ def read_fmr(filename):
     header["Transformation information"] = info_tra
     header["Multiband information"] = info_multiband
 
-    # -------------------------------------------------------------------------
-    # Access data from the separate STC file
-    dirname = os.path.dirname(filename)
-    filename_stc = os.path.join(dirname, "{}.stc".format(header["Prefix"]))
-
-    data_img = read_stc(filename_stc, nr_slices=header["NrOfSlices"],
-                        nr_volumes=header["NrOfVolumes"],
-                        res_x=header["ResolutionX"],
-                        res_y=header["ResolutionY"],
-                        data_type=header["DataType"])
-
-    return header, data_img
+    return header
 
 
 # =============================================================================
@@ -239,7 +271,8 @@ def write_fmr(filename, header, data_img):
     Parameters
     ----------
     filename : string
-        Path to file.
+        Path to file ('.gz' files are compressed on the fly). The paired STC
+        file is written next to it, compressed when the FMR is.
     header : dictionary
         Information that will be written into FMR file.
     data_img : 4D numpy.array, (x, y, slices, time)
@@ -249,10 +282,12 @@ def write_fmr(filename, header, data_img):
     info_pos = header["Position information"]
     info_tra = header["Transformation information"]
     info_multiband = header["Multiband information"]
+    if not is_path(filename):
+        raise ValueError("FMR path is needed to write the paired STC file.")
     basepath = filename.split(os.extsep, 1)[0]
     basename = os.path.basename(basepath)
 
-    with open(filename, 'w') as f:
+    with create_file(filename, text=True) as f:
         f.write("\n")
 
         data = header["FileVersion"]
@@ -431,6 +466,8 @@ def write_fmr(filename, header, data_img):
     # Write voxel data as a separate STC file
     dirname = os.path.dirname(filename)
     filename_stc = os.path.join(dirname, "{}.stc".format(basename))
+    if is_gzip_path(filename):
+        filename_stc += ".gz"
     write_stc(filename_stc, data_img, data_type=header["DataType"])
 
 
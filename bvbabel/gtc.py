@@ -1,17 +1,38 @@
 """Read, write, create BrainVoyager GTC file format."""
 
-import struct
 import numpy as np
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file
 
 
 # =============================================================================
-def read_gtc(filename):
+# GTC header layout
+# =============================================================================
+_GTC_HEADER = HeaderSchema([
+    # Expected binary data: int (4 bytes)
+    HeaderField("File version", 'i'),
+
+    HeaderField("DimD", 'i'),
+    HeaderField("DimX", 'i'),
+    HeaderField("DimY", 'i'),
+    HeaderField("DimT", 'i'),
+    ])
+
+
+# =============================================================================
+def read_gtc(filename, zero_copy=False):
     """Read BrainVoyager GTC file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
 
     Returns
     -------
@@ -21,20 +42,8 @@ def read_gtc(filename):
         Depth grid sampled images with time course.
 
     """
-    header = dict()
-    with open(filename, 'rb') as f:
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["File version"] = data
-
-        data, = struct.unpack('<i', f.read(4))
-        header["DimD"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["DimX"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["DimY"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["DimT"] = data
+    with open_file(filename, zero_copy) as f:
+        header = _read_gtc_header(f)
 
         # ---------------------------------------------------------------------
         # Read GTC data
@@ -44,10 +53,8 @@ def read_gtc(filename):
         #       DimY
         #           DimX
         #               DimT
-        data_img = np.zeros(header["DimD"] * header["DimY"] * header["DimX"]
-                            * header["DimT"], dtype=np.int32)
-        data_img = np.fromfile(f, dtype='<i', count=data_img.size, sep="",
-                               offset=0)
+        data_img = read_data_array(f, '<i', header["DimD"] * header["DimY"]
+                                   * header["DimX"] * header["DimT"])
 
         # Rearrange data
         data_img = np.reshape(data_img, (header["DimD"], header["DimY"],
@@ -57,38 +64,52 @@ def read_gtc(filename):
         return header, data_img
 
 
+# =============================================================================
+def read_gtc_header(filename):
+    """Read BrainVoyager GTC file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Pre-data header.
+
+    """
+    with open_file(filename) as f:
+        header = _read_gtc_header(f)
+    return header
+
+
+def _read_gtc_header(f):
+    """Read GTC header, leaving the file at the start of the data."""
+    return _GTC_HEADER.read(f)
+
+
 # =============================================================================
 def write_gtc(filename, header, data_img):
     """Protocol to write BrainVoyager GTC file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Pre-data header.
     data_img : 4D numpy.array, (depth, x, y, time)
         Depth grid sampled images with time course.
 
     """
-    with open(filename, 'wb') as f:
-        # Expected binary data: int (4 bytes)
-        data = header["File version"]
-        f.write(struct.pack('<i', data))
-
-        data = header["DimD"]
-        f.write(struct.pack('<i', data))
-        data = header["DimX"]
-        f.write(struct.pack('<i', data))
-        data = header["DimY"]
-        f.write(struct.pack('<i', data))
-        data = header["DimT"]
-        f.write(struct.pack('<i', data))
+    with create_file(filename) as f:
+        _GTC_HEADER.write(f, header)
 
         # ---------------------------------------------------------------------
         # Write GTC data
         # ---------------------------------------------------------------------
         data_img = np.transpose(data_img, (2, 1, 0, 3))
-        data_img = np.reshape(data_img, data_img.size)
-        for i in range(data_img.size):
-            f.write(struct.pack('<i', data_img[i]))
+        write_data_array(f, data_img, '<i')
@@ -1,17 +1,41 @@
 """Read, write, create BrainVoyager MSK file format."""
 
-import struct
 import numpy as np
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file
 
 
 # =============================================================================
-def read_msk(filename):
+# MSK header layout
+# =============================================================================
+_MSK_HEADER = HeaderSchema([
+    # Expected binary data: short int (2 bytes)
+    HeaderField("VTC resolution relative to VMR (1, 2, or 3)", 'h'),
+
+    # Expected binary data: short int (2 bytes)
+    HeaderField("XStart", 'h'),
+    HeaderField("XEnd", 'h'),
+    HeaderField("YStart", 'h'),
+    HeaderField("YEnd", 'h'),
+    HeaderField("ZStart", 'h'),
+    HeaderField("ZEnd", 'h'),
+    ])
+
+
+# =============================================================================
+def read_msk(filename, zero_copy=False):
     """Read BrainVoyager MSK file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
 
     Returns
     -------
@@ -21,26 +45,8 @@ def read_msk(filename):
         Image data.
 
     """
-    header = dict()
-    with open(filename, 'rb') as f:
-
-        # Expected binary data: short int (2 bytes)
-        data, = struct.unpack('<h', f.read(2))
-        header["VTC resolution relative to VMR (1, 2, or 3)"] = data
-
-        # Expected binary data: short int (2 bytes)
-        data, = struct.unpack('<h', f.read(2))
-        header["XStart"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["XEnd"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["YStart"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["YEnd"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["ZStart"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["ZEnd"] = data
+    with open_file(filename, zero_copy) as f:
+        header = _read_msk_header(f)
 
         # Prepare dimensions of VTC data array
         VTC_resolution = header["VTC resolution relative to VMR (1, 2, or 3)"]
@@ -52,9 +58,7 @@ def read_msk(filename):
         # Read MSK data
         # ---------------------------------------------------------------------
 
-        data_img = np.zeros(DimZ * DimY * DimX)
-        data_img = np.fromfile(f, dtype='<B', count=data_img.size, sep="",
-                               offset=0)
+        data_img = read_data_array(f, '<B', DimZ * DimY * DimX)
         data_img = np.reshape(data_img, (DimZ, DimY, DimX))
         data_img = np.transpose(data_img, (0, 2, 1))  # BV to Tal
         data_img = data_img[::-1, ::-1, ::-1]  # Flip BV axes
@@ -62,45 +66,53 @@ def read_msk(filename):
     return header, data_img
 
 
+# =============================================================================
+def read_msk_header(filename):
+    """Read BrainVoyager MSK file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Pre-data header.
+
+    """
+    with open_file(filename) as f:
+        header = _read_msk_header(f)
+    return header
+
+
+def _read_msk_header(f):
+    """Read MSK header, leaving the file at the start of the data."""
+    return _MSK_HEADER.read(f)
+
+
 # =============================================================================
 def write_msk(filename, header, data_img):
     """Protocol to write BrainVoyager MSK file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Pre-data header.
     data_img : 3D numpy.array
         Image data.
 
     """
-    with open(filename, 'wb') as f:
-
-        # Expected binary data: short int (2 bytes)
-        data = header["VTC resolution relative to VMR (1, 2, or 3)"]
-        f.write(struct.pack('<h', data))
-
-        data = header["XStart"]
-        f.write(struct.pack('<h', data))
-        data = header["XEnd"]
-        f.write(struct.pack('<h', data))
-        data = header["YStart"]
-        f.write(struct.pack('<h', data))
-        data = header["YEnd"]
-        f.write(struct.pack('<h', data))
-        data = header["ZStart"]
-        f.write(struct.pack('<h', data))
-        data = header["ZEnd"]
-        f.write(struct.pack('<h', data))
+    with create_file(filename) as f:
+        _MSK_HEADER.write(f, header)
 
         # ---------------------------------------------------------------------
         # Write MSK data
         # ---------------------------------------------------------------------
         data_img = data_img[::-1, ::-1, ::-1]  # Flip BV axes
         data_img = np.transpose(data_img, (0, 2, 1))  # Tal to BV
-        data_img = np.reshape(data_img, data_img.size)
-
-        for i in range(data_img.size):
-            f.write(struct.pack('<B', int(data_img[i])))
+        write_data_array(f, data_img, '<B')
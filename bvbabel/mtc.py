@@ -1,18 +1,42 @@
 """Read, write, create BrainVoyager MTC file format."""
 
-import struct
 import numpy as np
-from bvbabel.utils import read_variable_length_string, write_variable_length_string
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file
 
 
 # =============================================================================
-def read_mtc(filename):
+# MTC header layout
+# =============================================================================
+_MTC_HEADER = HeaderSchema([
+    # Expected binary data: int (4 bytes)
+    HeaderField("File version", 'i'),
+    HeaderField("Nr vertices", 'i'),
+    HeaderField("Nr time points", 'i'),
+
+    # Expected binary data: variable-length string
+    HeaderField("VTC name", 'z'),
+    HeaderField("PRT name", 'z'),
+
+    # Expected binary data: char (1 byte)
+    HeaderField("Datatype (1 = float)", 'B'),
+    ])
+
+
+# =============================================================================
+def read_mtc(filename, zero_copy=False):
     """Read BrainVoyager MTC file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
 
     Returns
     -------
@@ -22,74 +46,66 @@ def read_mtc(filename):
         Vertex-wise time points (float32).
 
     """
-    header = dict()
-    data_mtc = dict()
-    with open(filename, 'rb') as f:
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["File version"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["Nr vertices"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["Nr time points"] = data
-
-        # Expected binary data: variable-length string
-        data = read_variable_length_string(f)
-        header["VTC name"] = data
-        data = read_variable_length_string(f)
-        header["PRT name"] = data
-
-        # Expected binary data: char (1 byte)
-        data, = struct.unpack('<B', f.read(1))
-        header["Datatype (1 = float)"] = data
+    with open_file(filename, zero_copy) as f:
+        header = _read_mtc_header(f)
 
         # ---------------------------------------------------------------------
         # Vertex-wise time points data
         dims = (header["Nr vertices"], header["Nr time points"])
-        data_mtc = np.fromfile(f, dtype='<f', count=dims[0]*dims[1], sep="",
-                               offset=0)
+        data_mtc = read_data_array(f, '<f', dims[0]*dims[1])
         data_mtc = np.reshape(data_mtc, dims)
 
         return header, data_mtc
 
 
+# =============================================================================
+def read_mtc_header(filename):
+    """Read BrainVoyager MTC file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Pre-data headers.
+
+    """
+    with open_file(filename) as f:
+        header = _read_mtc_header(f)
+    return header
+
+
+def _read_mtc_header(f):
+    """Read MTC header, leaving the file at the start of the data."""
+    return _MTC_HEADER.read(f)
+
+
+# =============================================================================
 def write_mtc(filename, header, data_mtc):
     """Protocol to write BrainVoyager MTC file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Pre-data headers.
     data_mtc : 2D numpy.array, (nr_vertices, time points)
         Vertex-wise time points (float32).
 
     """
-    with open(filename, 'wb') as f:
-        # Expected binary data: int (4 bytes)
-        data = header["File version"]
-        f.write(struct.pack('<i', data))
-        data = header["Nr vertices"]
-        f.write(struct.pack('<i', data))
-        data = header["Nr time points"]
-        f.write(struct.pack('<i', data))
-
-        # Expected binary data: variable-length string
-        data = header["VTC name"]
-        write_variable_length_string(f, data)
-        data = header["PRT name"]
-        write_variable_length_string(f, data)
-
-        # Expected binary data: char (1 byte)
-        data = header["Datatype (1 = float)"]
-        f.write(struct.pack('<B', data))
+    with create_file(filename) as f:
+        _MTC_HEADER.write(f, header)
 
         # ---------------------------------------------------------------------
         # Vertex-wise time points data
         dims = (header["Nr vertices"], header["Nr time points"])
         data_mtc = np.reshape(data_mtc, dims[0] * dims[1])
-        for i in range(dims[0] * dims[1]):
-            f.write(struct.pack('<f', data_mtc[i]))
+        write_data_array(f, data_mtc, '<f')
 
         return header, data_mtc
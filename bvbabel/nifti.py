@@ -0,0 +1,311 @@
+"""Read, write, create NIfTI-1 file format (single file)."""
+
+import numpy as np
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file, can_memmap
+
+
+# =============================================================================
+# NIfTI-1 header layout
+# =============================================================================
+_NIFTI_HEADER = HeaderSchema([
+    HeaderField("sizeof_hdr", 'i'),
+    HeaderField("data_type", '10s'),
+    HeaderField("db_name", '18s'),
+    HeaderField("extents", 'i'),
+    HeaderField("session_error", 'h'),
+    HeaderField("regular", '1s'),
+    HeaderField("dim_info", 'B'),
+    HeaderField("dim", '8h'),
+    HeaderField("intent_p1", 'f'),
+    HeaderField("intent_p2", 'f'),
+    HeaderField("intent_p3", 'f'),
+    HeaderField("intent_code", 'h'),
+    HeaderField("datatype", 'h'),
+    HeaderField("bitpix", 'h'),
+    HeaderField("slice_start", 'h'),
+    HeaderField("pixdim", '8f'),
+    HeaderField("vox_offset", 'f'),
+    HeaderField("scl_slope", 'f'),
+    HeaderField("scl_inter", 'f'),
+    HeaderField("slice_end", 'h'),
+    HeaderField("slice_code", 'B'),
+    HeaderField("xyzt_units", 'B'),
+    HeaderField("cal_max", 'f'),
+    HeaderField("cal_min", 'f'),
+    HeaderField("slice_duration", 'f'),
+    HeaderField("toffset", 'f'),
+    HeaderField("glmax", 'i'),
+    HeaderField("glmin", 'i'),
+    HeaderField("descrip", '80s'),
+    HeaderField("aux_file", '24s'),
+    HeaderField("qform_code", 'h'),
+    HeaderField("sform_code", 'h'),
+    HeaderField("quatern_b", 'f'),
+    HeaderField("quatern_c", 'f'),
+    HeaderField("quatern_d", 'f'),
+    HeaderField("qoffset_x", 'f'),
+    HeaderField("qoffset_y", 'f'),
+    HeaderField("qoffset_z", 'f'),
+    HeaderField("srow_x", '4f'),
+    HeaderField("srow_y", '4f'),
+    HeaderField("srow_z", '4f'),
+    HeaderField("intent_name", '16s'),
+    HeaderField("magic", '4s'),
+    ])
+
+# NOTE: 348 bytes of header and 4 bytes of (empty) extension flags
+_VOX_OFFSET = 352
+
+# NIfTI-1 datatype codes and their binary types
+_DATA_TYPES = {
+    2: '<u1', 4: '<i2', 8: '<i4', 16: '<f4', 64: '<f8', 256: '<i1',
+    512: '<u2', 768: '<u4', 1024: '<i8', 1280: '<u8',
+    }
+
+
+# =============================================================================
+def read_nifti(filename, mmap=False, zero_copy=False):
+    """Read NIfTI-1 file.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    mmap : bool
+        When 'True', the data is not loaded into memory. Instead a read-only
+        numpy.memmap of the voxel data is returned. Only the voxels that are
+        accessed are read from the disk. Needs an uncompressed file path.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
+
+    Returns
+    -------
+    header : dictionary
+        NIfTI-1 header fields, named as in the NIfTI-1 standard.
+    data : numpy.array
+        Image data as stored in the file, axes as in `header["dim"]`
+        (Fortran order, 1st axis fastest). Scaling by `scl_slope` and
+        `scl_inter` is not applied.
+
+    """
+    with open_file(filename, zero_copy) as f:
+        header = _read_nifti_header(f)
+        dims, data_type = _get_data_layout(header)
+        if mmap is True:
+            if not can_memmap(filename):
+                raise ValueError(
+                    "Memory mapping needs an uncompressed file path.")
+            data = np.memmap(filename, dtype=data_type, mode='r',
+                             offset=int(header["vox_offset"]), shape=dims,
+                             order='F')
+        else:
+            f.seek(int(header["vox_offset"]))
+            data = read_data_array(f, data_type, int(np.prod(dims)))
+            data = np.reshape(data, dims, order='F')
+    return header, data
+
+
+# =============================================================================
+def read_nifti_header(filename):
+    """Read NIfTI-1 file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        NIfTI-1 header fields. In addition, "Data offset" is the position of
+        the first data byte in the file and "Data size" the expected size of
+        the data in bytes.
+
+    """
+    with open_file(filename) as f:
+        header = _read_nifti_header(f)
+    dims, data_type = _get_data_layout(header)
+    header["Data offset"] = int(header["vox_offset"])
+    header["Data size"] = int(np.prod(dims)) * np.dtype(data_type).itemsize
+    return header
+
+
+def _read_nifti_header(f):
+    """Read and check NIfTI-1 header."""
+    header = _NIFTI_HEADER.read(f)
+    if header["sizeof_hdr"] != 348:
+        raise ValueError("Not a little-endian NIfTI-1 file.")
+    if header["magic"] != b"n+1\x00":
+        raise ValueError("Only single file (.nii) NIfTI-1 is supported.")
+    return header
+
+
+def _get_data_layout(header):
+    """Dimensions and binary type of NIfTI-1 data."""
+    dims = tuple(int(i) for i in header["dim"][1:header["dim"][0] + 1])
+    if header["datatype"] not in _DATA_TYPES:
+        raise ValueError("Unsupported NIfTI-1 datatype {}."
+                         .format(header["datatype"]))
+    return dims, _DATA_TYPES[header["datatype"]]
+
+
+def get_affine(header):
+    """Voxel to world affine of NIfTI-1 header.
+
+    Parameters
+    ----------
+    header : dictionary
+        NIfTI-1 header.
+
+    Returns
+    -------
+    affine : 2D numpy.array, [4, 4]
+        Affine from the sform when `sform_code` is set, otherwise from the
+        qform (or only the voxel sizes when neither is set).
+
+    """
+    affine = np.eye(4)
+    pixdim = header["pixdim"]
+    if header["sform_code"] > 0:
+        affine[:3] = [header["srow_x"], header["srow_y"], header["srow_z"]]
+    elif header["qform_code"] > 0:
+        b, c, d = (header["quatern_b"], header["quatern_c"],
+                   header["quatern_d"])
+        a = np.sqrt(max(1. - (b * b + c * c + d * d), 0.))
+        rotation = np.array([
+            [a*a + b*b - c*c - d*d, 2*b*c - 2*a*d, 2*b*d + 2*a*c],
+            [2*b*c + 2*a*d, a*a + c*c - b*b - d*d, 2*c*d - 2*a*b],
+            [2*b*d - 2*a*c, 2*c*d + 2*a*b, a*a + d*d - c*c - b*b]])
+        qfac = -1. if pixdim[0] < 0 else 1.
+        affine[:3, :3] = rotation * [pixdim[1], pixdim[2], pixdim[3] * qfac]
+        affine[:3, 3] = [header["qoffset_x"], header["qoffset_y"],
+                         header["qoffset_z"]]
+    else:
+        affine[:3, :3] = np.diag(pixdim[1:4])
+    return affine
+
+
+# =============================================================================
+def write_nifti(filename, header, data):
+    """Write NIfTI-1 file.
+
+    Parameters
+    ----------
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
+    header : dictionary
+        NIfTI-1 header fields, see `create_nifti_header`.
+    data : numpy.array
+        Image data, axes as in `header["dim"]`. Numpy memmaps and other
+        non-contiguous arrays are written in chunks without a full copy.
+
+    """
+    dims, data_type = _get_data_layout(header)
+    if tuple(np.shape(data)) != dims:
+        raise ValueError("Data shape {} does not match header dimensions {}."
+                         .format(np.shape(data), dims))
+    with create_file(filename) as f:
+        write_nifti_header(f, header)
+
+        # NOTE: NIfTI-1 data is in Fortran order (1st axis fastest)
+        write_data_array(f, np.transpose(data), data_type)
+
+
+def write_nifti_header(f, header):
+    """Write NIfTI-1 header and pad with zeros up to the data.
+
+    Parameters
+    ----------
+    f : file object
+        Opened binary file, positioned at the start of the file.
+    header : dictionary
+        NIfTI-1 header fields, see `create_nifti_header`. The data is
+        expected to follow at `header["vox_offset"]`.
+
+    """
+    buffer = _NIFTI_HEADER.pack(header)
+    f.write(buffer + b'\x00' * (int(header["vox_offset"]) - len(buffer)))
+
+
+def create_nifti_header(dims, data_type=np.float32, affine=None):
+    """Create NIfTI-1 header with default values.
+
+    Parameters
+    ----------
+    dims : tuple of ints
+        Data dimensions (up to 7).
+    data_type : numpy.dtype or string
+        Binary type of the data.
+    affine : 2D numpy.array, [4, 4], optional
+        Voxel to world affine, stored as sform (and voxel sizes). Identity
+        when not given.
+
+    Returns
+    -------
+    header : dictionary
+        NIfTI-1 header fields.
+
+    """
+    data_type = np.dtype(data_type).newbyteorder('<')
+    codes = {np.dtype(v): k for k, v in _DATA_TYPES.items()}
+    if data_type not in codes:
+        raise ValueError("Unsupported NIfTI-1 data type {}.".format(data_type))
+    if affine is None:
+        affine = np.eye(4)
+    affine = np.asarray(affine, dtype=np.float64)
+
+    header = dict()
+    header["sizeof_hdr"] = 348
+    header["data_type"] = b""
+    header["db_name"] = b""
+    header["extents"] = 0
+    header["session_error"] = 0
+    header["regular"] = b"r"
+    header["dim_info"] = 0
+    header["dim"] = np.ones(8, dtype='<h')
+    header["dim"][0] = len(dims)
+    header["dim"][1:len(dims) + 1] = dims
+    header["intent_p1"] = 0.
+    header["intent_p2"] = 0.
+    header["intent_p3"] = 0.
+    header["intent_code"] = 0
+    header["datatype"] = codes[data_type]
+    header["bitpix"] = data_type.itemsize * 8
+    header["slice_start"] = 0
+    header["pixdim"] = np.ones(8, dtype='<f')
+    header["pixdim"][1:4] = np.sqrt(np.sum(affine[:3, :3] ** 2, axis=0))
+    header["vox_offset"] = float(_VOX_OFFSET)
+    header["scl_slope"] = 1.
+    header["scl_inter"] = 0.
+    header["slice_end"] = 0
+    header["slice_code"] = 0
+    header["xyzt_units"] = 2  # mm
+    header["cal_max"] = 0.
+    header["cal_min"] = 0.
+    header["slice_duration"] = 0.
+    header["toffset"] = 0.
+    header["glmax"] = 0
+    header["glmin"] = 0
+    header["descrip"] = b""
+    header["aux_file"] = b""
+    header["qform_code"] = 0
+    header["sform_code"] = 2  # Aligned anatomy
+    header["quatern_b"] = 0.
+    header["quatern_c"] = 0.
+    header["quatern_d"] = 0.
+    header["qoffset_x"] = affine[0, 3]
+    header["qoffset_y"] = affine[1, 3]
+    header["qoffset_z"] = affine[2, 3]
+    header["srow_x"] = affine[0]
+    header["srow_y"] = affine[1]
+    header["srow_z"] = affine[2]
+    header["intent_name"] = b""
+    header["magic"] = b"n+1\x00"
+    return header
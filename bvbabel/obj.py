@@ -2,6 +2,7 @@
 
 import struct
 import numpy as np
+from bvbabel.utils import create_file
 
 
 # =============================================================================
@@ -10,8 +11,9 @@ def write_obj(filename, vertices, vertex_normals, faces):
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     vertices : 2D numpy.array, (nr_vertices, XYZ coordinates)
         Vertex coordinates (float32).
     vertex_normals : 2D numpy.array, (nr_vertices, XYZ coordinates)
@@ -26,7 +28,7 @@ def write_obj(filename, vertices, vertex_normals, faces):
     nr_vertex_normals = vertex_normals.shape[0]
     nr_faces = faces.shape[0]
 
-    with open(filename, 'w') as f:
+    with create_file(filename, text=True) as f:
         f.write("# Converted from BrainVoyager SRF format.\n")
         f.write("# Number of vertices: {}\n".format(nr_vertices))
         f.write("# Number of faces: {}\n".format(nr_faces))
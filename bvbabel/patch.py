@@ -0,0 +1,128 @@
+"""Patch header fields of BrainVoyager files in place."""
+
+import bvbabel.vmr
+import bvbabel.v16
+import bvbabel.vmp
+import bvbabel.vtc
+import bvbabel.gtc
+import bvbabel.smp
+import bvbabel.ssm
+import bvbabel.msk
+import bvbabel.mtc
+import bvbabel.nifti
+from bvbabel.batch import get_file_kind
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import can_memmap, rewrite_file
+
+
+def _single_header(schema):
+    """Layout of formats with a single header at the start of the file."""
+    return lambda f: [((), 0, schema, schema.read(f))]
+
+
+# Header parts as (key prefix, offset, schema, header), by file extension
+_LAYOUTS = {
+    "vmr": bvbabel.vmr._get_header_layout,
+    "v16": _single_header(bvbabel.v16._V16_HEADER),
+    "vmp": bvbabel.vmp._get_header_layout,
+    "vtc": _single_header(bvbabel.vtc._VTC_HEADER),
+    "gtc": _single_header(bvbabel.gtc._GTC_HEADER),
+    "smp": bvbabel.smp._get_header_layout,
+    "ssm": _single_header(bvbabel.ssm._SSM_HEADER),
+    "msk": _single_header(bvbabel.msk._MSK_HEADER),
+    "mtc": _single_header(bvbabel.mtc._MTC_HEADER),
+    "nii": _single_header(bvbabel.nifti._NIFTI_HEADER),
+    }
+
+# Fields that determine the size or presence of other parts of the file
+_LAYOUT_FIELDS = {
+    "vmr": {"File version", "DimX", "DimY", "DimZ",
+            "NrOfPastSpatialTransformations", "NrOfValues"},
+    "v16": {"DimX", "DimY", "DimZ"},
+    "vmp": {"VersionNumber", "NrOfSubMaps", "NrOfTimePoints",
+            "NrOfComponentParams", "XStart", "XEnd", "YStart", "YEnd",
+            "ZStart", "ZEnd", "Resolution", "TypeOfMap", "SizeOfFDRTable"},
+    "vtc": {"File version", "Protocol attached",
+            "Data type (1:short int, 2:float)", "Nr time points",
+            "VTC resolution relative to VMR (1, 2, or 3)",
+            "XStart", "XEnd", "YStart", "YEnd", "ZStart", "ZEnd"},
+    "gtc": {"File version", "DimD", "DimX", "DimY", "DimT"},
+    "smp": {"File version", "Nr vertices", "Nr maps", "Map type"},
+    "ssm": {"Nr vertices 1", "Nr vertices 2"},
+    "msk": {"VTC resolution relative to VMR (1, 2, or 3)",
+            "XStart", "XEnd", "YStart", "YEnd", "ZStart", "ZEnd"},
+    "mtc": {"Nr vertices", "Nr time points", "Datatype (1 = float)"},
+    "nii": {"sizeof_hdr", "dim", "datatype", "bitpix", "vox_offset",
+            "magic"},
+    }
+
+
+# =============================================================================
+def patch_header(filename, fields, rewrite=False):
+    """Change header fields of a file without rewriting the data.
+
+    Parameters
+    ----------
+    filename : string
+        Path to (uncompressed) file. The format is found from the extension.
+    fields : dictionary
+        New values by field name, e.g. `{"TR (ms)": 2000.}`. Fields of maps
+        (VMP, SMP) or past transformations (VMR) are given as tuples of the
+        keys of the header returned by the reader, e.g.
+        `{("Map", 2, "MapThreshold"): 3.5}`.
+    rewrite : bool
+        Variable-length strings that change length cannot be patched in
+        place. When 'True', the file is instead streamed into a new file with
+        the changed header, which then replaces the original. Otherwise a
+        ValueError is raised.
+
+    Notes
+    -----
+    Fields are located with the header schemas of the format. Fixed-size
+    fields (and strings of the same length) are overwritten in place, no
+    other byte of the file is read or written. Fields that determine the
+    size or presence of other parts of the file (e.g. dimensions, number of
+    maps, file version) cannot be patched.
+
+    """
+    if not can_memmap(filename):
+        raise ValueError("Patching needs an uncompressed file path.")
+    kind = get_file_kind(filename)
+    if kind not in _LAYOUTS:
+        raise ValueError("Cannot patch headers of '{}' files.".format(kind))
+    with open(filename, 'rb') as f:
+        layout = _LAYOUTS[kind](f)
+
+    # Find each field and pack its new value
+    patches = []
+    for key, value in fields.items():
+        if isinstance(key, tuple):
+            prefix, name = tuple(key[:-1]), key[-1]
+        else:
+            prefix, name = (), key
+        if name in _LAYOUT_FIELDS[kind]:
+            raise ValueError("Field '{}' determines the file layout and "
+                             "cannot be patched.".format(name))
+        for part_prefix, part_offset, schema, header in layout:
+            field = [i for i in schema.fields if i.name == name]
+            if part_prefix == prefix and field:
+                break
+        else:
+            raise ValueError("Field {!r} is not found in the header."
+                             .format(key))
+        offset, size = schema.locate(header, name)
+        buffer = HeaderSchema([HeaderField(name, field[0].fmt)]).pack(
+            {name: value})
+        patches.append((part_offset + offset, size, buffer))
+
+    if all(size == len(buffer) for _, size, buffer in patches):
+        with open(filename, 'r+b') as f:
+            for offset, _, buffer in patches:
+                f.seek(offset)
+                f.write(buffer)
+    elif rewrite is True:
+        rewrite_file(filename, patches)
+    else:
+        raise ValueError("Changing the length of a string needs a rewrite of "
+                         "the file, see `rewrite`.")
+
@@ -1,6 +1,8 @@
 """Read BrainVoyager POI (surface patches of interest) file format."""
 
 import numpy as np
+from bvbabel.utils import read_text_lines, parse_text_header
+from bvbabel.utils import open_file, create_file
 
 
 # =============================================================================
@@ -9,8 +11,9 @@ def read_poi(filename):
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
 
     Returns
     -------
@@ -22,19 +25,12 @@ def read_poi(filename):
 
     """
     # Read non-empty lines of the input text file
-    with open(filename, 'r') as f:
-        lines = [r for r in (line.strip() for line in f) if r]
+    with open_file(filename, text=True) as f:
+        lines = read_text_lines(f)
 
     # POI header
-    header = dict()
     header_rows = 4  # NOTE: Only counting non empty rows
-    for line in lines[0:header_rows]:
-        content = line.split(":")
-        content = [i.strip() for i in content]
-        if content[1].isdigit():
-            header[content[0]] = int(content[1])
-        else:
-            header[content[0]] = content[1]
+    header = parse_text_header(lines[0:header_rows])
 
     # POI data
     count_poi = -1
@@ -79,13 +75,35 @@ def read_poi(filename):
     return header, data_poi
 
 
+# =============================================================================
+def read_poi_header(filename):
+    """Read BrainVoyager POI file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Patches of interest (POI) header.
+
+    """
+    with open_file(filename, text=True) as f:
+        lines = read_text_lines(f, nr_lines=4)
+    return parse_text_header(lines)
+
+
 def write_poi(filename, header, data_poi):
     """Protocol to write BrainVoyager POI files.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Patches of interest (POI) header.
     data_poi : list of dictionaries
@@ -93,7 +111,7 @@ def write_poi(filename, header, data_poi):
         interest.
 
     """
-    with open(filename, 'w') as f:
+    with create_file(filename, text=True) as f:
         f.write("\n")
 
         data = header["FileVersion"]
@@ -3,6 +3,8 @@
 from curses.ascii import isdigit
 import numpy as np
 from copy import copy
+from bvbabel.utils import read_text_lines, parse_text_header
+from bvbabel.utils import open_file
 
 
 # =============================================================================
@@ -11,8 +13,9 @@ def read_prt(filename):
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
 
     Returns
     -------
@@ -23,19 +26,12 @@ def read_prt(filename):
 
     """
     # Read non-empty lines of the input text file
-    with open(filename, 'r') as f:
-        lines = [r for r in (line.strip() for line in f) if r]
+    with open_file(filename, text=True) as f:
+        lines = read_text_lines(f)
 
     # POI header
-    header = dict()
     header_rows = 10  # NOTE: Only counting non empty rows
-    for line in lines[0:header_rows]:
-        content = line.split(":")
-        content = [i.strip() for i in content]
-        if content[1].isdigit():
-            header[content[0]] = int(content[1])
-        else:
-            header[content[0]] = content[1]
+    header = parse_text_header(lines[0:header_rows])
 
     # POI data
     data_prt = list()
@@ -71,3 +67,24 @@ def read_prt(filename):
         count_cond += 1
 
     return header, data_prt
+
+
+# =============================================================================
+def read_prt_header(filename):
+    """Read BrainVoyager PRT file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Protocol (PRT) header.
+
+    """
+    with open_file(filename, text=True) as f:
+        lines = read_text_lines(f, nr_lines=10)
+    return parse_text_header(lines)
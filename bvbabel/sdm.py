@@ -1,6 +1,8 @@
 """Read BrainVoyager SDM file format."""
 
 import numpy as np
+from bvbabel.utils import read_text_lines, parse_text_header
+from bvbabel.utils import open_file, create_file
 
 
 # =============================================================================
@@ -9,8 +11,9 @@ def read_sdm(filename):
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
 
     Returns
     -------
@@ -23,19 +26,12 @@ def read_sdm(filename):
 
     """
     # Read non-empty lines of the input text file
-    with open(filename, 'r') as f:
-        lines = [r for r in (line.strip() for line in f) if r]
+    with open_file(filename, text=True) as f:
+        lines = read_text_lines(f)
 
     # SDM header
-    header = dict()
     header_rows = 5  # Nr of rows without empty lines
-    for line in lines[0:header_rows]:
-        content = line.split(":")
-        content = [i.strip() for i in content]
-        if content[1].isdigit():
-            header[content[0]] = int(content[1])
-        else:
-            header[content[0]] = content[1]
+    header = parse_text_header(lines[0:header_rows])
 
     # -----------------------------------------------------------------------------
     # SDM data columnns
@@ -76,13 +72,35 @@ def read_sdm(filename):
     return header, data
 
 
+# =============================================================================
+def read_sdm_header(filename):
+    """Read BrainVoyager SDM file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Single subjects design matrix (SDM) header.
+
+    """
+    with open_file(filename, text=True) as f:
+        lines = read_text_lines(f, nr_lines=5)
+    return parse_text_header(lines)
+
+
 def write_sdm(filename, header, data_sdm):
     """Protocol to write BrainVoyager SDM file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Single subjects design matrix (SDM) header. Also used for storing
         motion estimates (*_3DMC.sdm).
@@ -91,7 +109,7 @@ def write_sdm(filename, header, data_sdm):
         a single predictor.
 
     """
-    with open(filename, 'w') as f:
+    with create_file(filename, text=True) as f:
         data = header["FileVersion"]
         f.write("FileVersion:                   {}\n".format(data))
         f.write("\n")
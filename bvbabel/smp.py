@@ -1,19 +1,133 @@
 """Read, write, create BrainVoyager SMP file format."""
 
 import struct
+from collections import ChainMap
 import numpy as np
-from bvbabel.utils import read_variable_length_string, read_RGB_bytes
-from bvbabel.utils import write_variable_length_string, write_RGB_bytes
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import stack_arrays
+from bvbabel.utils import is_map_selected, select_maps, check_maps
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file, can_memmap
 
 
 # =============================================================================
-def read_smp(filename):
+# SMP header layout
+# =============================================================================
+def _is_version_2(header):
+    """Entries added in SMP file version 2."""
+    return header["File version"] >= 2
+
+
+def _is_version_4(header):
+    """Entries added in SMP file version 4."""
+    return header["File version"] >= 4
+
+
+def _is_version_5(header):
+    """Entries added in SMP file version 5."""
+    return header["File version"] >= 5
+
+
+def _get_default_lut_file(header):
+    """Maps of file version 2 to 4 use the default look-up table."""
+    return "<default>" if _is_version_2(header) else None
+
+
+def _is_lag_map(header):
+    """Additional values are only stored for lag maps."""
+    return header["File version"] >= 3 and header["Map type"] == 3
+
+
+_SMP_HEADER = HeaderSchema([
+    # Expected binary data: short int (2 bytes)
+    HeaderField("File version", 'h'),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("Nr vertices", 'i'),
+
+    # Expected binary data: short int (2 bytes)
+    HeaderField("Nr maps", 'h'),
+
+    # Expected binary data: variable length string
+    HeaderField("SRF file", 'z'),
+    ])
+
+# NOTE: Conditions of the map header are evaluated on the map header chained
+# with the SMP header, so that "File version" can be looked up.
+_SMP_MAP_HEADER = HeaderSchema([
+    # Expected binary data: int (4 bytes)
+    HeaderField("Map type", 'i'),
+
+    # Read additional values only if a lag map
+    HeaderField("CC nr lags", 'i', _is_lag_map),
+    HeaderField("CC min lag", 'i', _is_lag_map),
+    HeaderField("CC max lag", 'i', _is_lag_map),
+    HeaderField("CC overlay", 'i', _is_lag_map),
+
+    HeaderField("Cluster size", 'i'),
+
+    # Expected binary data: char (1 byte)
+    HeaderField("Cluster checkbox", 'B'),
+
+    # Expected binary data: float (4 bytes)
+    HeaderField("Threshold min", 'f'),
+    HeaderField("Threshold max", 'f'),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("Threshold include greater than max", 'i', _is_version_4),
+
+    # NOTE(BV Documentation): Degrees of freedom 1 is nominator if
+    # F-test. Degrees of freedom 1 is denominator if F-test.
+    # Expected binary data: int (4 bytes)
+    HeaderField("Degrees of freedom 1", 'i'),
+    HeaderField("Degrees of freedom 2", 'i'),
+
+    HeaderField("Show positive negative", 'i', _is_version_5, default=3),
+
+    HeaderField("Bonferroni correction value", 'i'),
+
+    # Expected binary data: char (1 byte) x 3
+    HeaderField("RGB positive min", '3B', _is_version_2),
+    HeaderField("RGB positive max", '3B', _is_version_2),
+    HeaderField("RGB negative min", '3B', _is_version_4),
+    HeaderField("RGB negative max", '3B', _is_version_4),
+
+    # Expected binary data: char (1 byte)
+    HeaderField("RGB or LUT", 'B', _is_version_2),
+
+    # Expected binary data: variable length string
+    HeaderField("LUT file", 'z', _is_version_5,
+                default=_get_default_lut_file),
+
+    # Expected binary data: float (4 bytes)
+    HeaderField("Color transparency", 'f', _is_version_2),
+
+    # Expected binary data: variable length string
+    HeaderField("Name", 'z'),
+    ])
+
+
+# =============================================================================
+def read_smp(filename, maps=None, zero_copy=False):
     """Read BrainVoyager SMP file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    maps : int, string or list of ints and/or strings, optional
+        Indices or names of the maps to be read. Values of the other maps are
+        skipped without reading them. Selected maps are returned once each,
+        in the order they are stored in the file (not in the order of
+        `maps`), and the header only contains the selected maps. By default
+        all maps are read.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. The map values are one strided view into the (copy-on-write)
+        mapping when the maps are evenly spaced in the file, i.e. when all
+        map headers have the same size (e.g. names of equal length).
+        Otherwise they are copied into one array.
 
     Returns
     -------
@@ -22,7 +136,8 @@ def read_smp(filename):
         of individual maps. Such as their thresholds, color maps etc.
     data_smp : 2D numpy.array, [nr vertices, nr maps]
         Number of vertices is equal to the SRF on which the SMP is created.
-        Each vertex has a number of values corresponding to maps in the header.
+        Each vertex has a number of values corresponding to maps in the header
+        (float32). Values of each map are contiguous in memory.
 
     Notes
     -----
@@ -33,131 +148,113 @@ def read_smp(filename):
         25: Polar angle
 
     """
-    header = dict()
-    with open(filename, 'rb') as f:
-        # Expected binary data: short int (2 bytes)
-        data, = struct.unpack('<h', f.read(2))
-        header["File version"] = data
-
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["Nr vertices"] = data
-
-        # Expected binary data: short int (2 bytes)
-        data, = struct.unpack('<h', f.read(2))
-        header["Nr maps"] = data
-
-        # Expected binary data: variable length string
-        data = read_variable_length_string(f)
-        header["SRF file"] = data
+    with open_file(filename, zero_copy) as f:
+        header = _read_smp_header(f)
 
         # ---------------------------------------------------------------------
-        data_smp = np.zeros((header["Nr vertices"], header["Nr maps"]),
-                            dtype=np.float32)  # Prepare data array
+        # NOTE: Each map is stored as one block of vertex values. Data array
+        # is prepared as [nr maps, nr vertices] and transposed when returned.
+        if maps is None and zero_copy is not True:
+            data_smp = np.empty((header["Nr maps"], header["Nr vertices"]),
+                                dtype=np.float32)  # Prepare data array
+        else:
+            if maps is not None:
+                check_maps(maps, header["Nr maps"])  # Before reading any map
+            data_smp = []
         header["Map"] = []
+        map_names = []
         for m in range(header["Nr maps"]):
-            header["Map"].append(dict())
-
-            # Expected binary data: int (4 bytes)
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["Map type"] = data
-
-            # Read additional values only if a lag map
-            if header["File version"] >= 3 and header["Map"][m]["Map type"] == 3:
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["CC nr lags"] = data
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["CC min lag"] = data
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["CC max lag"] = data
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["CC overlay"] = data
-
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["Cluster size"] = data
-
-            # Expected binary data: char (1 byte)
-            data, = struct.unpack('<B', f.read(1))
-            header["Map"][m]["Cluster checkbox"] = data
-
-            # Expected binary data: float (4 bytes)
-            data, = struct.unpack('<f', f.read(4))
-            header["Map"][m]["Threshold min"] = data
-            data, = struct.unpack('<f', f.read(4))
-            header["Map"][m]["Threshold max"] = data
-
-            if header["File version"] >= 4:
-                # Expected binary data: int (4 bytes)
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["Threshold include greater than max"] = data
-
-            # NOTE(BV Documentation): Degrees of freedom 1 is nominator if
-            # F-test. Degrees of freedom 1 is denominator if F-test.
-            # Expected binary data: int (4 bytes)
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["Degrees of freedom 1"] = data
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["Degrees of freedom 2"] = data
-
-            if header["File version"] >= 5:
-                # Expected binary data: int (4 bytes)
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["Show positive negative"] = data
-            else:
-                header["Map"][m]["Show positive negative"] = 3
-
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["Bonferroni correction value"] = data
-
-            if header["File version"] >= 2:
-                # Expected binary data: char (1 byte) x 3
-                data = read_RGB_bytes(f)
-                header["Map"][m]["RGB positive min"] = data
-                data = read_RGB_bytes(f)
-                header["Map"][m]["RGB positive max"] = data
-
-                if header["File version"] >= 4:
-                    data = read_RGB_bytes(f)
-                    header["Map"][m]["RGB negative min"] = data
-                    data = read_RGB_bytes(f)
-                    header["Map"][m]["RGB negative max"] = data
-
-                # Expected binary data: char (1 byte)
-                data, = struct.unpack('<B', f.read(1))
-                header["Map"][m]["RGB or LUT"] = data
-
-                if header["File version"] >= 5:
-                    # Expected binary data: variable length string
-                    data = read_variable_length_string(f)
-                    header["Map"][m]["LUT file"] = data
-                else:
-                    header["Map"][m]["LUT file"] = "<default>"
-
-                # Expected binary data: float (4 bytes)
-                data, = struct.unpack('<f', f.read(4))
-                header["Map"][m]["Color transparency"] = data
-
-            # Expected binary data: variable length string
-            data = read_variable_length_string(f)
-            header["Map"][m]["Name"] = data
+            header["Map"].append(_read_smp_map_header(f, header))
+            map_names.append(header["Map"][m]["Name"])
+            if maps is not None and m == header["Nr maps"] - 1:
+                check_maps(maps, header["Nr maps"], map_names)
 
             # -----------------------------------------------------------------
             # Read SMP data
             # -----------------------------------------------------------------
-            for v in range(header["Nr vertices"]):
-                data, = struct.unpack('<f', f.read(4))
-                data_smp[v, m] = data
+            # Expected binary data: float (4 bytes) x Nr vertices
+            if maps is None and zero_copy is not True:
+                read_data_array(f, '<f', header["Nr vertices"],
+                                out=data_smp[m])
+            elif is_map_selected(maps, m, map_names[m], header["Nr maps"]):
+                data_smp.append(
+                    read_data_array(f, '<f', header["Nr vertices"]))
+            else:
+                f.seek(header["Nr vertices"] * 4, 1)  # Skip map values
+
+    if maps is not None:
+        idx_maps = select_maps(maps, map_names)
+        header["Map"] = [header["Map"][m] for m in idx_maps]
+        header["Nr maps"] = len(idx_maps)
+    if isinstance(data_smp, list):
+        if data_smp:
+            data_smp = stack_arrays(data_smp)
+        else:
+            data_smp = np.empty((0, header["Nr vertices"]), dtype=np.float32)
+
+    return header, np.transpose(data_smp)
+
+
+# =============================================================================
+def read_smp_header(filename):
+    """Read BrainVoyager SMP file header without reading the map values.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Header containing SMP information. See "Map" entry to reach information
+        of individual maps. Such as their thresholds, color maps etc.
+
+    """
+    with open_file(filename) as f:
+        header = _read_smp_header(f)
+        header["Map"] = []
+        for m in range(header["Nr maps"]):
+            header["Map"].append(_read_smp_map_header(f, header))
+            f.seek(header["Nr vertices"] * 4, 1)  # Skip map values
+    return header
+
 
-    return header, data_smp
+def _read_smp_header(f):
+    """Read SMP header up to the first map."""
+    return _SMP_HEADER.read(f)
 
 
+def _read_smp_map_header(f, header):
+    """Read SMP map header, leaving the file at the start of the map values."""
+    map_header = dict()
+    _SMP_MAP_HEADER.read(f, ChainMap(map_header, header))
+    return map_header
+
+
+def _get_header_layout(f):
+    """Header parts as (key prefix, offset, schema, header) for patching."""
+    header = _read_smp_header(f)
+    layout = [((), 0, _SMP_HEADER, header)]
+    for m in range(header["Nr maps"]):
+        offset = f.tell()
+        map_header = _read_smp_map_header(f, header)
+        layout.append((("Map", m), offset, _SMP_MAP_HEADER,
+                       ChainMap(map_header, header)))
+        f.seek(header["Nr vertices"] * 4, 1)  # Skip map values
+    return layout
+
+
+# =============================================================================
 def write_smp(filename, header, data_smp):
     """Procecure to write BrainVoyager SMP file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Header containing SMP information. See "Map" entry to reach information
         of individual maps. Such as their thresholds, color maps etc.
@@ -166,101 +263,55 @@ def write_smp(filename, header, data_smp):
         Each vertex has a number of values corresponding to maps in the header.
 
     """
-    with open(filename, 'wb') as f:
-        # Expected binary data: short int (2 bytes)
-        data = header["File version"]
-        f.write(struct.pack('<h', data))
-
-        # Expected binary data: int (4 bytes)
-        data = header["Nr vertices"]
-        f.write(struct.pack('<i', data))
-
-        # Expected binary data: short int (2 bytes)
-        data = header["Nr maps"]
-        f.write(struct.pack('<h', data))
-
-        # Expected binary data: variable length string
-        data = header["SRF file"]
-        write_variable_length_string(f, data)
+    with create_file(filename) as f:
+        _SMP_HEADER.write(f, header)
 
         # ---------------------------------------------------------------------
         for m in range(header["Nr maps"]):
-            # Expected binary data: int (4 bytes)
-            data = header["Map"][m]["Map type"]
-            f.write(struct.pack('<i', data))
-
-            if header["File version"] >= 3 and header["Map"][m]["Map type"] == 3:
-                data = header["Map"][m]["CC nr lags"]
-                f.write(struct.pack('<i', data))
-                data = header["Map"][m]["CC min lag"]
-                f.write(struct.pack('<i', data))
-                data = header["Map"][m]["CC max lag"]
-                f.write(struct.pack('<i', data))
-                data = header["Map"][m]["CC overlay"]
-                f.write(struct.pack('<i', data))
-
-            data = header["Map"][m]["Cluster size"]
-            f.write(struct.pack('<i', data))
-
-            # Expected binary data: char (1 byte)
-            data = header["Map"][m]["Cluster checkbox"]
-            f.write(struct.pack('<B', data))
-
-            # Expected binary data: float (4 bytes)
-            data = header["Map"][m]["Threshold min"]
-            f.write(struct.pack('<f', data))
-            data = header["Map"][m]["Threshold max"]
-            f.write(struct.pack('<f', data))
-
-            if header["File version"] >= 4:
-                # Expected binary data: int (4 bytes)
-                data = header["Map"][m]["Threshold include greater than max"]
-                f.write(struct.pack('<i', data))
-
-            # Expected binary data: int (4 bytes)
-            data = header["Map"][m]["Degrees of freedom 1"]
-            f.write(struct.pack('<i', data))
-            data = header["Map"][m]["Degrees of freedom 2"]
-            f.write(struct.pack('<i', data))
-            data = header["Map"][m]["Show positive negative"]
-            f.write(struct.pack('<i', data))
-            data = header["Map"][m]["Bonferroni correction value"]
-            f.write(struct.pack('<i', data))
-
-            if header["File version"] >= 2:
-                # Expected binary data: char (1 byte) x 3
-                data = header["Map"][m]["RGB positive min"]
-                write_RGB_bytes(f, data)
-                data = header["Map"][m]["RGB positive max"]
-                write_RGB_bytes(f, data)
-
-                if header["File version"] >= 4:
-                    data = header["Map"][m]["RGB negative min"]
-                    write_RGB_bytes(f, data)
-                    data = header["Map"][m]["RGB negative max"]
-                    write_RGB_bytes(f, data)
-
-                # Expected binary data: char (1 byte)
-                data = header["Map"][m]["RGB or LUT"]
-                f.write(struct.pack('<B', data))
-
-                # Expected binary data: variable length string
-                data = header["Map"][m]["LUT file"]
-                write_variable_length_string(f, data)
-
-                # Expected binary data: float (4 bytes)
-                data = header["Map"][m]["Color transparency"]
-                f.write(struct.pack('<f', data))
-
-            # Expected binary data: variable length string
-            data = header["Map"][m]["Name"]
-            write_variable_length_string(f, data)
+            _SMP_MAP_HEADER.write(f, ChainMap(header["Map"][m], header))
 
             # -----------------------------------------------------------------
             # Write SMP data
             # -----------------------------------------------------------------
-            for v in range(header["Nr vertices"]):
-                f.write(struct.pack('<f', data_smp[v, m]))
+            write_data_array(f, data_smp[:header["Nr vertices"], m], '<f')
+
+
+# =============================================================================
+def append_smp_map(filename, map_header, values):
+    """Append a map to a BrainVoyager SMP file without rewriting it.
+
+    Parameters
+    ----------
+    filename : string
+        Path to (uncompressed) SMP file.
+    map_header : dictionary
+        Header of the new map, with the entries of a "Map" element of the
+        SMP header.
+    values : 1D numpy.array, [nr vertices]
+        Values of the new map.
+
+    Notes
+    -----
+    The map header and values are written at the end of the file, then the
+    number of maps is updated. Existing maps are not read or rewritten.
+
+    """
+    if not can_memmap(filename):
+        raise ValueError("Appending needs an uncompressed file path.")
+    with open(filename, 'r+b') as f:
+        header = _read_smp_header(f)
+        if np.shape(values) != (header["Nr vertices"],):
+            raise ValueError("Map needs {} values, got shape {}."
+                             .format(header["Nr vertices"], np.shape(values)))
+        f.seek(0, 2)
+        _SMP_MAP_HEADER.write(f, ChainMap(map_header, header))
+        write_data_array(f, values, '<f')
+
+        # NOTE: Only counted once the map is complete
+        header["Nr maps"] += 1
+        offset, _ = _SMP_HEADER.locate(header, "Nr maps")
+        f.seek(offset)
+        f.write(struct.pack('<h', header["Nr maps"]))
 
 
 def create_smp(nr_maps=1, nr_vertices=64000):
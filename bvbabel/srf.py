@@ -1,18 +1,69 @@
 """Read, write, create BrainVoyager SRF file format."""
 
 import struct
+import itertools
 import numpy as np
-from bvbabel.utils import read_variable_length_string, write_variable_length_string
+from bvbabel.utils import write_variable_length_string
+from bvbabel.utils import unpack_variable_length_string
+from bvbabel.utils import read_variable_length_string
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file
 
 
 # =============================================================================
-def read_srf(filename):
+# SRF header layout
+# =============================================================================
+def _is_version_1(header):
+    """Curvature colors are stored from SRF file version 1 on."""
+    return header["File version"] >= 1.0
+
+
+_SRF_HEADER = HeaderSchema([
+    # Expected binary data: float (4 bytes)
+    HeaderField("File version", 'f'),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("Surface type", 'i'),
+    HeaderField("Nr vertices", 'i'),
+    HeaderField("Nr triangles", 'i'),
+
+    # Expected binary data: float (4 bytes)
+    HeaderField("Mesh center X", 'f'),
+    HeaderField("Mesh center Y", 'f'),
+    HeaderField("Mesh center Z", 'f'),
+    ])
+
+_SRF_CURVATURE_COLORS = HeaderSchema([
+    # Expected binary data: float (4 bytes)
+    HeaderField("Vertex convex curvature R", 'f', _is_version_1),
+    HeaderField("Vertex convex curvature G", 'f', _is_version_1),
+    HeaderField("Vertex convex curvature B", 'f', _is_version_1),
+    HeaderField("Vertex convex curvature A", 'f', _is_version_1),
+
+    HeaderField("Vertex concave curvature R", 'f', _is_version_1),
+    HeaderField("Vertex concave curvature G", 'f', _is_version_1),
+    HeaderField("Vertex concave curvature B", 'f', _is_version_1),
+    HeaderField("Vertex concave curvature A", 'f', _is_version_1),
+    ])
+
+
+# =============================================================================
+def read_srf(filename, csr_neighbors=False, zero_copy=False):
     """Read BrainVoyager SRF file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    csr_neighbors : bool
+        When 'True', vertex neighbors are returned in compressed sparse row
+        (CSR) form instead of a list of lists. See "vertex neighbors" below.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
 
     Returns
     -------
@@ -30,83 +81,32 @@ def read_srf(filename):
         "vertex_neighbors" : list of lists, (nr vertices, nr neighbors)
             Other vertex members if the faces each vertex is a member of (int).
             Number of neighbors can vary but in conventional meshes they are
-            often 6 and occasionaly 5.
+            often 6 and occasionaly 5. First element of each list is the
+            number of neighbors.
+            When `csr_neighbors` is 'True', a tuple of two 1D numpy arrays
+            (indptr, indices) instead (int32). Neighbors of vertex i are
+            indices[indptr[i]:indptr[i + 1]].
         "strip sequence" : TODO.
             TODO.
 
     """
-    header = dict()
     mesh_data = dict()
-    with open(filename, 'rb') as f:
-        # Expected binary data: float (4 bytes)
-        data, = struct.unpack('<f', f.read(4))
-        header["File version"] = data
-
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["Surface type"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["Nr vertices"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["Nr triangles"] = data
-
-        # Expected binary data: float (4 bytes)
-        data, = struct.unpack('<f', f.read(4))
-        header["Mesh center X"] = data
-        data, = struct.unpack('<f', f.read(4))
-        header["Mesh center Y"] = data
-        data, = struct.unpack('<f', f.read(4))
-        header["Mesh center Z"] = data
+    with open_file(filename, zero_copy) as f:
+        header = _read_srf_header(f)
 
         # Vertex coordinates, Expected binary data: float (4 bytes)
-        vertices = np.zeros((header["Nr vertices"], 3), dtype=np.float32)
-        for i in range(header["Nr vertices"]):
-            data, = struct.unpack('<f', f.read(4))
-            vertices[i, 0] = data
-
-        for i in range(header["Nr vertices"]):
-            data, = struct.unpack('<f', f.read(4))
-            vertices[i, 1] = data
-
-        for i in range(header["Nr vertices"]):
-            data, = struct.unpack('<f', f.read(4))
-            vertices[i, 2] = data
-        mesh_data["vertices"] = vertices
+        # NOTE: All X coordinates are stored first, then all Y and all Z.
+        nr_vertices = header["Nr vertices"]
+        data = read_data_array(f, '<f', nr_vertices * 3)
+        mesh_data["vertices"] = np.transpose(
+            np.reshape(data, (3, nr_vertices)))
 
         # Vertex normals, Expected binary data: float (4 bytes)
-        vertex_normals = np.zeros((header["Nr vertices"], 3), dtype=np.float32)
-        for i in range(header["Nr vertices"]):
-            data, = struct.unpack('<f', f.read(4))
-            vertex_normals[i, 0] = data
-
-        for i in range(header["Nr vertices"]):
-            data, = struct.unpack('<f', f.read(4))
-            vertex_normals[i, 1] = data
-
-        for i in range(header["Nr vertices"]):
-            data, = struct.unpack('<f', f.read(4))
-            vertex_normals[i, 2] = data
-        mesh_data["vertex normals"] = vertex_normals
-
-        if header["File version"] >= 1.0:
-            # Expected binary data: float (4 bytes)
-            data, = struct.unpack('<f', f.read(4))
-            header["Vertex convex curvature R"] = data
-            data, = struct.unpack('<f', f.read(4))
-            header["Vertex convex curvature G"] = data
-            data, = struct.unpack('<f', f.read(4))
-            header["Vertex convex curvature B"] = data
-            data, = struct.unpack('<f', f.read(4))
-            header["Vertex convex curvature A"] = data
-
-            data, = struct.unpack('<f', f.read(4))
-            header["Vertex concave curvature R"] = data
-            data, = struct.unpack('<f', f.read(4))
-            header["Vertex concave curvature G"] = data
-            data, = struct.unpack('<f', f.read(4))
-            header["Vertex concave curvature B"] = data
-            data, = struct.unpack('<f', f.read(4))
-            header["Vertex concave curvature A"] = data
+        data = read_data_array(f, '<f', nr_vertices * 3)
+        mesh_data["vertex normals"] = np.transpose(
+            np.reshape(data, (3, nr_vertices)))
+
+        _read_srf_curvature_colors(f, header)
 
         # ---------------------------------------------------------------------
         # NOTE(Users Guide 2.3): MeshColor, sequence of color indices.
@@ -133,75 +133,211 @@ def read_srf(filename):
         # 1010 - 1019, the negative color bar indices are stored. The actual
         # colors are stored in the current functional look-up table.
 
-        vertex_colors = np.zeros((header["Nr vertices"], 4), dtype=np.float32)
-        for i in range(header["Nr vertices"]):
-            data, = struct.unpack('<i', f.read(4))
-            bytes = data.to_bytes(4, byteorder='little', signed=False)
+        # Expected binary data: int (4 bytes)
+        data = read_data_array(f, '<i', nr_vertices)
+        vertex_colors = np.zeros((nr_vertices, 4), dtype=np.float32)
+
+        idx = data >= 1056964608  # RGB colors
+        data_rgb = data[idx].view('<u4')
+        vertex_colors[idx, 0] = ((data_rgb >> 8) & 255) / 255.
+        vertex_colors[idx, 1] = ((data_rgb >> 16) & 255) / 255.
+        vertex_colors[idx, 2] = ((data_rgb >> 24) & 255) / 255.
+        vertex_colors[idx, 3] = (data_rgb & 255) / 255.
+
+        idx = data == 0  # convex curvature color
+        vertex_colors[idx, 0] = header["Vertex convex curvature R"]
+        vertex_colors[idx, 1] = header["Vertex convex curvature G"]
+        vertex_colors[idx, 2] = header["Vertex convex curvature B"]
+        vertex_colors[idx, 3] = header["Vertex convex curvature A"]
+
+        idx = data == 1  # concave curvature color
+        vertex_colors[idx, 0] = header["Vertex concave curvature R"]
+        vertex_colors[idx, 1] = header["Vertex concave curvature G"]
+        vertex_colors[idx, 2] = header["Vertex concave curvature B"]
+        vertex_colors[idx, 3] = header["Vertex concave curvature A"]
+
+        # TODO: Implement other indices too
+        if np.any((data < 1056964608) & (data != 0) & (data != 1)):
+            raise ValueError("Bad vertex color index! Should be 0, 1 or "
+                             ">=1056964608.")
 
-            if data >= 1056964608:
-                vertex_colors[i, 0] = bytes[1] / 255.
-                vertex_colors[i, 1] = bytes[2] / 255.
-                vertex_colors[i, 2] = bytes[3] / 255
-                vertex_colors[i, 3] = bytes[0] / 255.
+        # ---------------------------------------------------------------------
+        # NOTE: The rest of the file (nearest neighbors, faces, strip sequence
+        # and MTC name) is read at once and parsed from the memory buffer.
+        # Expected binary data: int (4 bytes)
+        buffer = f.read()
+        data = np.frombuffer(buffer, dtype='<i', count=len(buffer) // 4)
+
+        # Nearest neighbor data for each vertex, stored as the number of
+        # neighbors followed by the neighbor indices. Faces and the number of
+        # triangle strip elements follow.
+        nr_triangles = header["Nr triangles"]
+        indptr, idx_start = _walk_neighbors(
+            data[:max(data.size - nr_triangles * 3 - 1, 0)], nr_vertices)
+        if csr_neighbors is True:
+            indices = np.delete(data[:idx_start[-1]], idx_start[:-1])
+            mesh_data["vertex neighbors"] = (indptr.astype(np.int32),
+                                             indices.astype(np.int32))
+        else:
+            temp = data[:idx_start[-1]].tolist()
+            mesh_data["vertex neighbors"] = [
+                temp[i:j] for i, j in zip(idx_start[:-1], idx_start[1:])]
+        pos = idx_start[-1]
 
-            elif data == 0:  # convex curvature color
-                vertex_colors[i, 0] = header["Vertex convex curvature R"]
-                vertex_colors[i, 1] = header["Vertex convex curvature G"]
-                vertex_colors[i, 2] = header["Vertex convex curvature B"]
-                vertex_colors[i, 3] = header["Vertex convex curvature A"]
+        # ---------------------------------------------------------------------
+        # Sequence of three indices to constituting vertices of each triangle
+        faces = data[pos:pos + nr_triangles * 3].reshape((nr_triangles, 3))
+        mesh_data["faces"] = faces.astype(np.int32)
+        pos += nr_triangles * 3
 
-            elif data == 1:  # concave curvature color
-                vertex_colors[i, 0] = header["Vertex concave curvature R"]
-                vertex_colors[i, 1] = header["Vertex concave curvature G"]
-                vertex_colors[i, 2] = header["Vertex concave curvature B"]
-                vertex_colors[i, 3] = header["Vertex concave curvature A"]
+        # ---------------------------------------------------------------------
+        header["Nr triangle strip elements"] = int(data[pos])
+        pos += 1
+        if pos + header["Nr triangle strip elements"] > data.size:
+            raise ValueError("Unexpected end of file.")
+        temp = data[pos:pos + header["Nr triangle strip elements"]]
+        mesh_data["Strip sequence"] = temp.astype(np.int32)
+        pos += header["Nr triangle strip elements"]
 
-            # TODO: Implement other indices too
+        # Expected binary data: variable-length string
+        data, _ = unpack_variable_length_string(buffer, pos * 4)
+        header["MTC name"] = data
 
-            else:
-                raise("Bad vertex color index! Should be 0, 1 or >=1056964608.")
+    return header, mesh_data
 
-        # ---------------------------------------------------------------------
-        # Loop over nearest neighbor data for each vertex
-        temp = []
-        for i in range(header["Nr vertices"]):
-            temp.append([])
 
-            # Expected binary data: int (4 bytes)
-            N, = struct.unpack('<i', f.read(4))
-            temp[i].append(N)
+# =============================================================================
+def read_srf_header(filename):
+    """Read BrainVoyager SRF file header without reading the mesh data.
 
-            for n in range(N):  # Nearest neighbors
-                NN, = struct.unpack('<i', f.read(4))
-                temp[i].append(NN)
-        mesh_data["vertex neighbors"] = temp
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
 
-        # ---------------------------------------------------------------------
-        # Sequence of three indices to constituting vertices of each triangle
-        faces = np.zeros((header["Nr triangles"], 3), dtype=np.int32)
-        for i in range(header["Nr triangles"]):
-            # Expected binary data: int (4 bytes)
-            faces[i, 0], = struct.unpack('<i', f.read(4))
-            faces[i, 1], = struct.unpack('<i', f.read(4))
-            faces[i, 2], = struct.unpack('<i', f.read(4))
-        mesh_data["faces"] = faces
+    Returns
+    -------
+    header : dictionary
+        Pre-data and post-data headers.
+
+    Notes
+    -----
+    Nearest neighbor data has variable length, so it is walked through to
+    reach the post-data header ("Nr triangle strip elements", "MTC name").
+    Fixed size data (vertices, normals, colors, faces and the strip
+    sequence) is skipped.
+
+    """
+    with open_file(filename) as f:
+        header = _read_srf_header(f)
+        nr_vertices = header["Nr vertices"]
+        f.seek(nr_vertices * 6 * 4, 1)  # Skip vertices and vertex normals
+        _read_srf_curvature_colors(f, header)
+        f.seek(nr_vertices * 4, 1)  # Skip vertex colors
+        _skip_neighbors(f, nr_vertices)
+        f.seek(header["Nr triangles"] * 3 * 4, 1)  # Skip faces
 
-        # ---------------------------------------------------------------------
         # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["Nr triangle strip elements"] = data
-        if header["Nr triangle strip elements"] > 0:
-            temp = np.zeros(header["Nr triangle strip elements"], dtype=np.int32)
-            for i in range(header["Nr triangle strip elements"]):
-                data, = struct.unpack('<i', f.read(4))
-                temp[i] = data
-        mesh_data["Strip sequence"] = temp
+        data, = read_data_array(f, '<i', 1)
+        header["Nr triangle strip elements"] = int(data)
+        f.seek(header["Nr triangle strip elements"] * 4, 1)  # Skip strips
 
         # Expected binary data: variable-length string
-        data = read_variable_length_string(f)
-        header["MTC name"] = data
+        header["MTC name"] = read_variable_length_string(f)
+
+    return header
+
+
+def _read_srf_header(f):
+    """Read SRF header, leaving the file at the start of the vertices."""
+    return _SRF_HEADER.read(f)
 
-    return header, mesh_data
+
+def _read_srf_curvature_colors(f, header):
+    """Read convex and concave curvature colors into the header."""
+    return _SRF_CURVATURE_COLORS.read(f, header)
+
+
+def _walk_neighbors(data, nr_vertices):
+    """Find where the neighbor list of each vertex starts.
+
+    Parameters
+    ----------
+    data : 1D numpy.array
+        Integers starting at the nearest neighbor data of the SRF file.
+    nr_vertices : int
+        Number of vertices.
+
+    Returns
+    -------
+    indptr : 1D numpy.array, (nr_vertices + 1)
+        Neighbors of vertex i are counted from indptr[i] to indptr[i + 1] in
+        the concatenated neighbor indices.
+    idx_start : 1D numpy.array, (nr_vertices + 1)
+        Position of the number of neighbors of each vertex within `data`. Last
+        element is the position right after the nearest neighbor data.
+
+    """
+    idx_start = _find_list_starts(data, nr_vertices)
+    if idx_start[-1] > data.size:
+        raise ValueError("Unexpected end of file.")
+    _check_nr_neighbors(data[idx_start[:-1]])
+    indptr = idx_start - np.arange(nr_vertices + 1)
+    return indptr, idx_start
+
+
+def _skip_neighbors(f, nr_vertices, chunk_size=2**22):
+    """Read past the nearest neighbor data, in chunks of `chunk_size` bytes."""
+    data = np.empty(0, dtype='<i')
+    nr_left = nr_vertices
+    while nr_left > 0:
+        # NOTE: Each list has at least one integer, so that reading at most
+        # `nr_left` integers does not read past the nearest neighbor data.
+        count = min(chunk_size // 4, nr_left)
+        data = np.concatenate([data, read_data_array(f, '<i', count)])
+        idx_start = _find_list_starts(data, min(data.size, nr_left))
+        nr_done = np.count_nonzero(idx_start <= data.size) - 1
+        _check_nr_neighbors(data[idx_start[:nr_done]])
+        nr_left -= nr_done
+        data = data[idx_start[nr_done]:]
+
+
+def _find_list_starts(data, nr_lists, nr_jumps=5):
+    """Positions of the first `nr_lists` neighbor lists within `data`.
+
+    Lists are stored as the number of neighbors followed by the neighbor
+    indices. Positions of lists starting past the end of `data` are
+    `data.size + 1`. The list starts are found in steps of 2**nr_jumps
+    lists, the lists in between are filled in for all steps at once.
+
+    """
+    # Start of the next list for a list starting at each position
+    nr_ints = data.size
+    nxt = np.arange(1, nr_ints + 3, dtype=np.int64)
+    nxt[:nr_ints] += data
+    np.clip(nxt, 0, nr_ints + 1, out=nxt)
+    nxt[nr_ints] = nr_ints + 1
+
+    far = nxt
+    for _ in range(nr_jumps):
+        far = far[far]
+    step = 2 ** nr_jumps
+    nr_steps = nr_lists // step + 1
+    idx_start = np.empty((step, nr_steps), dtype=np.int64)
+    pos = 0
+    for i in range(nr_steps):
+        idx_start[0, i] = pos
+        pos = far.item(pos)
+    for j in range(1, step):
+        np.take(nxt, idx_start[j - 1], out=idx_start[j])
+    return np.ravel(np.transpose(idx_start))[:nr_lists + 1]
+
+
+def _check_nr_neighbors(nr_neighbors):
+    """Raise on negative numbers of neighbors."""
+    if np.any(nr_neighbors < 0):
+        raise ValueError("Bad number of vertex neighbors! Should be >= 0.")
 
 
 # =============================================================================
@@ -210,8 +346,9 @@ def write_srf(filename, header, mesh_data):
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Pre-data and post-data headers.
     mesh_data : dictionary
@@ -226,104 +363,56 @@ def write_srf(filename, header, mesh_data):
         "vertex_neighbors" : list of lists, (nr vertices, nr neighbors)
             Other vertex members if the faces each vertex is a member of (int).
             Number of neighbors can vary but in conventional meshes they are
-            often 6 and occasionaly 5.
+            often 6 and occasionaly 5. First element of each list is the
+            number of neighbors.
+            A tuple of (indptr, indices) numpy arrays, as returned by
+            `read_srf(..., csr_neighbors=True)`, is also accepted.
         "strip sequence" : TODO.
             TODO.
 
     """
-    with open(filename, 'wb') as f:
-        # Expected binary data: float (4 bytes)
-        data = header["File version"]
-        f.write(struct.pack('<f', data))
-
-        # Expected binary data: int (4 bytes)
-        data = header["Surface type"]
-        f.write(struct.pack('<i', data))
-        data = header["Nr vertices"]
-        f.write(struct.pack('<i', data))
-        data = header["Nr triangles"]
-        f.write(struct.pack('<i', data))
-
-        # Expected binary data: float (4 bytes)
-        data = header["Mesh center X"]
-        f.write(struct.pack('<f', data))
-        data = header["Mesh center Y"]
-        f.write(struct.pack('<f', data))
-        data = header["Mesh center Z"]
-        f.write(struct.pack('<f', data))
+    with create_file(filename) as f:
+        _SRF_HEADER.write(f, header)
 
         # Vertex coordinates, Expected binary data: float (4 bytes)
-        for i in range(header["Nr vertices"]):
-            data = mesh_data["vertices"][i, 0]
-            f.write(struct.pack('<f', data))
-
-        for i in range(header["Nr vertices"]):
-            data = mesh_data["vertices"][i, 1]
-            f.write(struct.pack('<f', data))
-
-        for i in range(header["Nr vertices"]):
-            data = mesh_data["vertices"][i, 2]
-            f.write(struct.pack('<f', data))
+        # NOTE: All X coordinates are stored first, then all Y and all Z.
+        data = mesh_data["vertices"][:header["Nr vertices"], :]
+        write_data_array(f, np.transpose(data), '<f')
 
         # Vertex normals, Expected binary data: float (4 bytes)
-        vertex_normals = np.zeros((header["Nr vertices"], 3), dtype=np.float32)
-        for i in range(header["Nr vertices"]):
-            data = mesh_data["vertex normals"][i, 0]
-            f.write(struct.pack('<f', data))
-
-        for i in range(header["Nr vertices"]):
-            data = mesh_data["vertex normals"][i, 1]
-            f.write(struct.pack('<f', data))
-
-        for i in range(header["Nr vertices"]):
-            data = mesh_data["vertex normals"][i, 2]
-            f.write(struct.pack('<f', data))
-
-        if header["File version"] >= 1.0:
-            # Expected binary data: float (4 bytes)
-            data = header["Vertex convex curvature R"]
-            f.write(struct.pack('<f', data))
-            data = header["Vertex convex curvature G"]
-            f.write(struct.pack('<f', data))
-            data = header["Vertex convex curvature B"]
-            f.write(struct.pack('<f', data))
-            data = header["Vertex convex curvature A"]
-            f.write(struct.pack('<f', data))
-
-            data = header["Vertex concave curvature R"]
-            f.write(struct.pack('<f', data))
-            data = header["Vertex concave curvature G"]
-            f.write(struct.pack('<f', data))
-            data = header["Vertex concave curvature B"]
-            f.write(struct.pack('<f', data))
-            data = header["Vertex concave curvature A"]
-            f.write(struct.pack('<f', data))
+        data = mesh_data["vertex normals"][:header["Nr vertices"], :]
+        write_data_array(f, np.transpose(data), '<f')
+
+        _SRF_CURVATURE_COLORS.write(f, header)
 
         # ---------------------------------------------------------------------
         # Write vertex coloring data
         # NOTE[Faruk]: Give constant color to all vertices for now. The
         # vertex color structure is a bit complicated (see read_srf above).
-        for i in range(header["Nr vertices"]):
-            data = 127
-            f.write(struct.pack('<i', data))
+        data = np.full(header["Nr vertices"], 127)
+        write_data_array(f, data, '<i')
 
         # ---------------------------------------------------------------------
         # Write nearest neighbour data for each vertex
-        for i in mesh_data["vertex neighbors"]:
-            for j in i:
-                # Expected binary data: int (4 bytes)
-                f.write(struct.pack('<i', j))
+        # Expected binary data: int (4 bytes)
+        data = mesh_data["vertex neighbors"]
+        if isinstance(data, tuple):  # CSR (indptr, indices)
+            indptr, indices = data
+            nr_neighbors = np.diff(indptr)
+            idx_start = indptr[:-1] + np.arange(nr_neighbors.size)
+            temp = np.zeros(indices.size + nr_neighbors.size, dtype=np.int64)
+            temp[idx_start] = nr_neighbors
+            temp[np.delete(np.arange(temp.size), idx_start)] = indices
+        else:
+            temp = itertools.chain.from_iterable(data)
+            temp = np.fromiter(temp, dtype=np.int64)
+        write_data_array(f, temp, '<i')
 
         # ---------------------------------------------------------------------
         # Write sequence of three indices to constituting triangles
-        for i in range(header["Nr triangles"]):
-            # Expected binary data: int (4 bytes)
-            data = mesh_data["faces"][i, 0]
-            f.write(struct.pack('<i', data))
-            data = mesh_data["faces"][i, 1]
-            f.write(struct.pack('<i', data))
-            data = mesh_data["faces"][i, 2]
-            f.write(struct.pack('<i', data))
+        # Expected binary data: int (4 bytes)
+        data = mesh_data["faces"][:header["Nr triangles"], :]
+        write_data_array(f, data, '<i')
 
         # ---------------------------------------------------------------------
         # # Expected binary data: int (4 bytes)
@@ -1,17 +1,38 @@
 """Read, write, create BrainVoyager SSM file format."""
 
-import struct
-import numpy as np
+from bvbabel.utils import open_file, read_data_array
+from bvbabel.utils import HeaderField, HeaderSchema
 
 
 # =============================================================================
-def read_ssm(filename):
+# SSM header layout
+# =============================================================================
+_SSM_HEADER = HeaderSchema([
+    # -------------------------------------------------------------------------
+    # Header
+    # -------------------------------------------------------------------------
+    # Expected binary data: short int (2 bytes)
+    HeaderField("File version", 'h'),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("Nr vertices 1", 'i'),
+    HeaderField("Nr vertices 2", 'i'),  # Referenced mesh number of vertices
+    ])
+
+
+# =============================================================================
+def read_ssm(filename, zero_copy=False):
     """Read BrainVoyager SSM (surface to surface mapping) file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
 
     Returns
     -------
@@ -21,26 +42,39 @@ def read_ssm(filename):
         TODO.
 
     """
-    header = dict()
-    with open(filename, 'rb') as f:
-        # ---------------------------------------------------------------------
-        # Header
-        # ---------------------------------------------------------------------
-        # Expected binary data: short int (2 bytes)
-        data, = struct.unpack('<h', f.read(2))
-        header["File version"] = data
-
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["Nr vertices 1"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["Nr vertices 2"] = data  # Referenced mesh number of vertices
+    with open_file(filename, zero_copy) as f:
+        header = _read_ssm_header(f)
 
         # ---------------------------------------------------------------------
         # Data
         # ---------------------------------------------------------------------
-        data_ssm = np.zeros(header["Nr vertices 1"])
-        for i in range(header["Nr vertices 1"]):
-            data_ssm[i], = struct.unpack('<f', f.read(4))
+        # Expected binary data: float (4 bytes)
+        data_ssm = read_data_array(f, '<f', header["Nr vertices 1"])
 
     return header, data_ssm
+
+
+# =============================================================================
+def read_ssm_header(filename):
+    """Read BrainVoyager SSM file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        TODO.
+
+    """
+    with open_file(filename) as f:
+        header = _read_ssm_header(f)
+    return header
+
+
+def _read_ssm_header(f):
+    """Read SSM header, leaving the file at the start of the data."""
+    return _SSM_HEADER.read(f)
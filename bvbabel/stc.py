@@ -1,17 +1,20 @@
 """Read, write, create BrainVoyager STC file format."""
 
-import struct
 import numpy as np
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import create_file
 
 
 # =============================================================================
-def read_stc(filename, nr_slices, nr_volumes, res_x, res_y, data_type=2):
+def read_stc(filename, nr_slices, nr_volumes, res_x, res_y, data_type=2,
+             zero_copy=False):
     """Read BrainVoyager STC file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
     nr_slices: integer
         Number of slices in each measurement. Referred to as "NrOfSlices"
         within the FMR text file.
@@ -28,6 +31,9 @@ def read_stc(filename, nr_slices, nr_volumes, res_x, res_y, data_type=2):
         Each data element (intensity value) is represented either in 2 bytes
         (unsigned short) or in 4 bytes (float, default) as determined by the
         "DataType" entry in the FMR file.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and the data is
+        returned as a view into the (copy-on-write) mapping instead of a copy.
 
     Returns
     -------
@@ -36,11 +42,14 @@ def read_stc(filename, nr_slices, nr_volumes, res_x, res_y, data_type=2):
 
     """
     if data_type == 1:
-        data_img = np.fromfile(filename, dtype="<H", count=-1, sep="",
-                               offset=0)
+        dtype = "<H"
     elif data_type == 2:
-        data_img = np.fromfile(filename, dtype="<f", count=-1, sep="",
-                               offset=0)
+        dtype = "<f"
+    else:
+        raise ValueError("Unrecognized STC data_img type.")
+    with open_file(filename, zero_copy) as f:
+        data_img = read_data_array(f, dtype,
+                                   nr_slices * nr_volumes * res_x * res_y)
 
     data_img = np.reshape(data_img, (nr_slices, nr_volumes, res_x, res_y))
     data_img = np.transpose(data_img, (3, 2, 0, 1))
@@ -55,8 +64,9 @@ def write_stc(filename, data_img, data_type=2):
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     data_img : 4D numpy.array, (x, y, slices, time)
         Image data.
     data_type: integer, 1 or 2
@@ -67,16 +77,13 @@ def write_stc(filename, data_img, data_type=2):
     """
     data_img = data_img[:, ::-1, :, :]  # Flip BV axes
     data_img = np.transpose(data_img, (2, 3, 1, 0))
-    data_img = data_img.flatten()
 
-    with open(filename, 'wb') as f:
+    with create_file(filename) as f:
         if data_type == 1:
-            for i in range(data_img.size):
-                f.write(struct.pack('<H', data_img[i]))
+            write_data_array(f, data_img, '<H')
         elif data_type == 2:
-            for i in range(data_img.size):
-                f.write(struct.pack('<f', data_img[i]))
+            write_data_array(f, data_img, '<f')
         else:
-            raise("Unrecognized VTC data_img type.")
+            raise ValueError("Unrecognized STC data_img type.")
 
-    return data_img
+    return data_img.flatten()
@@ -0,0 +1,68 @@
+"""Test bvbabel batch reading."""
+
+import os
+import pytest
+import numpy as np
+import bvbabel
+from bvbabel.tests.test_gzip import _assert_equal
+
+DIR_TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "..",
+                             "test_data")
+FILES = [
+    "sub-test03_cube.vmr.gz",
+    "sub-test02_left_hemisphere_4_curvature_maps.smp.gz",
+    "sub-test03.vtc.gz",
+    "sub-test03_cube.srf.gz",
+    "sub-test03_cube.vmr.gz",
+    ]
+
+
+# =============================================================================
+@pytest.mark.parametrize("ordered", [True, False])
+def test_read_many(ordered):
+    """Test batch reading matches reading the files one by one."""
+    paths = [os.path.join(DIR_TEST_DATA, name) for name in FILES]
+    result = list(bvbabel.read_many(paths, workers=2, ordered=ordered))
+
+    assert len(result) == len(paths)
+    if ordered:
+        assert [r[0] for r in result] == paths
+    for path, header, data in result:
+        kind = bvbabel.batch.get_file_kind(path)
+        header1, data1 = getattr(getattr(bvbabel, kind), "read_" + kind)(path)
+        _assert_equal(header, header1)
+        _assert_equal(data, data1)
+
+
+def test_read_many_kind():
+    """Test batch reading of file contents with a given file format."""
+    path = os.path.join(DIR_TEST_DATA, "sub-test03_cube.vmr.gz")
+    with open(path, "rb") as f:
+        content = f.read()
+    _, data = bvbabel.vmr.read_vmr(path)
+    for _, _, data1 in bvbabel.read_many([content] * 3, kind="vmr"):
+        assert np.array_equal(data, data1)
+
+    with pytest.raises(ValueError):
+        list(bvbabel.read_many([path], kind="xyz"))
+    with pytest.raises(ValueError):
+        list(bvbabel.read_many(["test.xyz.gz"]))
+
+
+def test_read_many_kwargs():
+    """Test reader arguments are only passed to the readers accepting them."""
+    paths = [os.path.join(DIR_TEST_DATA, name) for name in FILES]
+    pool = bvbabel.BufferPool()
+    result = list(bvbabel.read_many(paths, workers=2, maps=[0], out=pool))
+    assert len(result) == len(paths)
+    for path, header, data in result:
+        kind = bvbabel.batch.get_file_kind(path)
+        read = getattr(getattr(bvbabel, kind), "read_" + kind)
+        header1, data1 = read(path, maps=[0]) if kind == "smp" else read(path)
+        _assert_equal(header, header1)
+        _assert_equal(data, data1)
+
+    with pytest.raises(TypeError):
+        list(bvbabel.read_many(paths, mapz=[0]))
+    with pytest.raises(TypeError):
+        list(bvbabel.read_many(paths[:1], kind="vmr", maps=[0]))
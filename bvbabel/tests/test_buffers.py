@@ -0,0 +1,129 @@
+"""Test bvbabel readers and writers with in-memory buffers."""
+
+import io
+import os
+import gzip
+import pytest
+import numpy as np
+import bvbabel
+from bvbabel.tests.test_gzip import _assert_equal
+
+DIR_TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "..",
+                             "test_data")
+
+
+# =============================================================================
+@pytest.mark.parametrize("fmt, name", [
+    ("vmr", "sub-test03_cube.vmr.gz"),
+    ("vtc", "sub-test03.vtc.gz"),
+    ("srf", "sub-test03_cube.srf.gz"),
+    ("smp", "sub-test02_left_hemisphere_4_curvature_maps.smp.gz"),
+    ("mtc", "sub-test03_cube.mtc.gz"),
+    ])
+@pytest.mark.parametrize("zero_copy", [True, False])
+def test_read_bytes(fmt, name, zero_copy):
+    """Test reading binary formats from bytes-like objects."""
+    read = getattr(getattr(bvbabel, fmt), "read_" + fmt)
+    filename = os.path.join(DIR_TEST_DATA, name)
+    result = read(filename)
+    with open(filename, "rb") as f:
+        content_gz = f.read()
+    content = gzip.decompress(content_gz)
+
+    for buffer in [content, bytearray(content), memoryview(content),
+                   content_gz]:
+        result_buffer = read(buffer, zero_copy=zero_copy)
+        _assert_equal(result, result_buffer)
+        data = result_buffer[1]
+        if isinstance(data, np.ndarray) and zero_copy is False:
+            assert data.flags.writeable
+
+
+def test_read_vtc_bytes_partial():
+    """Test partial VTC reading from bytes."""
+    filename = os.path.join(DIR_TEST_DATA, "sub-test03.vtc.gz")
+    with gzip.open(filename, "rb") as f:
+        content = f.read()
+    kwargs = {"bbox": (1, 3, 0, 4, 2, 4), "volumes": slice(1, 3)}
+    _, data1 = bvbabel.vtc.read_vtc(filename, **kwargs)
+    _, data2 = bvbabel.vtc.read_vtc(content, **kwargs)
+    assert np.array_equal(data1, data2)
+    with pytest.raises(ValueError):
+        bvbabel.vtc.read_vtc(content, mmap=True)
+
+
+@pytest.mark.parametrize("fmt, name", [
+    ("voi", "sub-test03.voi"), ("poi", "sub-test03_cube.poi"),
+    ("sdm", "sub-test04.sdm"), ("prt", "sub-test05.prt"),
+    ])
+def test_text_buffers(fmt, name):
+    """Test reading and writing text formats with buffers."""
+    module = getattr(bvbabel, fmt)
+    filename = os.path.join(DIR_TEST_DATA, name)
+    result = getattr(module, "read_" + fmt)(filename)
+    with open(filename, "r") as f:
+        content = f.read()
+    _assert_equal(result, getattr(module, "read_" + fmt)(content.encode()))
+    _assert_equal(result,
+                  getattr(module, "read_" + fmt)(io.StringIO(content)))
+
+    if hasattr(module, "write_" + fmt):
+        f_text = io.StringIO()
+        getattr(module, "write_" + fmt)(f_text, *result)
+        f_bytes = io.BytesIO()
+        getattr(module, "write_" + fmt)(f_bytes, *result)
+        assert f_bytes.getvalue() == f_text.getvalue().encode()
+
+
+def test_write_text_file_object():
+    """Test writing binary formats through the buffer of a text file."""
+    header, data = bvbabel.smp.create_smp(nr_maps=2, nr_vertices=10)
+    f_bytes = io.BytesIO()
+    bvbabel.smp.write_smp(f_bytes, header, data)
+    f_text = io.TextIOWrapper(io.BytesIO())
+    bvbabel.smp.write_smp(f_text, header, data)
+    assert f_text.buffer.getvalue() == f_bytes.getvalue()
+
+
+# =============================================================================
+@pytest.mark.parametrize("fmt, name", [
+    ("vmr", "sub-test03_cube.vmr.gz"),
+    ("vtc", "sub-test03.vtc.gz"),
+    ])
+def test_read_out(fmt, name):
+    """Test reading data into preallocated arrays."""
+    filename = os.path.join(DIR_TEST_DATA, name)
+    read = getattr(getattr(bvbabel, fmt), "read_" + fmt)
+    _, data = read(filename)
+
+    out = np.empty(data.size, dtype=data.dtype)
+    _, data_out = read(filename, out=out)
+    assert np.array_equal(data, data_out)
+    assert np.shares_memory(data_out, out)
+
+    with pytest.raises(ValueError):
+        read(filename, out=np.empty(data.size + 1, dtype=data.dtype))
+    with pytest.raises(ValueError):
+        read(filename, out=np.empty(data.size, dtype=np.float64))
+
+
+def test_buffer_pool():
+    """Test recycling of read buffers across files."""
+    filename = os.path.join(DIR_TEST_DATA, "sub-test03.vtc.gz")
+    _, data = bvbabel.vtc.read_vtc(filename)
+
+    pool = bvbabel.BufferPool()
+    _, data1 = bvbabel.vtc.read_vtc(filename, out=pool)
+    _, data2 = bvbabel.vtc.read_vtc(filename, out=pool)
+    assert np.array_equal(data, data1)
+    assert not np.shares_memory(data1, data2)
+
+    pool.release(data1)
+    _, data3 = bvbabel.vtc.read_vtc(filename, out=pool)
+    assert np.array_equal(data, data3)
+    assert np.shares_memory(data1, data3)
+
+    with pytest.raises(ValueError):
+        pool.release(data)
+    with pytest.raises(ValueError):
+        bvbabel.vtc.read_vtc(filename, out=pool, volumes=[0])
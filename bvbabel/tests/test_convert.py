@@ -0,0 +1,78 @@
+"""Test bvbabel directory tree conversion."""
+
+import os
+import gzip
+import shutil
+import numpy as np
+import bvbabel
+from bvbabel.convert import convert_tree, main
+
+DIR_TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "..",
+                             "test_data")
+
+
+# =============================================================================
+def test_convert_tree(tmp_path):
+    """Test conversion and skipping of unchanged inputs."""
+    in_dir = tmp_path / "in"
+    os.makedirs(str(in_dir / "sub-01"))
+    shutil.copy(os.path.join(DIR_TEST_DATA, "sub-test03_cube.vmr.gz"),
+                str(in_dir / "sub-01" / "anat.vmr.gz"))
+    shutil.copy(os.path.join(DIR_TEST_DATA, "sub-test03_cube.srf.gz"),
+                str(in_dir / "surf.srf.gz"))
+    out_dir = str(tmp_path / "out")
+
+    counts = convert_tree(str(in_dir), out_dir, workers=2)
+    assert counts == {"converted": 2, "skipped": 0, "failed": 0}
+    _, data = bvbabel.vmr.read_vmr(str(in_dir / "sub-01" / "anat.vmr.gz"))
+    _, data_nii = bvbabel.nifti.read_nifti(
+        os.path.join(out_dir, "sub-01", "anat_vmr.nii.gz"))
+    assert np.array_equal(data, data_nii)
+    assert os.path.exists(os.path.join(out_dir, "surf_srf.obj"))
+
+    # Unchanged, touched (content is hashed) and changed inputs
+    counts = convert_tree(str(in_dir), out_dir, workers=2)
+    assert counts == {"converted": 0, "skipped": 2, "failed": 0}
+    os.utime(str(in_dir / "surf.srf.gz"), ns=(0, 0))
+    counts = convert_tree(str(in_dir), out_dir, workers=2)
+    assert counts == {"converted": 0, "skipped": 2, "failed": 0}
+    shutil.copy(os.path.join(DIR_TEST_DATA, "sub-test03_cube.vmr.gz"),
+                str(in_dir / "surf.srf.gz"))
+    assert main([str(in_dir), "-o", out_dir, "-j", "2"]) == 1
+
+
+def test_convert_tree_output_collision(tmp_path):
+    """Test inputs with the same output are reported, not overwritten."""
+    in_dir = str(tmp_path)
+    filename = os.path.join(DIR_TEST_DATA, "sub-test03_cube.vmr.gz")
+    shutil.copy(filename, os.path.join(in_dir, "x.vmr.gz"))
+    with gzip.open(filename, "rb") as f_in:
+        with open(os.path.join(in_dir, "x.vmr"), "wb") as f_out:
+            f_out.write(f_in.read())
+
+    counts = convert_tree(in_dir, workers=1)
+    assert counts == {"converted": 1, "skipped": 0, "failed": 1}
+    assert os.path.exists(os.path.join(in_dir, "x_vmr.nii.gz"))
+
+
+def test_convert_tree_dotted_names(tmp_path):
+    """Test names with dots keep their own outputs and manifest entries."""
+    in_dir = str(tmp_path / "in")
+    out_dir = str(tmp_path / "out")
+    os.makedirs(in_dir)
+    filename = os.path.join(DIR_TEST_DATA, "sub-test03_cube.vmr.gz")
+    for name in ["sub.run1.vmr.gz", "sub.run2.vmr.gz"]:
+        shutil.copy(filename, os.path.join(in_dir, name))
+
+    counts = convert_tree(in_dir, out_dir, workers=1)
+    assert counts == {"converted": 2, "skipped": 0, "failed": 0}
+    for name in ["sub.run1_vmr.nii.gz", "sub.run2_vmr.nii.gz"]:
+        assert os.path.exists(os.path.join(out_dir, name))
+
+    # Deleted inputs are dropped from the manifest
+    os.remove(os.path.join(in_dir, "sub.run2.vmr.gz"))
+    counts = convert_tree(in_dir, out_dir, workers=1, kinds=["srf"])
+    assert counts == {"converted": 0, "skipped": 0, "failed": 0}
+    manifest = bvbabel.convert.load_manifest(
+        os.path.join(out_dir, bvbabel.convert.MANIFEST_NAME))
+    assert list(manifest) == ["sub.run1.vmr.gz"]
@@ -0,0 +1,195 @@
+"""Test bvbabel reading and writing of gzip files and file objects."""
+
+import io
+import os
+import gzip
+import pytest
+import numpy as np
+import bvbabel
+from bvbabel.tests.test_vmp import _create_vmp
+
+DIR_TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "..",
+                             "test_data")
+
+
+def _gunzip(filename, tmp_path):
+    """Decompress test data into a temporary directory."""
+    outname = str(tmp_path / os.path.basename(filename)[:-3])
+    with gzip.open(filename, "rb") as f_in, open(outname, "wb") as f_out:
+        f_out.write(f_in.read())
+    return outname
+
+
+def _assert_equal(a, b):
+    """Compare nested headers and data of the readers."""
+    if isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for key in a:
+            _assert_equal(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for i, j in zip(a, b):
+            _assert_equal(i, j)
+    else:
+        assert np.array_equal(a, b)
+
+
+# =============================================================================
+@pytest.mark.parametrize("fmt, name", [
+    ("vmr", "sub-test03_cube.vmr.gz"),
+    ("vmr", "sub-test01_fileversion-2.vmr.gz"),
+    ("vtc", "sub-test03.vtc.gz"),
+    ("srf", "sub-test03_cube.srf.gz"),
+    ("smp", "sub-test02_left_hemisphere_4_curvature_maps.smp.gz"),
+    ("mtc", "sub-test03_cube.mtc.gz"),
+    ])
+@pytest.mark.parametrize("zero_copy", [True, False])
+def test_read_gzip(tmp_path, fmt, name, zero_copy):
+    """Test reading compressed files against decompressed files."""
+    read = getattr(getattr(bvbabel, fmt), "read_" + fmt)
+    filename = os.path.join(DIR_TEST_DATA, name)
+    result_plain = read(_gunzip(filename, tmp_path))
+    _assert_equal(result_plain, read(filename, zero_copy=zero_copy))
+    with gzip.open(filename, "rb") as f:
+        _assert_equal(result_plain, read(f, zero_copy=zero_copy))
+        assert not f.closed
+
+
+@pytest.mark.parametrize("fmt, name", [
+    ("vmr", "sub-test03_cube.vmr.gz"),
+    ("vtc", "sub-test03.vtc.gz"),
+    ("srf", "sub-test03_cube.srf.gz"),
+    ("smp", "sub-test02_left_hemisphere_4_curvature_maps.smp.gz"),
+    ])
+def test_write_gzip(tmp_path, fmt, name):
+    """Test writing compressed files and file objects."""
+    module = getattr(bvbabel, fmt)
+    filename = _gunzip(os.path.join(DIR_TEST_DATA, name), tmp_path)
+    header, data = getattr(module, "read_" + fmt)(filename)
+    write = getattr(module, "write_" + fmt)
+    write(filename, header, data)
+    with open(filename, "rb") as f:
+        expected = f.read()
+
+    write(filename + ".gz", header, data)
+    with gzip.open(filename + ".gz", "rb") as f:
+        assert f.read() == expected
+
+    f = io.BytesIO()
+    write(f, header, data)
+    assert f.getvalue() == expected
+
+
+@pytest.mark.parametrize("fmt, name", [
+    ("voi", "sub-test03.voi"), ("poi", "sub-test03_cube.poi"),
+    ("sdm", "sub-test04.sdm"), ("prt", "sub-test05.prt"),
+    ])
+def test_text_gzip(tmp_path, fmt, name):
+    """Test reading text formats from compressed files and file objects."""
+    read = getattr(getattr(bvbabel, fmt), "read_" + fmt)
+    filename = os.path.join(DIR_TEST_DATA, name)
+    result = read(filename)
+
+    with open(filename, "rb") as f_in:
+        content = f_in.read()
+    with gzip.open(str(tmp_path / (name + ".gz")), "wb") as f_out:
+        f_out.write(content)
+    _assert_equal(result, read(str(tmp_path / (name + ".gz"))))
+    _assert_equal(result, read(io.BytesIO(content)))
+
+    if hasattr(getattr(bvbabel, fmt), "write_" + fmt):
+        write = getattr(getattr(bvbabel, fmt), "write_" + fmt)
+        write(str(tmp_path / name), *result)
+        write(str(tmp_path / (name + ".gz")), *result)
+        with open(str(tmp_path / name), "rb") as f1, \
+                gzip.open(str(tmp_path / (name + ".gz")), "rb") as f2:
+            assert f1.read() == f2.read()
+
+
+def test_threaded_gzip_writer(tmp_path):
+    """Test chunking and queueing of the background gzip writer."""
+    filename = str(tmp_path / "test.gz")
+    data = np.random.randint(0, 255, size=10**5, dtype=np.uint8)
+    with bvbabel.utils.ThreadedGzipWriter(filename, chunk_size=1000,
+                                          queue_size=2) as f:
+        for i in range(0, data.size, 777):
+            f.write(data[i:i + 777])
+    assert f.closed
+    with gzip.open(filename, "rb") as f:
+        assert f.read() == data.tobytes()
+
+
+def test_read_data_array_chunks():
+    """Test reading data arrays in chunks and detecting truncated files."""
+    data = np.arange(1000, dtype='<f')
+    f = io.BytesIO(data.tobytes())
+    result = bvbabel.utils.read_data_array(f, '<f', 1000, chunk_size=7)
+    assert np.array_equal(data, result)
+    with pytest.raises(ValueError):
+        bvbabel.utils.read_data_array(io.BytesIO(data.tobytes()), '<f', 1001)
+
+
+def test_vtc_mmap_gzip():
+    """Test that memory mapping compressed files is rejected."""
+    with pytest.raises(ValueError):
+        bvbabel.vtc.read_vtc(os.path.join(DIR_TEST_DATA, "sub-test03.vtc.gz"),
+                             mmap=True)
+
+
+def test_gzip_index(tmp_path):
+    """Test random access through gzip index checkpoints."""
+    data = np.random.randint(0, 20, size=10**6, dtype=np.uint8).tobytes()
+    filename = str(tmp_path / "test.gz")
+    with bvbabel.utils.ThreadedGzipWriter(filename, chunk_size=2**14,
+                                          flush_interval=2**16) as f:
+        f.write(data)
+    # Second member without flush points
+    with open(filename, "ab") as f:
+        f.write(gzip.compress(data[:2**18]))
+    data += data[:2**18]
+
+    index = bvbabel.utils.load_gzip_index(filename, spacing=2**17)
+    assert len(index.points) > 5
+    assert os.path.isfile(filename + ".idx")
+    index_loaded = bvbabel.utils.load_gzip_index(filename)
+    assert [p[:2] for p in index_loaded.points] == \
+        [p[:2] for p in index.points]
+
+    with io.BufferedReader(
+            bvbabel.utils.IndexedGzipReader(filename, index_loaded)) as f:
+        for offset in [900000, 10, 2**17 + 5, 400000, 1100000, 0]:
+            f.seek(offset)
+            assert f.read(1000) == data[offset:offset + 1000]
+        f.seek(index.points[-2][1])
+        assert f.read() == data[index.points[-2][1]:]
+
+
+@pytest.mark.parametrize("gzip_index", [False, True])
+@pytest.mark.parametrize("rearrange_data_axes", [True, False])
+def test_vtc_bbox_gzip(tmp_path, gzip_index, rearrange_data_axes):
+    """Test partial VTC reading from compressed files."""
+    header, _ = bvbabel.vtc.create_vtc(rearrange_data_axes=False)
+    header.update({"XEnd": header["XStart"] + 6, "YEnd": header["YStart"] + 5,
+                   "ZEnd": header["ZStart"] + 4, "Nr time points": 7})
+    data = np.arange(4 * 5 * 6 * 7, dtype=np.short).reshape((4, 5, 6, 7))
+    filename = str(tmp_path / "test.vtc")
+    bvbabel.vtc.write_vtc(filename, header, data, rearrange_data_axes=False)
+    bvbabel.vtc.write_vtc(filename + ".gz", header, data,
+                          rearrange_data_axes=False)
+
+    kwargs = {"rearrange_data_axes": rearrange_data_axes,
+              "bbox": (1, 3, 0, 4, 2, 4), "volumes": slice(1, 6, 2)}
+    _, data1 = bvbabel.vtc.read_vtc(filename, **kwargs)
+    _, data2 = bvbabel.vtc.read_vtc(filename + ".gz", gzip_index=gzip_index,
+                                    **kwargs)
+    assert np.array_equal(data1, data2)
+    assert os.path.isfile(filename + ".gz.idx") == gzip_index
+
+
+def test_vmp_maps_gzip(tmp_path):
+    """Test reading selected VMP maps through a gzip index."""
+    header, data = _create_vmp(nr_maps=3)
+    filename = str(tmp_path / "test.vmp.gz")
+    bvbabel.vmp.write_vmp(filename, header, data)
+    _, data2 = bvbabel.vmp.read_vmp(filename, maps=[0, 2], gzip_index=True)
+    assert np.array_equal(data[..., [0, 2]], data2)
@@ -0,0 +1,62 @@
+"""Test bvbabel header-only readers against the full readers."""
+
+import os
+import gzip
+import pytest
+import bvbabel
+
+DIR_TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "..",
+                             "test_data")
+
+
+def _gunzip(filename, tmp_path):
+    """Decompress test data into a temporary directory."""
+    outname = str(tmp_path / os.path.basename(filename)[:-3])
+    with gzip.open(filename, "rb") as f_in, open(outname, "wb") as f_out:
+        f_out.write(f_in.read())
+    return outname
+
+
+# =============================================================================
+@pytest.mark.parametrize("fmt, basename", [
+    ("vtc", "sub-test03.vtc.gz"),
+    ("vmr", "sub-test03_cube.vmr.gz"),
+    ("vmr", "sub-test01_fileversion-2.vmr.gz"),
+    ])
+def test_read_header_data_offset(tmp_path, fmt, basename):
+    """Test header, data offset and data size of VTC and VMR files."""
+    filename = _gunzip(os.path.join(DIR_TEST_DATA, basename), tmp_path)
+    module = getattr(bvbabel, fmt)
+    header, data = getattr(module, "read_" + fmt)(filename)
+    header_only = getattr(module, "read_{}_header".format(fmt))(filename)
+    offset = header_only.pop("Data offset")
+    size = header_only.pop("Data size")
+    assert header_only.keys() == header.keys()
+    assert size == data.nbytes
+    if fmt == "vtc":
+        assert offset + size == os.path.getsize(filename)
+
+
+@pytest.mark.parametrize("fmt, basename", [
+    ("srf", "sub-test03_cube.srf.gz"),
+    ("mtc", "sub-test03_cube.mtc.gz"),
+    ("smp", "sub-test02_left_hemisphere_4_curvature_maps.smp.gz"),
+    ("poi", "sub-test03_cube.poi"),
+    ("voi", "sub-test03.voi"),
+    ("sdm", "sub-test04.sdm"),
+    ("prt", "sub-test05.prt"),
+    ])
+def test_read_header(tmp_path, fmt, basename):
+    """Test header-only readers against the full readers."""
+    filename = os.path.join(DIR_TEST_DATA, basename)
+    if filename.endswith(".gz"):
+        filename = _gunzip(filename, tmp_path)
+    module = getattr(bvbabel, fmt)
+    header, _ = getattr(module, "read_" + fmt)(filename)
+    header_only = getattr(module, "read_{}_header".format(fmt))(filename)
+    if fmt == "smp":
+        names = [m["Name"] for m in header_only.pop("Map")]
+        assert names == [m["Name"] for m in header.pop("Map")]
+    # NOTE: VOI and POI readers add trailing entries to the header
+    for key, value in header_only.items():
+        assert header[key] == value
@@ -0,0 +1,97 @@
+"""Test peak memory use of bvbabel volume readers."""
+
+import os
+import tracemalloc
+import pytest
+import numpy as np
+import bvbabel
+from bvbabel.tests.test_vmp import _create_vmp
+
+FILE_VMR = os.path.join(os.path.dirname(__file__), "..", "..", "test_data",
+                        "sub-test03_cube.vmr.gz")
+
+
+def _create_vtc():
+    """4 MB short int VTC."""
+    header, _ = bvbabel.vtc.create_vtc()
+    header.update({"XStart": 0, "XEnd": 64, "YStart": 0, "YEnd": 64,
+                   "ZStart": 0, "ZEnd": 32, "Nr time points": 16})
+    return header, np.ones((64, 64, 32, 16), dtype=np.short)
+
+
+def _create_vmr():
+    """2 MB VMR with the post-data header of the test data."""
+    header = bvbabel.vmr.read_vmr_header(FILE_VMR)
+    header.update({"DimX": 128, "DimY": 128, "DimZ": 128})
+    return header, np.ones((128, 128, 128), dtype=np.uint8)
+
+
+def _create_v16():
+    """2 MB V16 (unsigned short int)."""
+    return ({"DimX": 128, "DimY": 128, "DimZ": 64},
+            np.ones((128, 128, 64), dtype=np.uint16))
+
+
+def _create_gtc():
+    """8 MB GTC (int)."""
+    return ({"File version": 1, "DimD": 8, "DimX": 64, "DimY": 64,
+             "DimT": 64}, np.ones((64, 64, 8, 64), dtype=np.int32))
+
+
+def _create_msk():
+    """2 MB MSK."""
+    return ({"VTC resolution relative to VMR (1, 2, or 3)": 1,
+             "XStart": 0, "XEnd": 128, "YStart": 0, "YEnd": 128,
+             "ZStart": 0, "ZEnd": 128},
+            np.ones((128, 128, 128), dtype=np.uint8))
+
+
+def _create_large_vmp():
+    """8 MB float VMP with four maps."""
+    header, _ = _create_vmp(nr_maps=4)
+    header.update({"XStart": 0, "XEnd": 128, "YStart": 0, "YEnd": 64,
+                   "ZStart": 0, "ZEnd": 64, "Resolution": 1})
+    return header, np.ones((64, 128, 64, 4), dtype=np.float32)
+
+
+# =============================================================================
+@pytest.mark.parametrize("fmt, create", [
+    ("vtc", _create_vtc), ("vmr", _create_vmr), ("v16", _create_v16),
+    ("vmp", _create_large_vmp), ("gtc", _create_gtc), ("msk", _create_msk),
+    ])
+def test_read_peak_memory(tmp_path, fmt, create):
+    """Test that readers hold a single copy of the data at most."""
+    module = getattr(bvbabel, fmt)
+    header, data = create()
+    filename = str(tmp_path / "test.{}".format(fmt))
+    getattr(module, "write_" + fmt)(filename, header, data)
+    nr_bytes = data.nbytes
+    del data
+
+    tracemalloc.start()
+    try:
+        _, data = getattr(module, "read_" + fmt)(filename)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert data.nbytes == nr_bytes
+    assert peak < nr_bytes * 1.1 + 2**16
+
+
+def test_vtc_export_nifti_peak_memory(tmp_path):
+    """Test that streaming NIfTI export holds one chunk of the data at most."""
+    header, data = _create_vtc()
+    filename = str(tmp_path / "test.vtc")
+    bvbabel.vtc.write_vtc(filename, header, data)
+    del data
+
+    # NOTE: One plane of 64 x 64 voxels with 16 time points of short int
+    nr_bytes = 64 * 64 * 16 * 2
+    tracemalloc.start()
+    try:
+        bvbabel.vtc.export_nifti(filename, str(tmp_path / "test.nii"),
+                                 chunk_voxels=64 * 64)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < nr_bytes * 1.1 + 2**16
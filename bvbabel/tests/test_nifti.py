@@ -0,0 +1,67 @@
+"""Test bvbabel NIfTI-1 functions."""
+
+import pytest
+import numpy as np
+import bvbabel
+
+
+# =============================================================================
+@pytest.mark.parametrize("data_type", [np.uint8, np.int16, np.float32])
+@pytest.mark.parametrize("mmap", [True, False])
+def test_NIFTI_read_write(tmp_path, data_type, mmap):
+    """Test NIfTI-1 writing and reading."""
+    data = np.arange(4 * 5 * 6 * 2).reshape((4, 5, 6, 2)).astype(data_type)
+    affine = np.array([[2., 0, 0, -10], [0, 2, 0, -20], [0, 0, 3, 5],
+                       [0, 0, 0, 1]])
+    header = bvbabel.nifti.create_nifti_header(data.shape, data.dtype, affine)
+    filename = str(tmp_path / "test.nii")
+    bvbabel.nifti.write_nifti(filename, header, data)
+
+    header2, data2 = bvbabel.nifti.read_nifti(filename, mmap=mmap)
+    assert isinstance(data2, np.memmap) == mmap
+    assert data2.dtype == data_type
+    assert np.array_equal(data, data2)
+    assert np.array_equal(bvbabel.nifti.get_affine(header2), affine)
+    assert header2["pixdim"][1:4].tolist() == [2., 2., 3.]
+
+    # Data is stored in Fortran order after the 352 byte header
+    stored = np.fromfile(filename, dtype=data_type, offset=352)
+    assert np.array_equal(stored, data.flatten(order='F'))
+
+    header3 = bvbabel.nifti.read_nifti_header(filename)
+    assert header3["Data offset"] == 352
+    assert header3["Data size"] == data.nbytes
+
+
+def test_NIFTI_qform_affine():
+    """Test affine from qform when sform is not set."""
+    header = bvbabel.nifti.create_nifti_header((2, 2, 2))
+    header["sform_code"], header["qform_code"] = 0, 1
+    # 180 degrees around the z axis, negative qfac flips the 3rd axis
+    header["quatern_b"], header["quatern_c"], header["quatern_d"] = 0, 0, 1
+    header["pixdim"][:4] = [-1, 2, 2, 2]
+    header["qoffset_x"] = 7.
+    affine = bvbabel.nifti.get_affine(header)
+    assert np.allclose(affine, [[-2, 0, 0, 7], [0, -2, 0, 0], [0, 0, -2, 0],
+                                [0, 0, 0, 1]])
+
+
+def test_NIFTI_write_shape_mismatch(tmp_path):
+    """Test that mismatching data and header dimensions are rejected."""
+    header = bvbabel.nifti.create_nifti_header((2, 3, 4))
+    with pytest.raises(ValueError):
+        bvbabel.nifti.write_nifti(str(tmp_path / "test.nii"), header,
+                                  np.zeros((4, 3, 2)))
+
+
+def test_NIFTI_write_header(tmp_path):
+    """Test writing the header alone, followed by the data."""
+    data = np.arange(24, dtype=np.int16).reshape((2, 3, 4))
+    header = bvbabel.nifti.create_nifti_header(data.shape, data.dtype)
+    filename = str(tmp_path / "test.nii")
+    with open(filename, "wb") as f:
+        bvbabel.nifti.write_nifti_header(f, header)
+        assert f.tell() == header["vox_offset"]
+        f.write(np.transpose(data).astype('<h').tobytes())
+    _, data2 = bvbabel.nifti.read_nifti(filename)
+    assert np.array_equal(data, data2)
@@ -0,0 +1,82 @@
+"""Test bvbabel header patching."""
+
+import os
+import gzip
+import pytest
+import numpy as np
+import bvbabel
+from bvbabel.tests.test_vmp import _create_vmp
+
+DIR_TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "..",
+                             "test_data")
+
+
+def _gunzip(filename, tmp_path):
+    """Decompress test data into a temporary directory."""
+    outname = str(tmp_path / os.path.basename(filename)[:-3])
+    with gzip.open(filename, "rb") as f_in, open(outname, "wb") as f_out:
+        f_out.write(f_in.read())
+    return outname
+
+
+# =============================================================================
+def test_patch_header_vtc(tmp_path):
+    """Test patching fixed-size and variable-length VTC fields."""
+    filename = _gunzip(os.path.join(DIR_TEST_DATA, "sub-test03.vtc.gz"),
+                       tmp_path)
+    header, data = bvbabel.vtc.read_vtc(filename)
+    size = os.path.getsize(filename)
+
+    bvbabel.patch_header(filename, {"TR (ms)": 1234.5})
+    header2, data2 = bvbabel.vtc.read_vtc(filename)
+    assert header2["TR (ms)"] == 1234.5
+    assert os.path.getsize(filename) == size
+    assert np.array_equal(data2, data)
+
+    name = "x" * (len(header["Source FMR name"]) + 3)
+    with pytest.raises(ValueError):
+        bvbabel.patch_header(filename, {"Source FMR name": name})
+    bvbabel.patch_header(filename, {"Source FMR name": name}, rewrite=True)
+    header2, data2 = bvbabel.vtc.read_vtc(filename)
+    assert header2["Source FMR name"] == name
+    assert header2["TR (ms)"] == 1234.5
+    assert np.array_equal(data2, data)
+
+    with pytest.raises(ValueError):
+        bvbabel.patch_header(filename, {"Nr time points": 1})
+    with pytest.raises(ValueError):
+        bvbabel.patch_header(filename, {"Not a field": 1})
+
+
+def test_patch_header_vmr(tmp_path):
+    """Test patching VMR post-data header fields."""
+    filename = _gunzip(os.path.join(DIR_TEST_DATA, "sub-test03_cube.vmr.gz"),
+                       tmp_path)
+    header, data = bvbabel.vmr.read_vmr(filename)
+    bvbabel.patch_header(filename, {"ReferenceSpaceVMR": 2,
+                                    "VoxelSizeY": 0.5})
+    header2, data2 = bvbabel.vmr.read_vmr(filename)
+    assert header2["ReferenceSpaceVMR"] == 2
+    assert header2["VoxelSizeY"] == 0.5
+    assert header2["VoxelSizeX"] == header["VoxelSizeX"]
+    assert np.array_equal(data2, data)
+
+
+def test_patch_header_vmp(tmp_path):
+    """Test patching map header fields of a VMP."""
+    header, data = _create_vmp()
+    filename = str(tmp_path / "test.vmp")
+    bvbabel.vmp.write_vmp(filename, header, data)
+
+    bvbabel.patch_header(filename, {("Map", 1, "MapThreshold"): 4.5,
+                                    ("Map", 2, "UseFDRTableIndex"): 1,
+                                    ("Map", 0, "MapName"): "Map A"})
+    header2, data2 = bvbabel.vmp.read_vmp(filename)
+    assert header2["Map"][1]["MapThreshold"] == 4.5
+    assert header2["Map"][0]["MapThreshold"] == 3.
+    assert header2["Map"][2]["UseFDRTableIndex"] == 1
+    assert header2["Map"][0]["MapName"] == "Map A"
+    assert np.array_equal(data2, data)
+
+    with pytest.raises(ValueError):
+        bvbabel.patch_header(filename, {("Map", 3, "MapThreshold"): 1.})
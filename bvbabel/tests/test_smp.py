@@ -0,0 +1,103 @@
+"""Test bvbabel SMP functions."""
+
+import os
+import gzip
+import pytest
+import numpy as np
+import bvbabel
+
+FILE_SMP = os.path.join(os.path.dirname(__file__), "..", "..", "test_data",
+                        "sub-test02_left_hemisphere_4_curvature_maps.smp.gz")
+
+
+def _gunzip(filename, tmp_path):
+    """Decompress test data into a temporary directory."""
+    outname = str(tmp_path / os.path.basename(filename)[:-3])
+    with gzip.open(filename, "rb") as f_in, open(outname, "wb") as f_out:
+        f_out.write(f_in.read())
+    return outname
+
+
+# =============================================================================
+def test_SMP_read_write(tmp_path):
+    """Test SMP write read cycle reproduces the test data."""
+    filename = _gunzip(FILE_SMP, tmp_path)
+    header, data = bvbabel.smp.read_smp(filename)
+    assert data.dtype == np.float32
+    assert data.shape == (header["Nr vertices"], header["Nr maps"])
+
+    outname = str(tmp_path / "test.smp")
+    bvbabel.smp.write_smp(outname, header, data)
+    with open(filename, "rb") as f1, open(outname, "rb") as f2:
+        assert f1.read() == f2.read()
+
+
+@pytest.mark.parametrize("version, lut_file", [
+    (1, None), (2, "<default>"), (4, "<default>"), (5, "test.olt")])
+def test_SMP_read_versions(tmp_path, version, lut_file):
+    """Test that the default LUT file is only set from file version 2 on."""
+    header, data = bvbabel.smp.create_smp(nr_maps=2, nr_vertices=10)
+    header["File version"] = version
+    for map_header in header["Map"]:
+        map_header["LUT file"] = "test.olt"
+    outname = str(tmp_path / "test.smp")
+    bvbabel.smp.write_smp(outname, header, data)
+    header2, data2 = bvbabel.smp.read_smp(outname)
+    assert np.array_equal(data, data2)
+    for map_header in header2["Map"]:
+        assert map_header.get("LUT file") == lut_file
+
+
+def test_SMP_read_selected_maps(tmp_path):
+    """Test reading a subset of SMP maps by index and by name."""
+    filename = _gunzip(FILE_SMP, tmp_path)
+    header, data = bvbabel.smp.read_smp(filename)
+    name = header["Map"][2]["Name"]
+
+    header2, data2 = bvbabel.smp.read_smp(filename, maps=[-1, name])
+    assert header2["Nr maps"] == 2
+    assert [m["Name"] for m in header2["Map"]] == \
+        [header["Map"][2]["Name"], header["Map"][3]["Name"]]
+    assert np.array_equal(data2, data[:, 2:4])
+
+    with pytest.raises(ValueError):
+        bvbabel.smp.read_smp(filename, maps="Not a map name")
+
+    # Requested order and repetitions are not kept
+    header2, data2 = bvbabel.smp.read_smp(filename, maps=[3, 2, 3])
+    assert np.array_equal(data2, data[:, 2:4])
+
+
+def test_SMP_read_selected_maps_early_error(tmp_path):
+    """Test that unknown maps are reported before reading the map values."""
+    with open(_gunzip(FILE_SMP, tmp_path), "rb") as f:
+        content = f.read()
+    header = bvbabel.smp.read_smp_header(content)
+
+    # NOTE: Files cut within the values of the last map
+    content = content[:-header["Nr vertices"] * 2]
+    with pytest.raises(ValueError, match="out of range"):
+        bvbabel.smp.read_smp(content, maps=[0, header["Nr maps"]])
+    with pytest.raises(ValueError, match="not found"):
+        bvbabel.smp.read_smp(content, maps="Not a map name")
+    with pytest.raises(ValueError, match="Unexpected end of file"):
+        bvbabel.smp.read_smp(content, maps=-1)
+
+
+def test_SMP_append_map(tmp_path):
+    """Test appending maps reproduces the test data."""
+    filename = _gunzip(FILE_SMP, tmp_path)
+    header, data = bvbabel.smp.read_smp(filename)
+
+    outname = str(tmp_path / "test.smp")
+    header_start = dict(header, **{"Nr maps": 1, "Map": header["Map"][:1]})
+    bvbabel.smp.write_smp(outname, header_start, data[:, :1])
+    for m in range(1, header["Nr maps"]):
+        bvbabel.smp.append_smp_map(outname, header["Map"][m], data[:, m])
+    with open(filename, "rb") as f1, open(outname, "rb") as f2:
+        assert f1.read() == f2.read()
+
+    with pytest.raises(ValueError):
+        bvbabel.smp.append_smp_map(outname, header["Map"][0], data[1:, 0])
+    with pytest.raises(ValueError):
+        bvbabel.smp.append_smp_map(FILE_SMP, header["Map"][0], data[:, 0])
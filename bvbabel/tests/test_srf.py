@@ -0,0 +1,104 @@
+"""Test bvbabel SRF functions."""
+
+import io
+import os
+import gzip
+import pytest
+import numpy as np
+import bvbabel
+
+FILE_SRF = os.path.join(os.path.dirname(__file__), "..", "..", "test_data",
+                        "sub-test03_cube.srf.gz")
+
+
+def _gunzip(filename, tmp_path):
+    """Decompress test data into a temporary directory."""
+    outname = str(tmp_path / os.path.basename(filename)[:-3])
+    with gzip.open(filename, "rb") as f_in, open(outname, "wb") as f_out:
+        f_out.write(f_in.read())
+    return outname
+
+
+# =============================================================================
+def test_SRF_read(tmp_path):
+    """Test SRF reading against the test data."""
+    header, mesh_data = bvbabel.srf.read_srf(_gunzip(FILE_SRF, tmp_path))
+    nr_vertices = header["Nr vertices"]
+
+    assert mesh_data["vertices"].shape == (nr_vertices, 3)
+    assert mesh_data["vertex normals"].shape == (nr_vertices, 3)
+    assert mesh_data["faces"].shape == (header["Nr triangles"], 3)
+    assert mesh_data["faces"].max() < nr_vertices
+    assert len(mesh_data["Strip sequence"]) == \
+        header["Nr triangle strip elements"]
+
+    # Each vertex neighbor list starts with the number of neighbors
+    assert len(mesh_data["vertex neighbors"]) == nr_vertices
+    for neighbors in mesh_data["vertex neighbors"]:
+        assert neighbors[0] == len(neighbors) - 1
+
+
+def test_SRF_csr_neighbors(tmp_path):
+    """Test CSR form of vertex neighbors in reading and writing."""
+    filename = _gunzip(FILE_SRF, tmp_path)
+    header, mesh_data = bvbabel.srf.read_srf(filename)
+    _, mesh_data_csr = bvbabel.srf.read_srf(filename, csr_neighbors=True)
+
+    indptr, indices = mesh_data_csr["vertex neighbors"]
+    assert indptr.dtype == np.int32 and indices.dtype == np.int32
+    for i, neighbors in enumerate(mesh_data["vertex neighbors"]):
+        assert indices[indptr[i]:indptr[i + 1]].tolist() == neighbors[1:]
+
+    # Both forms are written identically
+    bvbabel.srf.write_srf(str(tmp_path / "list.srf"), header, mesh_data)
+    bvbabel.srf.write_srf(str(tmp_path / "csr.srf"), header, mesh_data_csr)
+    with open(str(tmp_path / "list.srf"), "rb") as f1, \
+            open(str(tmp_path / "csr.srf"), "rb") as f2:
+        assert f1.read() == f2.read()
+
+
+@pytest.mark.parametrize("nr_vertices", [1, 31, 32, 33, 100])
+def test_SRF_walk_neighbors(nr_vertices):
+    """Test neighbor list starts against a vertex by vertex walk."""
+    rng = np.random.default_rng(0)
+    data = []
+    for count in rng.integers(0, 8, nr_vertices):
+        data += [count] + rng.integers(0, nr_vertices, count).tolist()
+    data = np.array(data + [5, 5, 5], dtype='<i')
+    idx_start = [0]
+    for _ in range(nr_vertices):
+        idx_start.append(idx_start[-1] + data[idx_start[-1]] + 1)
+
+    indptr, result = bvbabel.srf._walk_neighbors(data, nr_vertices)
+    assert result.tolist() == idx_start
+    assert indptr.tolist() == (np.array(idx_start)
+                               - np.arange(nr_vertices + 1)).tolist()
+
+
+def test_SRF_read_truncated(tmp_path):
+    """Test that truncated neighbor data is reported as end of file."""
+    filename = _gunzip(FILE_SRF, tmp_path)
+    header = bvbabel.srf.read_srf_header(filename)
+    with open(filename, "rb") as f:
+        content = f.read()
+    # NOTE: Cut in the middle of the nearest neighbor data
+    offset = 28 + 4 * 8 + header["Nr vertices"] * 7 * 4
+    for size in [offset + 40, len(content) - 8]:
+        with pytest.raises(ValueError, match="Unexpected end of file"):
+            bvbabel.srf.read_srf(content[:size])
+
+
+@pytest.mark.parametrize("chunk_size", [4, 64, 2**22])
+def test_SRF_skip_neighbors(chunk_size):
+    """Test reading past neighbor lists in chunks stops at their end."""
+    rng = np.random.default_rng(0)
+    data = []
+    for count in rng.integers(0, 8, 100):
+        data += [count] + rng.integers(0, 100, count).tolist()
+    f = io.BytesIO(np.array(data + [5, 5, 5], dtype='<i').tobytes())
+    bvbabel.srf._skip_neighbors(f, 100, chunk_size=chunk_size)
+    assert f.tell() == len(data) * 4
+
+    f = io.BytesIO(np.array(data[:-1], dtype='<i').tobytes())
+    with pytest.raises(ValueError, match="Unexpected end of file"):
+        bvbabel.srf._skip_neighbors(f, 100, chunk_size=chunk_size)
@@ -0,0 +1,87 @@
+"""Test bvbabel utility functions."""
+
+import io
+import struct
+import pytest
+import numpy as np
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import read_variable_length_string
+from bvbabel.utils import write_variable_length_string
+from bvbabel.utils import unpack_variable_length_string
+
+
+def _has_name(header):
+    return header["Has name"] > 0
+
+
+SCHEMA = HeaderSchema([
+    HeaderField("File version", 'h'),
+    HeaderField("Has name", 'i'),
+    HeaderField("Name", 'z', _has_name, default=""),
+    HeaderField("RGB", '3B'),
+    HeaderField("TR", 'f'),
+    ])
+
+
+# =============================================================================
+def test_header_schema_read_write():
+    """Test reading and writing conditional, string and array fields."""
+    header = {"File version": 3, "Has name": 1, "Name": "run-01",
+              "RGB": np.array([1, 2, 255], dtype=np.uint8), "TR": 1.5}
+    data = SCHEMA.pack(header)
+    assert data == (struct.pack('<hi', 3, 1) + b"run-01\x00"
+                    + struct.pack('<3Bf', 1, 2, 255, 1.5))
+
+    f = io.BytesIO(data + b"rest")
+    header2 = SCHEMA.read(f)
+    assert f.read() == b"rest"
+    assert np.array_equal(header2.pop("RGB"), header.pop("RGB"))
+    assert header2 == header
+
+
+def test_header_schema_condition_default():
+    """Test that skipped conditional fields get their default value."""
+    header = {"File version": 3, "Has name": 0, "Name": "ignored",
+              "RGB": [0, 0, 0], "TR": 2.}
+    header2 = SCHEMA.read(io.BytesIO(SCHEMA.pack(header)))
+    assert header2["Name"] == ""
+    assert header2["TR"] == 2.
+
+
+def test_header_schema_locate():
+    """Test field offsets follow conditions and string lengths."""
+    header = {"File version": 3, "Has name": 1, "Name": "abc",
+              "RGB": [1, 2, 3], "TR": 2.}
+    buffer = SCHEMA.pack(header)
+    offset, size = SCHEMA.locate(header, "TR")
+    assert (offset, size) == (2 + 4 + 4 + 3, 4)
+    assert struct.unpack('<f', buffer[offset:offset + size])[0] == 2.
+    header["Has name"] = 0
+    assert SCHEMA.locate(header, "RGB") == (6, 3)
+    with pytest.raises(ValueError):
+        SCHEMA.locate(header, "Name")
+
+
+def test_variable_length_string(tmp_path):
+    """Test string codec with multi-byte UTF-8 characters."""
+    names = ["", "sub-01_task-rest", "Gülban_ß_μ", "x" * 200]
+    filename = str(tmp_path / "strings.bin")
+    with open(filename, "wb") as f:
+        for name in names:
+            write_variable_length_string(f, name)
+        f.write(b"rest")
+    with open(filename, "rb") as f:
+        data = f.read()
+
+    # Buffered file, in-memory stream and in-memory buffer
+    with open(filename, "rb") as f:
+        assert [read_variable_length_string(f) for _ in names] == names
+        assert f.read() == b"rest"
+    f = io.BytesIO(data)
+    assert [read_variable_length_string(f) for _ in names] == names
+    assert f.read() == b"rest"
+    offset = 0
+    for name in names:
+        text, offset = unpack_variable_length_string(memoryview(data), offset)
+        assert text == name
+    assert data[offset:] == b"rest"
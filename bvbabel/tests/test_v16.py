@@ -0,0 +1,29 @@
+"""Test bvbabel V16 functions."""
+
+import pytest
+import numpy as np
+import bvbabel
+
+
+# =============================================================================
+def test_V16_read_mmap_write(tmp_path):
+    """Test V16 voxel edits through a read-write memmap."""
+    header = {"DimX": 8, "DimY": 8, "DimZ": 8}
+    data = np.arange(8 ** 3, dtype=np.uint16).reshape((8, 8, 8))
+    filename = str(tmp_path / "test.v16")
+    bvbabel.v16.write_v16(filename, header, data)
+    _, data = bvbabel.v16.read_v16(filename)
+
+    _, data1 = bvbabel.v16.read_v16(filename, mmap=True, mode='r+')
+    assert isinstance(data1.base, np.memmap)
+    data1[:3, :, :] = 0
+    data1.base.flush()
+    del data1
+
+    header2, data2 = bvbabel.v16.read_v16(filename)
+    data[:3, :, :] = 0
+    assert header2 == header
+    assert np.array_equal(data, data2)
+
+    with pytest.raises(ValueError):
+        bvbabel.v16.read_v16(filename, mode='r+')
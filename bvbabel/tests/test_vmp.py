@@ -0,0 +1,192 @@
+"""Test bvbabel VMP functions."""
+
+import os
+import pytest
+import numpy as np
+import bvbabel
+
+
+def _create_vmp(nr_maps=3):
+    """Create a small VMP header and data."""
+    header = {
+        "NR-VMP identifier": 2712847316, "VersionNumber": 6,
+        "DocumentType": 1, "NrOfSubMaps": nr_maps, "NrOfTimePoints": 0,
+        "NrOfComponentParams": 0, "ShowParamsRangeFrom": 0,
+        "ShowParamsRangeTo": 0, "UseForFingerprintParamsRangeFrom": 0,
+        "UseForFingerprintParamsRangeTo": 0,
+        "XStart": 100, "XEnd": 112, "YStart": 90, "YEnd": 100,
+        "ZStart": 80, "ZEnd": 88, "Resolution": 2,
+        "DimX": 256, "DimY": 256, "DimZ": 256,
+        "NameOfVTCFile": "", "NameOfProtocolFile": "", "NameOfVOIFile": ""}
+    header["NR-VMP identifier"] -= 2**32  # Stored as signed int
+    header["Map"] = []
+    for m in range(nr_maps):
+        header["Map"].append({
+            "TypeOfMap": 1, "MapThreshold": 3., "UpperThreshold": 8.,
+            "MapName": "Map {}".format(m + 1),
+            "RGB positive min": np.array([255, 0, 0], dtype=np.uint8),
+            "RGB positive max": np.array([255, 255, 0], dtype=np.uint8),
+            "RGB negative min": np.array([255, 0, 255], dtype=np.uint8),
+            "RGB negative max": np.array([0, 0, 255], dtype=np.uint8),
+            "UseVMPColor": 0, "LUTFileName": "<default>",
+            "TransparentColorFactor": 1., "ClusterSizeThreshold": 50,
+            "EnableClusterSizeThreshold": 0,
+            "ShowValuesAboveUpperThreshold": 1, "DF1": 100, "DF2": 0,
+            "ShowPosNegValues": 3, "NrOfUsedVoxels": 0, "SizeOfFDRTable": 0,
+            "FDRTableInfo": np.zeros((0, 3)), "UseFDRTableIndex": 0})
+    # (x, y, z, maps) after rearranging BrainVoyager axes
+    data = np.random.random((4, 6, 5, nr_maps)).astype(np.float32)
+    return header, data
+
+
+# =============================================================================
+def test_VMP_read_write(tmp_path):
+    """Test VMP write read cycle."""
+    header, data = _create_vmp()
+    filename = str(tmp_path / "test.vmp")
+    bvbabel.vmp.write_vmp(filename, header, data)
+    header2, data2 = bvbabel.vmp.read_vmp(filename)
+    assert header2["NrOfSubMaps"] == header["NrOfSubMaps"]
+    assert np.array_equal(data2, data)
+
+
+def test_VMP_FDR_table_component_time_courses(tmp_path):
+    """Test VMP FDR tables, component time courses and parameters."""
+    header, data = _create_vmp(nr_maps=2)
+    header["NrOfTimePoints"] = 7
+    header["NrOfComponentParams"] = 1
+    header["ComponentTimeCourseValues"] = np.random.random(
+        (2, 7)).astype(np.float32)
+    header["ComponentTimeCourseParams"] = [
+        {"Name": "Fingerprint", "Values": np.array([.5, 1.5], np.float32)}]
+    for m in range(2):
+        header["Map"][m]["SizeOfFDRTable"] = 5
+        header["Map"][m]["FDRTableInfo"] = np.random.random(
+            (5, 3)).astype(np.float32)
+    filename = str(tmp_path / "test.vmp")
+    bvbabel.vmp.write_vmp(filename, header, data)
+
+    header2, data2 = bvbabel.vmp.read_vmp(filename)
+    for m in range(2):
+        assert np.array_equal(header2["Map"][m]["FDRTableInfo"],
+                              header["Map"][m]["FDRTableInfo"])
+    assert np.array_equal(header2["ComponentTimeCourseValues"],
+                          header["ComponentTimeCourseValues"])
+    assert np.array_equal(header2["ComponentTimeCourseParams"][0]["Values"],
+                          header["ComponentTimeCourseParams"][0]["Values"])
+    assert np.array_equal(data2, data)
+
+
+def test_VMP_read_selected_maps(tmp_path):
+    """Test reading a subset of VMP maps by index and by name."""
+    header, data = _create_vmp()
+    filename = str(tmp_path / "test.vmp")
+    bvbabel.vmp.write_vmp(filename, header, data)
+
+    header2, data2 = bvbabel.vmp.read_vmp(filename, maps=["Map 3", 0])
+    assert header2["NrOfSubMaps"] == 2
+    assert [m["MapName"] for m in header2["Map"]] == ["Map 1", "Map 3"]
+    assert np.array_equal(data2, data[..., [0, 2]])
+
+    header2, data2 = bvbabel.vmp.read_vmp(filename, maps=np.int64(1))
+    assert np.array_equal(data2, data[..., [1]])
+    header2, data2 = bvbabel.vmp.read_vmp(filename, maps=np.arange(2))
+    assert np.array_equal(data2, data[..., :2])
+
+    with pytest.raises(ValueError):
+        bvbabel.vmp.read_vmp(filename, maps=3)
+    with pytest.raises(ValueError):
+        bvbabel.vmp.read_vmp(filename, maps=1.5)
+    with pytest.raises(ValueError):
+        bvbabel.vmp.read_vmp(filename, maps=[0, 1.5])
+
+
+def test_VMP_read_selected_maps_components(tmp_path):
+    """Test map selection also selects component values of the maps."""
+    header, data = _create_vmp()
+    header["NrOfTimePoints"] = 4
+    header["NrOfComponentParams"] = 1
+    header["ComponentTimeCourseValues"] = np.arange(
+        12, dtype=np.float32).reshape((3, 4))
+    header["ComponentTimeCourseParams"] = [
+        {"Name": "Fingerprint", "Values": np.array([1, 2, 3], np.float32)}]
+    filename = str(tmp_path / "test.vmp")
+    bvbabel.vmp.write_vmp(filename, header, data)
+
+    header2, data2 = bvbabel.vmp.read_vmp(filename, maps=[2])
+    outname = str(tmp_path / "test2.vmp")
+    bvbabel.vmp.write_vmp(outname, header2, data2)
+    header3, data3 = bvbabel.vmp.read_vmp(outname)
+    assert np.array_equal(header3["ComponentTimeCourseValues"],
+                          [[8, 9, 10, 11]])
+    assert np.array_equal(header3["ComponentTimeCourseParams"][0]["Values"],
+                          [3])
+    assert np.array_equal(data3, data[..., [2]])
+
+
+def test_VMP_file_lazy_maps(tmp_path):
+    """Test VMPFile maps match read_vmp."""
+    header, data = _create_vmp()
+    filename = str(tmp_path / "test.vmp")
+    bvbabel.vmp.write_vmp(filename, header, data)
+
+    with bvbabel.vmp.VMPFile(filename) as vmp:
+        assert len(vmp) == 3
+        assert np.array_equal(vmp[1], data[..., 1])
+        assert np.array_equal(vmp["Map 3"], data[..., 2])
+        assert np.array_equal(vmp[-1], data[..., 2])
+        assert isinstance(vmp[0].base, np.memmap)
+        for m, data_map in enumerate(vmp):
+            assert np.array_equal(data_map, data[..., m])
+        assert np.array_equal(vmp[np.int64(1)], data[..., 1])
+        with pytest.raises(ValueError):
+            vmp["Map 4"]
+        with pytest.raises(ValueError):
+            vmp[3]
+        for key in [[0, 1], slice(0, 2), 1.0]:
+            with pytest.raises(TypeError):
+                vmp[key]
+
+    with open(filename, "rb") as f:
+        content = f.read()
+    with pytest.raises(ValueError):
+        bvbabel.vmp.VMPFile(content)
+
+
+def test_VMP_append_map(tmp_path):
+    """Test appending a map matches writing all maps at once."""
+    header, data = _create_vmp(nr_maps=3)
+    header["Map"][2]["SizeOfFDRTable"] = 2
+    header["Map"][2]["FDRTableInfo"] = np.ones((2, 3), dtype=np.float32)
+    filename = str(tmp_path / "test.vmp")
+    header_start = dict(header, NrOfSubMaps=2, Map=header["Map"][:2])
+    bvbabel.vmp.write_vmp(filename, header_start, data[..., :2])
+
+    # NOTE: Copy in chunks smaller than one map volume (4 x 6 x 5 floats)
+    bvbabel.vmp.append_vmp_map(filename, header["Map"][2], data[..., 2],
+                               chunk_size=100)
+    filename2 = str(tmp_path / "test2.vmp")
+    bvbabel.vmp.write_vmp(filename2, header, data)
+    with open(filename, "rb") as f, open(filename2, "rb") as f2:
+        assert f.read() == f2.read()
+
+    with pytest.raises(ValueError):
+        bvbabel.vmp.append_vmp_map(filename, header["Map"][0], data)
+
+
+def test_VMP_append_map_failure(tmp_path, monkeypatch):
+    """Test a failed append leaves the file intact."""
+    header, data = _create_vmp(nr_maps=2)
+    filename = str(tmp_path / "test.vmp")
+    bvbabel.vmp.write_vmp(filename, header, data)
+    with open(filename, "rb") as f:
+        content = f.read()
+
+    def _fail(*args):
+        raise OSError("Disk full.")
+    monkeypatch.setattr(bvbabel.utils.shutil, "copyfileobj", _fail)
+    with pytest.raises(OSError):
+        bvbabel.vmp.append_vmp_map(filename, header["Map"][0], data[..., 0])
+    with open(filename, "rb") as f:
+        assert f.read() == content
+    assert os.listdir(str(tmp_path)) == ["test.vmp"]
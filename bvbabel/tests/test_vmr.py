@@ -0,0 +1,42 @@
+"""Test bvbabel VMR functions."""
+
+import os
+import gzip
+import pytest
+import numpy as np
+import bvbabel
+
+FILE_VMR = os.path.join(os.path.dirname(__file__), "..", "..", "test_data",
+                        "sub-test03_cube.vmr.gz")
+
+
+def _gunzip(filename, tmp_path):
+    """Decompress test data into a temporary directory."""
+    outname = str(tmp_path / os.path.basename(filename)[:-3])
+    with gzip.open(filename, "rb") as f_in, open(outname, "wb") as f_out:
+        f_out.write(f_in.read())
+    return outname
+
+
+# =============================================================================
+def test_VMR_read_mmap_write(tmp_path):
+    """Test VMR voxel edits through a read-write memmap keep the headers."""
+    filename = _gunzip(FILE_VMR, tmp_path)
+    header, data = bvbabel.vmr.read_vmr(filename)
+
+    _, data1 = bvbabel.vmr.read_vmr(filename, mmap=True, mode='r+')
+    assert isinstance(data1.base, np.memmap)
+    data1[:10, :, :] = 0
+    data1.base.flush()
+    del data1
+
+    header2, data2 = bvbabel.vmr.read_vmr(filename)
+    data[:10, :, :] = 0
+    assert np.array_equal(data, data2)
+    for key in header:
+        assert np.array_equal(header[key], header2[key])
+
+    with pytest.raises(ValueError):
+        bvbabel.vmr.read_vmr(filename, mode='r+')
+    with pytest.raises(ValueError):
+        bvbabel.vmr.read_vmr(FILE_VMR, mmap=True, mode='r+')
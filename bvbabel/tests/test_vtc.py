@@ -1,5 +1,6 @@
 """Test bvbabel VTC functions."""
 
+import os
 import pytest
 import numpy as np
 import bvbabel
@@ -32,3 +33,126 @@ def test_VTC_rearrange_axes_False():
 
     data_dims = np.array(data.shape)
     assert np.array_equal(header_dims[[2, 1, 0, 3]], data_dims)
+
+
+def _create_small_vtc():
+    """Create a small VTC to keep the read write tests fast."""
+    header, _ = bvbabel.vtc.create_vtc(rearrange_data_axes=False)
+    header["XEnd"] = header["XStart"] + 6
+    header["YEnd"] = header["YStart"] + 5
+    header["ZEnd"] = header["ZStart"] + 4
+    header["Nr time points"] = 3
+    data = np.arange(4 * 5 * 6 * 3, dtype=np.short).reshape((4, 5, 6, 3))
+    return header, data
+
+
+@pytest.mark.parametrize("rearrange_data_axes", [True, False])
+def test_VTC_read_mmap(tmp_path, rearrange_data_axes):
+    """Test VTC memory mapped reading matches in-memory reading."""
+    header, data = _create_small_vtc()
+    filename = str(tmp_path / "test.vtc")
+    bvbabel.vtc.write_vtc(filename, header, data, rearrange_data_axes=False)
+
+    header1, data1 = bvbabel.vtc.read_vtc(
+        filename, rearrange_data_axes=rearrange_data_axes)
+    header2, data2 = bvbabel.vtc.read_vtc(
+        filename, rearrange_data_axes=rearrange_data_axes, mmap=True)
+
+    assert header1 == header2
+    assert isinstance(data2, np.memmap)
+    assert np.array_equal(data1, data2)
+
+
+def test_VTC_read_mmap_write(tmp_path):
+    """Test VTC voxel edits through a read-write memmap."""
+    header, data = _create_small_vtc()
+    filename = str(tmp_path / "test.vtc")
+    bvbabel.vtc.write_vtc(filename, header, data, rearrange_data_axes=False)
+    header1, data1 = bvbabel.vtc.read_vtc(filename)
+
+    _, data2 = bvbabel.vtc.read_vtc(filename, mmap=True, mode='r+')
+    data2[1:3, 0, 2, :] = 0
+    del data2
+    data1[1:3, 0, 2, :] = 0
+    header2, data2 = bvbabel.vtc.read_vtc(filename)
+    assert header1 == header2
+    assert np.array_equal(data1, data2)
+
+    with pytest.raises(ValueError):
+        bvbabel.vtc.read_vtc(filename, mode='r+')
+    with pytest.raises(ValueError):
+        bvbabel.vtc.read_vtc(filename, mmap=True, mode='w')
+
+
+@pytest.mark.parametrize("rearrange_data_axes", [True, False])
+@pytest.mark.parametrize("mmap", [True, False])
+def test_VTC_read_bbox(tmp_path, rearrange_data_axes, mmap):
+    """Test VTC partial reading of a voxel block and time window."""
+    header, data = _create_small_vtc()
+    filename = str(tmp_path / "test.vtc")
+    bvbabel.vtc.write_vtc(filename, header, data, rearrange_data_axes=False)
+
+    _, data1 = bvbabel.vtc.read_vtc(
+        filename, rearrange_data_axes=rearrange_data_axes)
+    _, data2 = bvbabel.vtc.read_vtc(
+        filename, rearrange_data_axes=rearrange_data_axes, mmap=mmap,
+        bbox=(1, 3, 0, 4, 2, 4), volumes=slice(1, 3))
+    assert np.array_equal(data1[1:3, 0:4, 2:4, 1:3], data2)
+
+    _, data2 = bvbabel.vtc.read_vtc(
+        filename, rearrange_data_axes=rearrange_data_axes, mmap=mmap,
+        volumes=slice(None, None, 2))
+    assert np.array_equal(data1[..., ::2], data2)
+
+    with pytest.raises(ValueError):
+        bvbabel.vtc.read_vtc(filename, bbox=(0, 7, 0, 1, 0, 1))
+
+
+@pytest.mark.parametrize("extension", [".vtc", ".vtc.gz"])
+def test_VTC_read_volume_index(tmp_path, extension):
+    """Test VTC partial reading of a single time point by index."""
+    header, data = _create_small_vtc()
+    filename = str(tmp_path / ("test" + extension))
+    bvbabel.vtc.write_vtc(filename, header, data)
+    _, data1 = bvbabel.vtc.read_vtc(filename)
+
+    for volume in [1, np.int64(1), -1]:
+        _, data2 = bvbabel.vtc.read_vtc(filename, volumes=volume)
+        assert np.array_equal(data1[..., [volume]], data2)
+
+    for volume in [data.shape[3], 1.5, [0, 1]]:
+        with pytest.raises(ValueError):
+            bvbabel.vtc.read_vtc(filename, volumes=volume)
+
+
+@pytest.mark.parametrize("chunk_voxels", [1, 10, 24, 50, 2**16])
+def test_VTC_export_nifti(tmp_path, chunk_voxels):
+    """Test streaming NIfTI export against the rearranged VTC data."""
+    header, data = _create_small_vtc()
+    filename = str(tmp_path / "test.vtc")
+    bvbabel.vtc.write_vtc(filename, header, data, rearrange_data_axes=False)
+    _, data1 = bvbabel.vtc.read_vtc(filename)
+
+    nii_name = str(tmp_path / "test.nii")
+    bvbabel.vtc.export_nifti(filename, nii_name, chunk_voxels=chunk_voxels)
+    nii, data2 = bvbabel.nifti.read_nifti(nii_name, mmap=True)
+    assert nii["dim"].tolist() == [4, 4, 6, 5, 3, 1, 1, 1]
+    assert nii["datatype"] == 4
+    affine = bvbabel.vtc.get_affine(header)
+    assert np.array_equal(bvbabel.nifti.get_affine(nii), affine)
+    assert np.array_equal(data1, data2)
+
+
+def test_VTC_export_nifti_gzip(tmp_path):
+    """Test streaming NIfTI export into a compressed file."""
+    header, data = _create_small_vtc()
+    filename = str(tmp_path / "test.vtc")
+    bvbabel.vtc.write_vtc(filename, header, data, rearrange_data_axes=False)
+    bvbabel.vtc.export_nifti(filename, str(tmp_path / "test.nii"))
+    bvbabel.vtc.export_nifti(filename, str(tmp_path / "test.nii.gz"))
+
+    _, data1 = bvbabel.nifti.read_nifti(str(tmp_path / "test.nii"))
+    _, data2 = bvbabel.nifti.read_nifti(str(tmp_path / "test.nii.gz"))
+    assert np.array_equal(data1, data2)
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "test.nii", "test.nii.gz", "test.vtc"]
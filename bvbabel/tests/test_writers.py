@@ -0,0 +1,180 @@
+"""Test bvbabel bulk writers against element-wise writing."""
+
+import os
+import gzip
+import struct
+import pytest
+import numpy as np
+import bvbabel
+
+DIR_TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "..",
+                             "test_data")
+
+
+def _write_data_array_per_element(f, data, dtype, chunk_size=None):
+    """Write data the way bvbabel used to, one element at a time."""
+    data = np.reshape(data, np.size(data))
+    for i in range(data.size):
+        f.write(struct.pack(dtype, data[i]))
+
+
+def _write_both(tmp_path, monkeypatch, module, write, *args, **kwargs):
+    """Write the same input with the bulk and the element-wise writers."""
+    filename_bulk = str(tmp_path / "bulk")
+    write(filename_bulk, *args, **kwargs)
+    monkeypatch.setattr(module, "write_data_array",
+                        _write_data_array_per_element)
+    filename_loop = str(tmp_path / "loop")
+    write(filename_loop, *args, **kwargs)
+    with open(filename_bulk, "rb") as f:
+        bytes_bulk = f.read()
+    with open(filename_loop, "rb") as f:
+        bytes_loop = f.read()
+    return bytes_bulk, bytes_loop
+
+
+def _gunzip(filename, tmp_path):
+    """Decompress test data into a temporary directory."""
+    outname = str(tmp_path / os.path.basename(filename)[:-3])
+    with gzip.open(filename, "rb") as f_in, open(outname, "wb") as f_out:
+        f_out.write(f_in.read())
+    return outname
+
+
+# =============================================================================
+def test_write_data_array_chunks(tmp_path):
+    """Test chunked writing of non-contiguous arrays."""
+    data = np.arange(4 * 5 * 6, dtype=np.float64).reshape((4, 5, 6))
+    data = np.transpose(data, (0, 2, 1))[::-1, ::-1, ::-1]
+    filename = str(tmp_path / "data.bin")
+    with open(filename, "wb") as f:
+        bvbabel.utils.write_data_array(f, data, '<f', chunk_size=7)
+    result = np.fromfile(filename, dtype='<f')
+    assert np.array_equal(result, data.flatten())
+
+
+@pytest.mark.parametrize("data, dtype", [
+    (np.array([1.5, 2.0]), '<B'),
+    (np.array([1, 300]), '<B'),
+    (np.array([-1, 2], dtype=np.int16), '<H'),
+    (np.array([1, 2], dtype=np.complex64), '<f'),
+    ])
+def test_write_data_array_unsafe_cast(tmp_path, data, dtype):
+    """Test that values which would change when cast are rejected."""
+    filename = str(tmp_path / "data.bin")
+    with open(filename, "wb") as f:
+        with pytest.raises(ValueError):
+            bvbabel.utils.write_data_array(f, data, dtype)
+    assert os.path.getsize(filename) == 0
+
+
+def test_write_vmr_out_of_range(tmp_path):
+    """Test that VMR values above 255 are not wrapped."""
+    header, data = bvbabel.vmr.read_vmr(
+        os.path.join(DIR_TEST_DATA, "sub-test03_cube.vmr.gz"))
+    data = np.full(data.shape, 300)
+    with pytest.raises(ValueError):
+        bvbabel.vmr.write_vmr(str(tmp_path / "test.vmr"), header, data)
+
+
+@pytest.mark.parametrize("data_type", [1, 2])
+def test_write_vtc(tmp_path, monkeypatch, data_type):
+    """Test VTC bulk writer."""
+    header, _ = bvbabel.vtc.create_vtc()
+    header["Data type (1:short int, 2:float)"] = data_type
+    data = np.random.random((6, 5, 4, 3)) * 225
+    if data_type == 1:
+        data = data.astype(np.short)
+    result = _write_both(tmp_path, monkeypatch, bvbabel.vtc,
+                         bvbabel.vtc.write_vtc, header, data)
+    assert result[0] == result[1]
+
+
+def test_write_v16(tmp_path, monkeypatch):
+    """Test V16 bulk writer."""
+    header = {"DimX": 4, "DimY": 5, "DimZ": 6}
+    data = np.random.randint(0, high=65535, size=(4, 5, 6), dtype=np.uint16)
+    result = _write_both(tmp_path, monkeypatch, bvbabel.v16,
+                         bvbabel.v16.write_v16, header, data)
+    assert result[0] == result[1]
+
+
+def test_write_gtc(tmp_path, monkeypatch):
+    """Test GTC bulk writer."""
+    header = {"File version": 1, "DimD": 3, "DimX": 4, "DimY": 5, "DimT": 6}
+    data = np.random.randint(-1000, high=1000, size=(4, 5, 3, 6))
+    result = _write_both(tmp_path, monkeypatch, bvbabel.gtc,
+                         bvbabel.gtc.write_gtc, header, data)
+    assert result[0] == result[1]
+
+
+def test_write_msk(tmp_path, monkeypatch):
+    """Test MSK bulk writer."""
+    header = {"VTC resolution relative to VMR (1, 2, or 3)": 1,
+              "XStart": 0, "XEnd": 4, "YStart": 0, "YEnd": 5,
+              "ZStart": 0, "ZEnd": 6}
+    data = np.random.randint(0, high=2, size=(6, 4, 5), dtype=np.uint8)
+    result = _write_both(tmp_path, monkeypatch, bvbabel.msk,
+                         bvbabel.msk.write_msk, header, data)
+    assert result[0] == result[1]
+
+
+def test_write_stc(tmp_path, monkeypatch):
+    """Test STC bulk writer."""
+    data = np.random.random((4, 5, 3, 2)).astype(np.float32)
+    result = _write_both(tmp_path, monkeypatch, bvbabel.stc,
+                         bvbabel.stc.write_stc, data)
+    assert result[0] == result[1]
+
+    # Flattened data in file order is returned
+    data_stc = bvbabel.stc.write_stc(str(tmp_path / "test.stc"), data)
+    assert data_stc.shape == (data.size,)
+    assert np.array_equal(
+        data_stc, np.transpose(data[:, ::-1], (2, 3, 1, 0)).ravel())
+
+
+def test_write_smp(tmp_path, monkeypatch):
+    """Test SMP bulk writer."""
+    header, data = bvbabel.smp.create_smp(nr_maps=2, nr_vertices=100)
+    data = np.random.random(data.shape).astype(np.float32)
+    result = _write_both(tmp_path, monkeypatch, bvbabel.smp,
+                         bvbabel.smp.write_smp, header, data)
+    assert result[0] == result[1]
+
+
+def test_write_vmr(tmp_path, monkeypatch):
+    """Test VMR bulk writer against the test data."""
+    filename = _gunzip(os.path.join(DIR_TEST_DATA, "sub-test03_cube.vmr.gz"),
+                       tmp_path)
+    header, data = bvbabel.vmr.read_vmr(filename)
+    result = _write_both(tmp_path, monkeypatch, bvbabel.vmr,
+                         bvbabel.vmr.write_vmr, header, data)
+    assert result[0] == result[1]
+    with open(filename, "rb") as f:
+        assert result[0] == f.read()
+
+
+def test_write_mtc(tmp_path, monkeypatch):
+    """Test MTC bulk writer against the test data."""
+    filename = _gunzip(os.path.join(DIR_TEST_DATA, "sub-test03_cube.mtc.gz"),
+                       tmp_path)
+    header, data = bvbabel.mtc.read_mtc(filename)
+    result = _write_both(tmp_path, monkeypatch, bvbabel.mtc,
+                         bvbabel.mtc.write_mtc, header, data)
+    assert result[0] == result[1]
+
+
+def test_write_srf(tmp_path, monkeypatch):
+    """Test SRF bulk writer against the test data."""
+    filename = _gunzip(os.path.join(DIR_TEST_DATA, "sub-test03_cube.srf.gz"),
+                       tmp_path)
+    header, mesh_data = bvbabel.srf.read_srf(filename)
+    result = _write_both(tmp_path, monkeypatch, bvbabel.srf,
+                         bvbabel.srf.write_srf, header, mesh_data)
+    assert result[0] == result[1]
+
+    # Vertices are stored as all X, then all Y, then all Z coordinates
+    nr_vertices = header["Nr vertices"]
+    vertices = np.frombuffer(result[0], dtype='<f', count=nr_vertices * 3,
+                             offset=28)
+    assert np.array_equal(vertices, mesh_data["vertices"].T.flatten())
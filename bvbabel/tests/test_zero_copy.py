@@ -0,0 +1,88 @@
+"""Test bvbabel zero-copy whole-file parse mode."""
+
+import io
+import os
+import gzip
+import pytest
+import numpy as np
+import bvbabel
+
+DIR_TEST_DATA = os.path.join(os.path.dirname(__file__), "..", "..",
+                             "test_data")
+
+
+def _gunzip(filename, tmp_path):
+    """Decompress test data into a temporary directory."""
+    outname = str(tmp_path / os.path.basename(filename)[:-3])
+    with gzip.open(filename, "rb") as f_in, open(outname, "wb") as f_out:
+        f_out.write(f_in.read())
+    return outname
+
+
+def _assert_equal(a, b):
+    """Compare nested reader outputs."""
+    if isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for key in a:
+            _assert_equal(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for i, j in zip(a, b):
+            _assert_equal(i, j)
+    elif isinstance(a, np.ndarray):
+        assert a.dtype == b.dtype and np.array_equal(a, b)
+    else:
+        assert a == b
+
+
+# =============================================================================
+@pytest.mark.parametrize("fmt, basename", [
+    ("vtc", "sub-test03.vtc.gz"),
+    ("vmr", "sub-test03_cube.vmr.gz"),
+    ("vmr", "sub-test01_fileversion-2.vmr.gz"),
+    ("smp", "sub-test02_left_hemisphere_4_curvature_maps.smp.gz"),
+    ("srf", "sub-test03_cube.srf.gz"),
+    ("mtc", "sub-test03_cube.mtc.gz"),
+    ])
+def test_read_zero_copy(tmp_path, fmt, basename):
+    """Test that zero-copy mode returns the same as reading the file."""
+    filename = _gunzip(os.path.join(DIR_TEST_DATA, basename), tmp_path)
+    read = getattr(getattr(bvbabel, fmt), "read_" + fmt)
+    _assert_equal(read(filename, zero_copy=True), read(filename))
+
+
+def test_read_zero_copy_views(tmp_path):
+    """Test that zero-copy data are writable views of the mapped file."""
+    filename = _gunzip(os.path.join(DIR_TEST_DATA, "sub-test03.vtc.gz"),
+                       tmp_path)
+    _, data = bvbabel.vtc.read_vtc(filename, zero_copy=True)
+    assert not data.flags.owndata and data.flags.writeable
+
+    # Copy-on-write: changes do not reach the file
+    data[...] = 0
+    _, data2 = bvbabel.vtc.read_vtc(filename)
+    assert np.any(data2 != 0)
+
+
+@pytest.mark.parametrize("names", [["Map 1", "Map 2", "Map 3"],
+                                   ["Map 1", "Map 22", "Map 3"]])
+def test_read_zero_copy_smp(names):
+    """Test SMP maps are one view when the map headers are equally sized."""
+    header, data = bvbabel.smp.create_smp(nr_maps=3, nr_vertices=10)
+    data = np.arange(30, dtype=np.float32).reshape((10, 3))
+    for map_header, name in zip(header["Map"], names):
+        map_header["Name"] = name
+    f = io.BytesIO()
+    bvbabel.smp.write_smp(f, header, data)
+    content = f.getvalue()
+
+    _, data2 = bvbabel.smp.read_smp(content, zero_copy=True)
+    assert np.array_equal(data, data2)
+    evenly_spaced = len(set(len(name) for name in names)) == 1
+    buffer = np.frombuffer(content, dtype=np.uint8)
+    assert np.shares_memory(data2, buffer) == evenly_spaced
+
+    # NOTE: Two maps are always evenly spaced
+    _, data2 = bvbabel.smp.read_smp(content, maps=[0, 2], zero_copy=True)
+    assert np.array_equal(data[:, [0, 2]], data2)
+    assert np.shares_memory(data2, buffer)
@@ -1,5 +1,17 @@
 """Utility functions."""
+import io
+import os
+import gzip
+import mmap
+import zlib
+import queue
+import shutil
+import bisect
 import struct
+import numbers
+import tempfile
+import threading
+from collections import namedtuple
 import numpy as np
 
 
@@ -8,22 +20,1129 @@ def check_extension():
     print("TODO")
 
 
+def open_file(filename, zero_copy=False, text=False, gzip_index=None):
+    r"""Open BrainVoyager file for reading.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file. Paths ending with '.gz' are decompressed on the fly.
+        Open file objects are read from their current position and are left
+        open. Text file objects are accepted for text formats, and binary
+        formats use their underlying binary buffer. Bytes, bytearray and
+        memoryview objects hold the file content (gzip-compressed content is
+        detected) and are parsed in place.
+    zero_copy : bool
+        When 'True', the whole file is mapped into memory once (copy-on-write
+        `mmap`) and a BufferReader over the mapping is returned. When the
+        file cannot be mapped (e.g. it is empty, compressed or a file
+        object), it is read into a bytearray instead. Data arrays read from
+        bytes-like input are views of it, otherwise they are copies.
+    text : bool
+        When 'True', a text file object is returned.
+    gzip_index : bool or GzipIndex, optional
+        When given for a '.gz' path, seeks restart decompression at the
+        checkpoints of the index instead of at the start of the file. 'True'
+        uses the side-car index of the file (see `load_gzip_index`).
+
+    Returns
+    -------
+    f : file object or BufferReader
+        To be used as a context manager.
+
+    """
+    if isinstance(filename, (bytes, bytearray, memoryview)):
+        buffer = filename
+        if bytes(buffer[:2]) == b"\x1f\x8b":
+            with gzip.GzipFile(fileobj=io.BytesIO(buffer)) as f:
+                buffer = _read_all(f)
+        if text is True:
+            return io.TextIOWrapper(io.BytesIO(buffer))
+        return BufferReader(buffer, copy=zero_copy is not True)
+    elif is_file_object(filename):
+        if text is True and not isinstance(filename, io.TextIOBase):
+            return _KeepOpen(io.TextIOWrapper(filename), detach=True)
+        elif text is not True and isinstance(filename, io.TextIOBase):
+            filename = filename.buffer
+        if zero_copy is True:
+            return BufferReader(_read_all(filename))
+        return _KeepOpen(filename)
+    elif is_gzip_path(filename):
+        if text is True:
+            return gzip.open(filename, 'rt')
+        elif zero_copy is True:
+            with gzip.open(filename, 'rb') as f:
+                return BufferReader(_read_all(f))
+        elif gzip_index is True:
+            gzip_index = load_gzip_index(filename)
+        if isinstance(gzip_index, GzipIndex):
+            return io.BufferedReader(IndexedGzipReader(filename, gzip_index))
+        return gzip.open(filename, 'rb')
+    elif text is True:
+        return open(filename, 'r')
+    elif zero_copy is not True:
+        return open(filename, 'rb')
+    with open(filename, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (ValueError, OSError):
+            buffer = bytearray(os.fstat(f.fileno()).st_size)
+            f.readinto(buffer)
+    return BufferReader(buffer)
+
+
+def create_file(filename, text=False, compresslevel=6):
+    r"""Open BrainVoyager file for writing.
+
+    Parameters
+    ----------
+    filename : string or file object
+        Path to file. Paths ending with '.gz' are compressed in a background
+        thread while the data is being written. Open file objects are
+        written at their current position and are left open. Text file
+        objects are accepted for text formats, and binary formats use their
+        underlying binary buffer.
+    text : bool
+        When 'True', a text file object is returned.
+    compresslevel : int
+        Compression level (0-9) of '.gz' files.
+
+    Returns
+    -------
+    f : file object
+        To be used as a context manager.
+
+    """
+    if is_file_object(filename):
+        if text is True and not isinstance(filename, io.TextIOBase):
+            return _KeepOpen(io.TextIOWrapper(filename), detach=True)
+        elif text is not True and isinstance(filename, io.TextIOBase):
+            filename.flush()
+            filename = filename.buffer
+        return _KeepOpen(filename)
+    elif is_gzip_path(filename):
+        f = ThreadedGzipWriter(filename, compresslevel)
+        return io.TextIOWrapper(f) if text is True else f
+    return open(filename, 'w' if text is True else 'wb')
+
+
+def is_file_object(filename):
+    r"""Check whether the input is an open file object instead of a path."""
+    return hasattr(filename, "read") or hasattr(filename, "write")
+
+
+def is_path(filename):
+    r"""Check whether the input is a path instead of a file or its content."""
+    return isinstance(filename, (str, os.PathLike))
+
+
+def is_gzip_path(filename):
+    r"""Check whether the input is a path with '.gz' extension."""
+    return is_path(filename) and os.fspath(filename).lower().endswith(".gz")
+
+
+def can_memmap(filename):
+    r"""Check whether the input is a path of an uncompressed file."""
+    return is_path(filename) and not is_gzip_path(filename)
+
+
+def check_mmap_mode(mmap, mode):
+    r"""Check the memmap mode requested from a reader."""
+    if mode not in ('r', 'r+', 'c'):
+        raise ValueError("Unknown memory map mode '{}'.".format(mode))
+    if mode != 'r' and mmap is not True:
+        raise ValueError("Memory map mode '{}' needs 'mmap=True'."
+                         .format(mode))
+
+
+def rewrite_file(filename, patches, chunk_size=2**20):
+    r"""Stream a file into a patched copy that then replaces it.
+
+    Parameters
+    ----------
+    filename : string
+        Path to (uncompressed) file.
+    patches : list of (int, int, bytes)
+        Offset and number of bytes in the original file that are replaced by
+        the bytes. A size of zero inserts the bytes at the offset.
+    chunk_size : int
+        Number of bytes copied at once.
+
+    Notes
+    -----
+    The copy is written next to the file and renamed over it when complete,
+    so that the original file stays intact when the rewrite fails.
+
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_name = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+    try:
+        with open(filename, 'rb') as f_in, os.fdopen(fd, 'wb') as f_out:
+            position = 0
+            for offset, size, buffer in sorted(patches, key=lambda p: p[:2]):
+                nr_bytes = offset - position
+                while nr_bytes > 0:
+                    chunk = f_in.read(min(nr_bytes, chunk_size))
+                    if not chunk:
+                        raise ValueError("Unexpected end of file.")
+                    f_out.write(chunk)
+                    nr_bytes -= len(chunk)
+                f_out.write(buffer)
+                f_in.seek(size, 1)
+                position = offset + size
+            shutil.copyfileobj(f_in, f_out, chunk_size)
+        shutil.copymode(filename, tmp_name)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+
+
+def _read_all(f, chunk_size=2**24):
+    """Read the rest of a file object into a bytearray in large chunks."""
+    buffer = bytearray()
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return buffer
+        buffer += chunk
+
+
+class _KeepOpen(object):
+    """Context manager that leaves a file object of the caller open."""
+
+    def __init__(self, f, detach=False):
+        self.f = f
+        self.detach = detach
+
+    def __enter__(self):
+        return self.f
+
+    def __exit__(self, *args):
+        if self.detach:
+            self.f.detach()  # Flushes the text wrapper
+        elif hasattr(self.f, "flush"):
+            self.f.flush()
+
+
+class ThreadedGzipWriter(io.BufferedIOBase):
+    r"""Gzip file writer that compresses in a background thread.
+
+    Written bytes are collected into chunks and handed to a compressing
+    thread through a bounded queue, so that compression overlaps with
+    producing the data while memory stays bounded.
+
+    Parameters
+    ----------
+    filename : string
+        Path to file.
+    compresslevel : int
+        Compression level (0-9).
+    chunk_size : int
+        Number of bytes that are compressed at once.
+    queue_size : int
+        Maximum number of chunks waiting to be compressed.
+    flush_interval : int
+        Approximate number of bytes between full flush points. Decompression
+        can restart at these points, see `GzipIndex`.
+
+    """
+
+    def __init__(self, filename, compresslevel=6, chunk_size=2**20,
+                 queue_size=8, flush_interval=2**22):
+        super().__init__()
+        self._file = gzip.open(filename, 'wb', compresslevel)
+        self._chunk_size = chunk_size
+        self._flush_interval = flush_interval
+        self._buffer = bytearray()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._compress, daemon=True)
+        self._thread.start()
+
+    def _compress(self):
+        """Compress and write chunks until None is received."""
+        nr_bytes = 0
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self._error is None:
+                try:
+                    self._file.write(chunk)
+                    nr_bytes += len(chunk)
+                    if nr_bytes >= self._flush_interval:
+                        self._file.flush(zlib.Z_FULL_FLUSH)
+                        nr_bytes = 0
+                except BaseException as error:
+                    self._error = error
+
+    def _check_error(self):
+        """Raise the error of the compressing thread in the caller."""
+        if self._error is not None:
+            raise self._error
+
+    def writable(self):
+        r"""Gzip writers are always writable."""
+        return True
+
+    def write(self, b):
+        r"""Queue bytes for compression, return the number of bytes."""
+        if self.closed:
+            raise ValueError("write to closed file")
+        self._check_error()
+        b = memoryview(b).cast('B')
+        # NOTE: Bytes are copied in chunks, the caller may reuse its buffer
+        i = self._chunk_size - len(self._buffer)
+        self._buffer += b[:i]
+        while len(self._buffer) == self._chunk_size:
+            self._queue.put(bytes(self._buffer))
+            self._buffer = bytearray(b[i:i + self._chunk_size])
+            i += self._chunk_size
+        return len(b)
+
+    def close(self):
+        r"""Compress the remaining bytes and close the file."""
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._queue.put(bytes(self._buffer))
+            self._queue.put(None)
+            self._thread.join()
+            self._file.close()
+        finally:
+            super().close()
+        self._check_error()
+
+
+# =============================================================================
+# Random access into gzip files
+# =============================================================================
+_GZIP_INDEX_MAGIC = b"BVGZIDX1"
+_SYNC_MARKER = b"\x00\x00\xff\xff"  # End of the empty block of a flush
+_WINDOW_SIZE = 2**15
+
+
+class GzipIndex(object):
+    r"""Checkpoints for random access into a gzip file (zran-style).
+
+    Each checkpoint holds a position in the compressed file, the matching
+    position in the decompressed data and the last 32 KiB of decompressed
+    data before it (the deflate window). Decompression restarts at the
+    closest checkpoint before a requested position instead of at the start
+    of the file.
+
+    Parameters
+    ----------
+    points : list of tuples
+        (compressed offset, decompressed offset, window) of each checkpoint.
+        Window is None at the start of a gzip member.
+    spacing : int
+        Approximate number of decompressed bytes between checkpoints.
+    compressed_size : int
+        Size of the indexed gzip file in bytes.
+
+    Notes
+    -----
+    Only `zlib` of the standard library is used. As it cannot resume
+    decompression at an arbitrary bit of the deflate stream, checkpoints are
+    placed at byte-aligned restart points: starts of gzip members and flush
+    points (e.g. written by `ThreadedGzipWriter`, `pigz -i` or `bgzip`). A
+    gzip file without such points is indexed with a single checkpoint and
+    read sequentially.
+
+    """
+
+    def __init__(self, points, spacing, compressed_size):
+        self.points = list(points)
+        self.spacing = spacing
+        self.compressed_size = compressed_size
+
+    @classmethod
+    def build(cls, filename, spacing=2**22, chunk_size=2**20):
+        r"""Build the index by decompressing the whole file once.
+
+        Parameters
+        ----------
+        filename : string
+            Path to gzip file.
+        spacing : int
+            Approximate number of decompressed bytes between checkpoints.
+        chunk_size : int
+            Number of compressed bytes read at once.
+
+        Returns
+        -------
+        index : GzipIndex
+
+        """
+        points = [(0, 0, None)]
+        state = {"d": zlib.decompressobj(31), "pos": 0, "window": b"",
+                 "candidate": None, "member_start": False, "end": False}
+
+        def output(data):
+            """Track decompressed position, window and candidate check."""
+            state["pos"] += len(data)
+            state["window"] = (state["window"] + data[-_WINDOW_SIZE:]
+                               )[-_WINDOW_SIZE:]
+            candidate = state["candidate"]
+            if candidate is not None:
+                expected = candidate["expected"]
+                expected += data[:4096 - len(expected)]
+
+        def feed(data, data_end):
+            """Feed compressed bytes that end at file offset `data_end`."""
+            candidate = state["candidate"]
+            if candidate is not None:
+                try:
+                    candidate["got"] += candidate["d"].decompress(data)
+                except zlib.error:
+                    state["candidate"] = candidate = None
+            while data and not state["end"]:
+                if state["member_start"]:
+                    # Next gzip member (zero padding ends the file)
+                    if data[:1] == b"\x00":
+                        state["end"] = True
+                        break
+                    state["member_start"] = False
+                    if state["pos"] - points[-1][1] >= spacing:
+                        points.append((data_end - len(data), state["pos"],
+                                       None))
+                output(state["d"].decompress(data))
+                if not state["d"].eof:
+                    break
+                data = state["d"].unused_data
+                state["d"] = zlib.decompressobj(31)
+                state["member_start"] = True
+
+            # Accept a verified candidate checkpoint
+            if candidate is not None and (len(candidate["expected"]) >= 4096
+                                          or state["end"]):
+                n = len(candidate["expected"])
+                if n > 0 and bytes(candidate["got"][:n]) == \
+                        bytes(candidate["expected"]):
+                    points.append(candidate["point"])
+                state["candidate"] = None
+
+        with open(filename, 'rb') as f:
+            offset = 0  # File offset of the start of `data`
+            data = b""
+            while not state["end"]:
+                chunk = f.read(chunk_size)
+                data = data + chunk
+                # NOTE: Last bytes are kept back as a marker may continue
+                # in the next chunk
+                limit = len(data) if not chunk else max(len(data) - 3, 0)
+                start = 0
+                i = data.find(_SYNC_MARKER, start)
+                while 0 <= i and i + 4 <= limit:
+                    end = i + 4
+                    feed(data[start:end], offset + end)
+                    start = end
+                    if (state["candidate"] is None and not state["end"]
+                            and state["pos"] - points[-1][1] >= spacing):
+                        window = state["window"]
+                        state["candidate"] = {
+                            "point": (offset + end, state["pos"], window),
+                            "d": zlib.decompressobj(-15, zdict=window),
+                            "got": bytearray(), "expected": bytearray()}
+                    i = data.find(_SYNC_MARKER, start)
+                feed(data[start:limit], offset + limit)
+                offset += limit
+                data = data[limit:]
+                if not chunk:
+                    break
+            compressed_size = os.fstat(f.fileno()).st_size
+        return cls(points, spacing, compressed_size)
+
+    def save(self, filename):
+        r"""Save the index as a binary side-car file."""
+        with open(filename, 'wb') as f:
+            f.write(_GZIP_INDEX_MAGIC)
+            f.write(struct.pack('<QQI', self.compressed_size, self.spacing,
+                                len(self.points)))
+            for comp, uncomp, window in self.points:
+                # NOTE: Windows are stored compressed
+                window = b"" if window is None else zlib.compress(window)
+                f.write(struct.pack('<QQI', comp, uncomp, len(window)))
+                f.write(window)
+
+    @classmethod
+    def load(cls, filename):
+        r"""Load the index from a binary side-car file."""
+        with open(filename, 'rb') as f:
+            if f.read(len(_GZIP_INDEX_MAGIC)) != _GZIP_INDEX_MAGIC:
+                raise ValueError("Not a bvbabel gzip index file.")
+            compressed_size, spacing, nr_points = struct.unpack(
+                '<QQI', f.read(20))
+            points = list()
+            for i in range(nr_points):
+                comp, uncomp, nr_bytes = struct.unpack('<QQI', f.read(20))
+                window = zlib.decompress(f.read(nr_bytes)) if nr_bytes \
+                    else None
+                points.append((comp, uncomp, window))
+        return cls(points, spacing, compressed_size)
+
+
+def load_gzip_index(filename, spacing=2**22):
+    r"""Load the side-car index of a gzip file, build and save it if needed.
+
+    Parameters
+    ----------
+    filename : string
+        Path to gzip file. The index is stored as `filename + '.idx'`.
+    spacing : int
+        Approximate number of decompressed bytes between checkpoints of a
+        newly built index.
+
+    Returns
+    -------
+    index : GzipIndex
+
+    """
+    filename = os.fspath(filename)
+    index_file = filename + ".idx"
+    if os.path.isfile(index_file) and \
+            os.path.getmtime(index_file) >= os.path.getmtime(filename):
+        try:
+            index = GzipIndex.load(index_file)
+            if index.compressed_size == os.path.getsize(filename):
+                return index
+        except (ValueError, struct.error, zlib.error):
+            pass
+    index = GzipIndex.build(filename, spacing)
+    try:
+        index.save(index_file)
+    except OSError:
+        pass  # NOTE: Read-only archives are indexed again on each use
+    return index
+
+
+class IndexedGzipReader(io.RawIOBase):
+    r"""Seekable reader of a gzip file that restarts at index checkpoints.
+
+    Forward seeks within the checkpoint spacing decompress and skip the
+    bytes in between, other seeks restart at the closest checkpoint.
+
+    Parameters
+    ----------
+    filename : string
+        Path to gzip file.
+    index : GzipIndex
+        Checkpoints of the file, see `load_gzip_index`.
+    chunk_size : int
+        Number of compressed bytes read at once.
+
+    """
+
+    def __init__(self, filename, index, chunk_size=2**16):
+        super().__init__()
+        self.index = index
+        self._file = open(filename, 'rb')
+        self._chunk_size = chunk_size
+        self._positions = [point[1] for point in index.points]
+        self._restart(0)
+
+    def _restart(self, i):
+        """Restart decompression at the i-th checkpoint."""
+        comp, uncomp, window = self.index.points[i]
+        self._file.seek(comp)
+        if window is None:
+            self._d = zlib.decompressobj(31)
+        else:
+            self._d = zlib.decompressobj(-15, zdict=window)
+        self._input = b""
+        self._member_start = False
+        self._trailer = 0  # Bytes of gzip member trailer left to skip
+        self._raw = window is not None
+        self._pos = uncomp
+
+    def readable(self):
+        r"""Gzip readers are always readable."""
+        return True
+
+    def seekable(self):
+        r"""Gzip readers are always seekable."""
+        return True
+
+    def tell(self):
+        r"""Return the current position in the decompressed data."""
+        return self._pos
+
+    def readinto(self, b):
+        r"""Decompress the next bytes into a writable buffer."""
+        view = memoryview(b).cast('B')
+        n = 0
+        while n < len(view):
+            if not self._input:
+                self._input = self._file.read(self._chunk_size)
+                if not self._input:
+                    break
+            if self._trailer:
+                # NOTE: Raw deflate restarts leave CRC and size unread
+                skip = min(self._trailer, len(self._input))
+                self._input = self._input[skip:]
+                self._trailer -= skip
+                continue
+            if self._member_start:
+                # Next gzip member (zero padding ends the file)
+                if self._input[:1] == b"\x00":
+                    self._file.seek(0, 2)
+                    self._input = b""
+                    break
+                self._member_start = False
+            data = self._d.decompress(self._input, len(view) - n)
+            view[n:n + len(data)] = data
+            n += len(data)
+            if self._d.eof:
+                self._input = self._d.unused_data
+                if self._raw:
+                    self._trailer = 8
+                    self._raw = False
+                self._d = zlib.decompressobj(31)
+                self._member_start = True
+            else:
+                self._input = self._d.unconsumed_tail
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=0):
+        r"""Change the position in the decompressed data."""
+        if whence == 1:
+            offset += self._pos
+        elif whence != 0:
+            raise io.UnsupportedOperation("Gzip readers seek from the start.")
+        i = bisect.bisect_right(self._positions, offset) - 1
+        if offset < self._pos or self._positions[i] > self._pos:
+            self._restart(i)
+
+        # Decompress and skip the bytes up to the new position
+        buffer = bytearray(min(offset - self._pos, 2**20))
+        while self._pos < offset:
+            if not self.readinto(memoryview(buffer)[:offset - self._pos]):
+                break
+        return self._pos
+
+    def close(self):
+        r"""Close the underlying compressed file."""
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class BufferReader(object):
+    r"""Binary file interface over an in-memory buffer.
+
+    Reads return `memoryview` slices of the buffer and `read_data_array`
+    returns `np.frombuffer` views, so no bytes are copied while parsing.
+
+    Parameters
+    ----------
+    buffer : bytes, bytearray, memoryview or mmap.mmap
+        Binary data of the whole file.
+    copy : bool
+        When 'True', `read_array` returns copies instead of views.
+
+    """
+
+    def __init__(self, buffer, copy=False):
+        self.view = memoryview(buffer).cast('B')
+        self.buffer = self.view if isinstance(buffer, memoryview) else buffer
+        self.copy = copy
+        self.pos = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        r"""Do nothing, the buffer lives as long as the arrays viewing it."""
+        pass
+
+    def readable(self):
+        r"""Buffers are always readable."""
+        return True
+
+    def seekable(self):
+        r"""Buffers are always seekable."""
+        return True
+
+    def tell(self):
+        r"""Return the current position in the buffer."""
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        r"""Change the position, like `io.IOBase.seek`."""
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += len(self.view)
+        self.pos = offset
+        return self.pos
+
+    def read(self, size=-1):
+        r"""Return the next `size` bytes (all remaining by default)."""
+        start = min(self.pos, len(self.view))
+        if size is None or size < 0:
+            self.pos = len(self.view)
+        else:
+            self.pos = min(start + size, len(self.view))
+        return self.view[start:self.pos]
+
+    def readinto(self, b):
+        r"""Copy the next bytes into a writable buffer."""
+        b = memoryview(b).cast('B')
+        data = self.read(b.nbytes)
+        b[:len(data)] = data
+        return len(data)
+
+    def read_array(self, dtype, count):
+        r"""Return the next `count` values as a 1D numpy array view."""
+        nr_bytes = count * np.dtype(dtype).itemsize
+        if self.pos + nr_bytes > len(self.view):
+            raise ValueError("Unexpected end of file.")
+        data = np.frombuffer(self.buffer, dtype=dtype, count=count,
+                             offset=self.pos)
+        self.pos += nr_bytes
+        return data.copy() if self.copy else data
+
+
 def read_variable_length_string(f):
-    r"""Read BrainVoyager variable length strings terminate with b'\x00'."""
-    text = ""
-    data, = struct.unpack('<s', f.read(1))
-    while data != b'\x00':
-        text += data.decode("utf-8", 'ignore')
-        data = f.read(1)
-    return text
+    r"""Read BrainVoyager variable length strings terminate with b'\x00'.
+
+    The terminator is searched with `bytes.find` in buffered chunks instead
+    of reading byte by byte. Buffered files are peeked into, other seekable
+    files (e.g. io.BytesIO) are read in chunks and rewound to just after the
+    terminator. BufferReader buffers are searched directly. The bytes are
+    decoded at once, so that multi-byte UTF-8 characters are kept intact.
+
+    Parameters
+    ----------
+    f : file object
+        Opened binary file.
+
+    Returns
+    -------
+    text : string
+
+    """
+    if isinstance(f, BufferReader):
+        text, f.pos = unpack_variable_length_string(f.buffer, f.pos)
+        return text
+
+    peek = getattr(f, "peek", None)
+    chunk_size = 64 if peek is None and f.seekable() else 1
+    text = bytearray()
+    while True:
+        chunk = peek(1) if peek is not None else f.read(chunk_size)
+        if not chunk:
+            raise ValueError("Unexpected end of file.")
+        i = chunk.find(b'\x00')
+        if i < 0:
+            text += chunk
+            if peek is not None:
+                f.read(len(chunk))
+        else:
+            text += chunk[:i]
+            if peek is not None:
+                f.read(i + 1)
+            elif chunk_size > 1:
+                f.seek(i + 1 - len(chunk), 1)
+            return text.decode("utf-8", 'ignore')
+
+
+def unpack_variable_length_string(buffer, offset=0):
+    r"""Read BrainVoyager variable length string from an in-memory buffer.
+
+    Parameters
+    ----------
+    buffer : bytes, bytearray, mmap.mmap or memoryview
+        Binary data.
+    offset : int
+        Position of the first character in the buffer.
+
+    Returns
+    -------
+    text : string
+    offset : int
+        Position right after the b'\x00' terminator.
+
+    """
+    if isinstance(buffer, memoryview):
+        # NOTE: memoryview has no find method, search in small copies
+        end = -1
+        for start in range(offset, len(buffer), 4096):
+            i = bytes(buffer[start:start + 4096]).find(b'\x00')
+            if i >= 0:
+                end = start + i
+                break
+    else:
+        end = buffer.find(b'\x00', offset)
+    if end < 0:
+        raise ValueError("Unexpected end of file.")
+    text = bytes(buffer[offset:end]).decode("utf-8", 'ignore')
+    return text, end + 1
 
 
 def write_variable_length_string(f, in_string):
     r"""Write BrainVoyager variable length strings terminate with b'\x00'."""
-    for i in range(len(in_string)):
-        data = bytes(in_string[i], 'utf-8')
-        f.write(struct.pack('<s', data))
-    f.write(b'\x00')
+    f.write(in_string.encode("utf-8") + b'\x00')
+
+
+def get_out_array(out, shape, dtype):
+    r"""Prepare a caller-supplied array or pooled buffer to read data into.
+
+    Parameters
+    ----------
+    out : numpy.array or BufferPool
+        C-contiguous array with as many values of `dtype` as `shape` holds,
+        or a pool that provides such an array.
+    shape : tuple of ints
+        Shape of the data as stored in the file.
+    dtype : string
+        Binary data type, e.g. '<f' for little-endian float (4 bytes).
+
+    Returns
+    -------
+    out : numpy.array
+        View of `out` with `shape`.
+
+    """
+    if isinstance(out, BufferPool):
+        return out.get(shape, dtype)
+    if (not isinstance(out, np.ndarray) or out.dtype != np.dtype(dtype)
+            or out.size != int(np.prod(shape))
+            or not out.flags.c_contiguous or not out.flags.writeable):
+        raise ValueError("Output array needs to be a writable contiguous "
+                         "array of {} values of type {}."
+                         .format(int(np.prod(shape)), np.dtype(dtype)))
+    return out.reshape(shape)
+
+
+class BufferPool(object):
+    r"""Recycle data buffers across reads of same-shaped files.
+
+    Pass the pool as `out` to a reader to fill a recycled buffer instead of
+    allocating a new array, and `release` the returned data when it is not
+    needed anymore. Recycled buffers are already paged in, so that batch
+    loops avoid both allocations and page faults.
+
+    Parameters
+    ----------
+    max_free : int
+        Maximum number of released buffers that are kept for reuse.
+
+    Examples
+    --------
+    >>> pool = bvbabel.BufferPool()
+    >>> for filename in filenames:
+    ...     header, data = bvbabel.vtc.read_vtc(filename, out=pool)
+    ...     results.append(data.mean(axis=-1))
+    ...     pool.release(data)
+
+    """
+
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self._free = list()
+        self._used = dict()  # id of buffer -> buffer
+        self._lock = threading.Lock()  # Pools are shared by reader threads
+
+    def get(self, shape, dtype):
+        r"""Return a contiguous array from a free buffer of the same size.
+
+        Parameters
+        ----------
+        shape : tuple of ints
+            Array shape.
+        dtype : numpy.dtype or string
+            Array data type.
+
+        Returns
+        -------
+        array : numpy.array
+            Uninitialized array. Its buffer is in use until it is released.
+
+        """
+        nr_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with self._lock:
+            for i, buffer in enumerate(self._free):
+                if buffer.nbytes == nr_bytes:
+                    del self._free[i]
+                    break
+            else:
+                buffer = None
+        if buffer is None:
+            buffer = np.empty(nr_bytes, dtype=np.uint8)
+        with self._lock:
+            self._used[id(buffer)] = buffer
+        return buffer.view(dtype).reshape(shape)
+
+    def release(self, array):
+        r"""Return the buffer of an array (or a view of it) to the pool."""
+        while array is not None:
+            with self._lock:
+                buffer = self._used.pop(id(array), None)
+                if buffer is not None:
+                    if len(self._free) < self.max_free:
+                        self._free.append(buffer)
+                    return
+            array = array.base
+        raise ValueError("Array is not a buffer in use of this pool.")
+
+
+def read_data_array(f, dtype, count, out=None, chunk_size=2**24):
+    r"""Read multiple binary values into 1D numpy array in one go.
+
+    Parameters
+    ----------
+    f : file object
+        Opened binary file.
+    dtype : string
+        Expected binary data type, e.g. '<f' for little-endian float (4 bytes).
+    count : int
+        Number of values.
+    out : numpy.array, optional
+        Contiguous array (of `count` elements with `dtype`) to read into.
+    chunk_size : int
+        Maximum number of bytes that are read at once.
+
+    Returns
+    -------
+    data : 1D numpy.array
+        When `f` is a BufferReader and `out` is not given, a view of the
+        buffer.
+
+    """
+    if out is None and isinstance(f, BufferReader):
+        return f.read_array(dtype, count)
+    if out is None:
+        data = np.empty(count, dtype=dtype)
+    else:
+        data = out
+
+    # NOTE: Reading in large chunks keeps the temporary buffers of compressed
+    # files bounded and handles file objects returning fewer bytes.
+    view = memoryview(data).cast('B')
+    nr_bytes = 0
+    while nr_bytes < len(view):
+        n = f.readinto(view[nr_bytes:nr_bytes + chunk_size])
+        if not n:
+            raise ValueError("Unexpected end of file.")
+        nr_bytes += n
+    return data
+
+
+def stack_arrays(arrays):
+    r"""Stack 1D arrays of equal size and type into a 2D array.
+
+    Parameters
+    ----------
+    arrays : list of 1D numpy.arrays
+        At least one array.
+
+    Returns
+    -------
+    data : 2D numpy.array, (nr arrays, array size)
+        A strided view when the arrays are evenly spaced views of the same
+        buffer (e.g. blocks of values separated by equally sized headers),
+        otherwise a copy.
+
+    """
+    first = arrays[0]
+    steps = np.diff([a.__array_interface__["data"][0] for a in arrays])
+    step = int(steps[0]) if steps.size else first.nbytes
+    if (first.base is not None and first.strides == (first.itemsize,)
+            and step >= first.nbytes and np.all(steps == step)
+            and all(a.base is first.base and a.dtype == first.dtype
+                    and a.shape == first.shape and a.strides == first.strides
+                    for a in arrays)):
+        shape = (len(arrays), first.size)
+        strides = (step, first.itemsize)
+        return np.lib.stride_tricks.as_strided(
+            first, shape, strides, writeable=first.flags.writeable)
+    return np.stack(arrays)
+
+
+def write_data_array(f, data, dtype, chunk_size=2**20):
+    r"""Write numpy array as one contiguous block of binary values.
+
+    Parameters
+    ----------
+    f : file object
+        Opened binary file.
+    data : numpy.array
+        Values are written in C order (last axis changes the fastest). Values
+        that would change when cast to `dtype` (e.g. floats or 300 written as
+        '<B') raise a ValueError.
+    dtype : string
+        Expected binary data type, e.g. '<f' for little-endian float (4 bytes).
+    chunk_size : int
+        Maximum number of elements that are converted and written at once.
+        Keeps the temporary memory bounded for large (non-contiguous) arrays.
+
+    """
+    data = np.asarray(data)
+    _check_cast(data, dtype)
+    _write_chunks(f, data, dtype, chunk_size)
+
+
+def _check_cast(data, dtype):
+    """Raise when values cannot be written as `dtype` without changing."""
+    dtype = np.dtype(dtype)
+    if not np.can_cast(data.dtype, dtype, 'same_kind'):
+        raise ValueError("Cannot write {} data as {}."
+                         .format(data.dtype, dtype))
+    if dtype.kind in "iu" and data.size > 0:
+        info = np.iinfo(dtype)
+        if data.min() < info.min or data.max() > info.max:
+            raise ValueError("Data values are out of range for {} "
+                             "({} to {}).".format(dtype, info.min, info.max))
+
+
+def _write_chunks(f, data, dtype, chunk_size):
+    """Write array in chunks of at most `chunk_size` elements."""
+    if data.ndim > 1 and data.size > chunk_size:
+        for data_sub in data:
+            _write_chunks(f, data_sub, dtype, chunk_size)
+    else:
+        data = np.reshape(data, data.size)
+        for i in range(0, data.size, chunk_size):
+            chunk = np.ascontiguousarray(data[i:i + chunk_size], dtype=dtype)
+            f.write(chunk.data)
+
+
+def is_map_selected(maps, index, name, nr_maps):
+    r"""Check whether a map is requested by its index or by its name.
+
+    Parameters
+    ----------
+    maps : int, string, list of ints and/or strings or None
+        Requested map indices (negative indices count from the end) or map
+        names. None selects all maps.
+    index : int
+        Index of the map in the file.
+    name : string
+        Name of the map.
+    nr_maps : int
+        Number of maps in the file.
+
+    Returns
+    -------
+    bool
+
+    """
+    if maps is None:
+        return True
+    for m in _get_map_list(maps):
+        if isinstance(m, str):
+            if m == name:
+                return True
+        elif m % nr_maps == index and -nr_maps <= m < nr_maps:
+            return True
+    return False
+
+
+def _get_map_list(maps):
+    """Requested maps as a list of ints (incl. numpy integers) and strings."""
+    if isinstance(maps, (numbers.Integral, str)) or not np.iterable(maps):
+        maps = [maps]
+    maps = list(maps)
+    for m in maps:
+        if not isinstance(m, (numbers.Integral, str)):
+            raise ValueError("Maps are selected by integer index or name, "
+                             "not {!r}.".format(m))
+    return maps
+
+
+def select_maps(maps, names):
+    r"""Find indices of requested maps.
+
+    Parameters
+    ----------
+    maps : int, string, list of ints and/or strings or None
+        Requested map indices (negative indices count from the end) or map
+        names. None selects all maps.
+    names : list of strings
+        Names of all maps in the file.
+
+    Returns
+    -------
+    indices : list of ints
+        Selected map indices in the order they are stored in the file. Maps
+        requested more than once are selected once.
+
+    """
+    if maps is not None:
+        maps = _get_map_list(maps)
+        check_maps(maps, len(names), names)
+    nr_maps = len(names)
+    return [i for i in range(nr_maps)
+            if is_map_selected(maps, i, names[i], nr_maps)]
+
+
+def check_maps(maps, nr_maps, names=None):
+    r"""Check that requested maps exist.
+
+    Parameters
+    ----------
+    maps : int, string or list of ints and/or strings
+        Requested map indices (negative indices count from the end) or map
+        names.
+    nr_maps : int
+        Number of maps in the file.
+    names : list of strings, optional
+        Names of all maps in the file. By default only the indices are
+        checked, e.g. before the map names are read.
+
+    """
+    for m in _get_map_list(maps):
+        if isinstance(m, str):
+            if names is not None and m not in names:
+                raise ValueError("Map '{}' is not found.".format(m))
+        elif not -nr_maps <= m < nr_maps:
+            raise ValueError("Map index {} is out of range.".format(m))
+
+
+def read_text_lines(f, nr_lines=None):
+    r"""Read non-empty, stripped lines of a BrainVoyager text file.
+
+    Parameters
+    ----------
+    f : file object
+        Opened text file.
+    nr_lines : int or None
+        Stop after this many non-empty lines. None reads all lines.
+
+    Returns
+    -------
+    lines : list of strings
+
+    """
+    lines = list()
+    for line in f:
+        line = line.strip()
+        if line:
+            lines.append(line)
+            if nr_lines is not None and len(lines) == nr_lines:
+                break
+    return lines
+
+
+def parse_text_header(lines):
+    r"""Parse "key: value" header lines of a BrainVoyager text file."""
+    header = dict()
+    for line in lines:
+        content = line.split(":")
+        content = [i.strip() for i in content]
+        if content[1].isdigit():
+            header[content[0]] = int(content[1])
+        else:
+            header[content[0]] = content[1]
+    return header
 
 
 def read_RGB_bytes(f):
@@ -48,3 +1167,179 @@ def read_float_array(f, nr_floats):
         data, = struct.unpack('<f', f.read(4))
         out_data[i] = data
     return out_data
+
+
+# =============================================================================
+# Declarative binary headers
+# =============================================================================
+HeaderField = namedtuple("HeaderField", ["name", "fmt", "cond", "default"],
+                         defaults=[None, None])
+HeaderField.__doc__ = r"""Single entry of a binary header schema.
+
+Parameters
+----------
+name : string
+    Header dictionary key.
+fmt : string
+    Little-endian struct format character of a single value (e.g. 'h' for
+    short int, 'f' for float), a repeat count followed by a format character
+    for a fixed-size numpy array (e.g. '3B' for RGB bytes), a length followed
+    by 's' for fixed-size bytes (e.g. '80s') or 'z' for a variable-length
+    string terminated with b'\x00'.
+cond : callable, optional
+    Called with the header dictionary read so far. The field is only present
+    in the file when it returns True. Consecutive fields sharing the same
+    `cond` object are read and written together.
+default : optional
+    Header value that is stored when `cond` returns False while reading. A
+    callable is called with the header dictionary read so far instead, no
+    value is stored when it returns None.
+
+"""
+
+
+class HeaderSchema(object):
+    r"""Binary header layout that is read and written in batched steps.
+
+    Consecutive fixed-size fields sharing the same condition are compiled into
+    a single `struct.Struct`, so that they are read with one `f.read` and one
+    unpack. Variable-length strings and changes of condition start a new
+    step.
+
+    Parameters
+    ----------
+    fields : list of HeaderField
+        Fields in the order they are stored in the file.
+
+    """
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self._steps = list()  # (cond, struct.Struct or None, fields)
+        formats = list()
+        for field in self.fields:
+            if field.fmt == 'z':
+                self._steps.append((field.cond, None, [field]))
+                formats.append(None)
+            elif (self._steps and self._steps[-1][1] is not None
+                  and self._steps[-1][0] is field.cond):
+                self._steps[-1][2].append(field)
+                formats[-1] += field.fmt
+            else:
+                self._steps.append((field.cond, True, [field]))
+                formats.append('<' + field.fmt)
+        self._steps = [
+            (cond, None if fmt is None else struct.Struct(fmt), fields)
+            for (cond, _, fields), fmt in zip(self._steps, formats)]
+
+    def read(self, f, header=None):
+        r"""Read header fields from a binary file.
+
+        Parameters
+        ----------
+        f : file object
+            Opened binary file, positioned at the start of the header.
+        header : dictionary, optional
+            Dictionary that the fields are added to. Conditions can refer to
+            entries that are already in it.
+
+        Returns
+        -------
+        header : dictionary
+
+        """
+        if header is None:
+            header = dict()
+        for cond, compiled, fields in self._steps:
+            if cond is not None and not cond(header):
+                for field in fields:
+                    value = field.default
+                    if callable(value):
+                        value = value(header)
+                    if value is not None:
+                        header[field.name] = value
+            elif compiled is None:
+                header[fields[0].name] = read_variable_length_string(f)
+            else:
+                buffer = f.read(compiled.size)
+                if len(buffer) != compiled.size:
+                    raise ValueError("Unexpected end of file.")
+                values = compiled.unpack(buffer)
+                i = 0
+                for field in fields:
+                    if len(field.fmt) == 1 or field.fmt[-1] == 's':
+                        header[field.name] = values[i]
+                        i += 1
+                    else:
+                        n = int(field.fmt[:-1])
+                        header[field.name] = np.array(
+                            values[i:i + n], dtype='<' + field.fmt[-1])
+                        i += n
+        return header
+
+    def pack(self, header):
+        r"""Pack header fields into bytes.
+
+        Parameters
+        ----------
+        header : dictionary
+            Header that contains (at least) the fields of this schema.
+
+        Returns
+        -------
+        bytes
+
+        """
+        chunks = list()
+        for cond, compiled, fields in self._steps:
+            if cond is not None and not cond(header):
+                continue
+            elif compiled is None:
+                chunks.append(header[fields[0].name].encode("utf-8") + b'\x00')
+            else:
+                values = list()
+                for field in fields:
+                    if len(field.fmt) == 1 or field.fmt[-1] == 's':
+                        values.append(header[field.name])
+                    else:
+                        values.extend(np.ravel(header[field.name]).tolist())
+                chunks.append(compiled.pack(*values))
+        return b''.join(chunks)
+
+    def write(self, f, header):
+        r"""Write header fields to a binary file in a single write."""
+        f.write(self.pack(header))
+
+    def locate(self, header, name):
+        r"""Find where a header field is stored.
+
+        Parameters
+        ----------
+        header : dictionary
+            Header that the field positions are computed from (conditions and
+            lengths of preceding variable-length strings).
+        name : string
+            Name of the field.
+
+        Returns
+        -------
+        offset : int
+            Position of the field relative to the start of the header.
+        size : int
+            Number of bytes of the field.
+
+        """
+        offset = 0
+        for cond, compiled, fields in self._steps:
+            if cond is not None and not cond(header):
+                continue
+            for field in fields:
+                if field.fmt == 'z':
+                    size = len(header[field.name].encode("utf-8")) + 1
+                else:
+                    size = struct.calcsize('<' + field.fmt)
+                if field.name == name:
+                    return offset, size
+                offset += size
+        raise ValueError("Field '{}' is not stored in the header."
+                         .format(name))
@@ -1,19 +1,44 @@
 """Read, write, create BrainVoyager V16 file format."""
 
-import struct
 import numpy as np
-from bvbabel.utils import (read_variable_length_string,
-                           write_variable_length_string)
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file, can_memmap, check_mmap_mode
 
 
 # =============================================================================
-def read_v16(filename):
+# V16 header layout
+# =============================================================================
+_V16_HEADER = HeaderSchema([
+    # Expected binary data: unsigned short int (2 bytes)
+    HeaderField("DimX", 'H'),
+    HeaderField("DimY", 'H'),
+    HeaderField("DimZ", 'H'),
+    ])
+
+
+# =============================================================================
+def read_v16(filename, zero_copy=False, mmap=False, mode='r'):
     """Read BrainVoyager V16 file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
+    mmap : bool
+        When 'True', the data is not loaded into memory. Instead a
+        numpy.memmap of the data section is returned (read-only unless
+        `mode` is given, axes are rearranged as views of the memmap). Needs
+        an uncompressed file path.
+    mode : string
+        Mode of the memmap when `mmap` is 'True'. 'r+' opens the data for
+        writing: changes to the returned data go straight to the file.
+        'c' is copy-on-write.
 
     Returns
     -------
@@ -23,25 +48,8 @@ def read_v16(filename):
         Image data.
 
     """
-    header = dict()
-    with open(filename, 'rb') as f:
-        # ---------------------------------------------------------------------
-        # V16 Pre-Data Header
-        # ---------------------------------------------------------------------
-        # NOTE: V16 files contain anatomical 3D data sets,
-        # typically containing the whole brain (head) of subjects. The
-        # intensity values are stored as a series of bytes. The V16 format
-        # stores each intensity value with two bytes (short integers). The V16
-        # format contains a small header followed by the actual data. V16
-        # files do not contain a post-data header and have no file version
-
-        # Expected binary data: unsigned short int (2 bytes)
-        data, = struct.unpack('<H', f.read(2))
-        header["DimX"] = data
-        data, = struct.unpack('<H', f.read(2))
-        header["DimY"] = data
-        data, = struct.unpack('<H', f.read(2))
-        header["DimZ"] = data
+    with open_file(filename, zero_copy) as f:
+        header = _read_v16_header(f)
 
         # ---------------------------------------------------------------------
         # V16 Data
@@ -59,12 +67,16 @@ def read_v16(filename):
         #   BV (Z left -> right) [axis 0 after np.reshape] = X in Tal space
 
         # Expected binary data: unsigned short (2 bytes)
-        data_img = np.zeros((header["DimZ"] * header["DimY"] * header["DimX"]),
-                            dtype='<H')
-        data_img = np.fromfile(f, dtype='<H', count=data_img.size, sep="",
-                               offset=0)
-        data_img = np.reshape(
-            data_img, (header["DimZ"], header["DimY"], header["DimX"]))
+        dims = (header["DimZ"], header["DimY"], header["DimX"])
+        if mmap is True and not can_memmap(filename):
+            raise ValueError("Memory mapping needs an uncompressed file path.")
+        check_mmap_mode(mmap, mode)
+        if mmap is True:
+            data_img = np.memmap(filename, dtype='<H', mode=mode,
+                                 offset=f.tell(), shape=dims)
+        else:
+            data_img = read_data_array(f, '<H', int(np.prod(dims)))
+            data_img = np.reshape(data_img, dims)
 
         data_img = np.transpose(data_img, (0, 2, 1))  # BV to Tal
         data_img = data_img[::-1, ::-1, ::-1]  # Flip BV axes
@@ -72,31 +84,62 @@ def read_v16(filename):
     return header, data_img
 
 
+# =============================================================================
+def read_v16_header(filename):
+    """Read BrainVoyager V16 file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Pre-data header.
+
+    """
+    with open_file(filename) as f:
+        header = _read_v16_header(f)
+    return header
+
+
+def _read_v16_header(f):
+    """Read V16 header, leaving the file at the start of the data."""
+    # -------------------------------------------------------------------------
+    # V16 Pre-Data Header
+    # -------------------------------------------------------------------------
+    # NOTE: V16 files contain anatomical 3D data sets,
+    # typically containing the whole brain (head) of subjects. The
+    # intensity values are stored as a series of bytes. The V16 format
+    # stores each intensity value with two bytes (short integers). The V16
+    # format contains a small header followed by the actual data. V16
+    # files do not contain a post-data header and have no file version
+
+    return _V16_HEADER.read(f)
+
+
 # =============================================================================
 def write_v16(filename, header, data_img):
     """Protocol to write BrainVoyager V16 file.
 
     Parameters
     ----------
-    filename : string
-        Output filename.
+    filename : string or file object
+        Output filename ('.gz' files are compressed on the fly) or an open
+        file object.
     header : dictionary
         Header of V16 file (vmr headers are also accepted).
     data_img : numpy.array, 3D
         Image.
 
     """
-    with open(filename, 'wb') as f:
+    with create_file(filename) as f:
         # ---------------------------------------------------------------------
         # V16 Pre-Data Header
         # ---------------------------------------------------------------------
-        # Expected binary data: unsigned short int (2 bytes)
-        data = header["DimX"]
-        f.write(struct.pack('<H', data))
-        data = header["DimY"]
-        f.write(struct.pack('<H', data))
-        data = header["DimZ"]
-        f.write(struct.pack('<H', data))
+        _V16_HEADER.write(f, header)
 
         # ---------------------------------------------------------------------
         # V16 Data
@@ -106,9 +149,7 @@ def write_v16(filename, header, data_img):
         data_img = np.transpose(data_img, (0, 2, 1))  # BV to Tal
 
         # Expected binary data: unsigned short (2 bytes)
-        data_img = data_img.flatten()
-        for i in range(data_img.size):
-            f.write(struct.pack('<H', data_img[i]))
+        write_data_array(f, data_img, '<H')
 
     return print("V16 saved.")
 
@@ -1,19 +1,139 @@
 """Read, write, create BrainVoyager VMP file format."""
 
 import struct
+import numbers
 import numpy as np
-from bvbabel.utils import read_variable_length_string, read_RGB_bytes
-from bvbabel.utils import write_variable_length_string, write_RGB_bytes
+from bvbabel.utils import read_variable_length_string
+from bvbabel.utils import write_variable_length_string
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import select_maps
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file, can_memmap, rewrite_file
 
 
 # =============================================================================
-def read_vmp(filename):
+# VMP header layout
+# =============================================================================
+def _is_lag_map(map_header):
+    """Additional values are only stored for cross-correlation maps."""
+    return map_header["TypeOfMap"] == 3
+
+
+_VMP_HEADER = HeaderSchema([
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("NR-VMP identifier", 'i'),
+
+    # Expected binary data: short int (2 bytes)
+    HeaderField("VersionNumber", 'h'),
+    HeaderField("DocumentType", 'h'),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("NrOfSubMaps", 'i'),  # number of sub-maps/component maps
+    HeaderField("NrOfTimePoints", 'i'),
+    HeaderField("NrOfComponentParams", 'i'),
+    HeaderField("ShowParamsRangeFrom", 'i'),
+    HeaderField("ShowParamsRangeTo", 'i'),
+    HeaderField("UseForFingerprintParamsRangeFrom", 'i'),
+    HeaderField("UseForFingerprintParamsRangeTo", 'i'),
+
+    HeaderField("XStart", 'i'),
+    HeaderField("XEnd", 'i'),
+    HeaderField("YStart", 'i'),
+    HeaderField("YEnd", 'i'),
+    HeaderField("ZStart", 'i'),
+    HeaderField("ZEnd", 'i'),
+
+    HeaderField("Resolution", 'i'),
+    HeaderField("DimX", 'i'),
+    HeaderField("DimY", 'i'),
+    HeaderField("DimZ", 'i'),
+
+    # Expected binary data: variable-length string
+    HeaderField("NameOfVTCFile", 'z'),
+    HeaderField("NameOfProtocolFile", 'z'),
+    HeaderField("NameOfVOIFile", 'z'),
+    ])
+
+_VMP_MAP_HEADER = HeaderSchema([
+    # Expected binary data: int (4 bytes)
+    HeaderField("TypeOfMap", 'i'),
+
+    # Expected binary data: float (4 bytes)
+    HeaderField("MapThreshold", 'f'),
+    HeaderField("UpperThreshold", 'f'),
+
+    # Expected binary data: variable-length string
+    HeaderField("MapName", 'z'),
+
+    # Expected binary data: char (1 byte) x 3
+    HeaderField("RGB positive min", '3B'),
+    HeaderField("RGB positive max", '3B'),
+    HeaderField("RGB negative min", '3B'),
+    HeaderField("RGB negative max", '3B'),
+
+    # Expected binary data: char (1 byte)
+    HeaderField("UseVMPColor", 'B'),
+
+    # Expected binary data: variable-length string
+    HeaderField("LUTFileName", 'z'),
+
+    # Expected binary data: float (4 bytes)
+    HeaderField("TransparentColorFactor", 'f'),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("NrOfLags", 'i', _is_lag_map),  # cross-correlation values
+    HeaderField("DisplayMinLag", 'i', _is_lag_map),
+    HeaderField("DisplayMaxLag", 'i', _is_lag_map),
+    HeaderField("ShowCorrelationOrLag", 'i', _is_lag_map),
+    HeaderField("ClusterSizeThreshold", 'i'),
+
+    # Expected binary data: char (1 byte)
+    HeaderField("EnableClusterSizeThreshold", 'b'),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("ShowValuesAboveUpperThreshold", 'i'),
+    HeaderField("DF1", 'i'),
+    HeaderField("DF2", 'i'),
+
+    # Expected binary data: char (1 byte)
+    HeaderField("ShowPosNegValues", 'b'),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("NrOfUsedVoxels", 'i'),
+    HeaderField("SizeOfFDRTable", 'i'),
+    ])
+
+_VMP_MAP_HEADER_END = HeaderSchema([
+    # Expected binary data: int (4 bytes)
+    HeaderField("UseFDRTableIndex", 'i'),
+    ])
+
+
+# =============================================================================
+def read_vmp(filename, maps=None, zero_copy=False, gzip_index=False):
     """Read BrainVoyager VMP file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    maps : int, string or list of ints and/or strings, optional
+        Indices or names of the maps to be read. Volumes of the other maps are
+        skipped without reading them. Selected maps are returned once each,
+        in the order they are stored in the file (not in the order of
+        `maps`), and the header only contains the selected maps. By default
+        all maps are read.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
+    gzip_index : bool or bvbabel.utils.GzipIndex
+        For '.gz' files, skipped maps are sought over through the checkpoints
+        of a random access index instead of being decompressed. When 'True',
+        the side-car index `filename + '.idx'` is used, it is built on first
+        use.
 
     Returns
     -------
@@ -23,179 +143,8 @@ def read_vmp(filename):
         Image data.
 
     """
-    header = dict()
-    with open(filename, 'rb') as f:
-        # ---------------------------------------------------------------------
-        # NR-VMP Header (Version 6)
-        # ---------------------------------------------------------------------
-
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["NR-VMP identifier"] = data
-
-        # Expected binary data: short int (2 bytes)
-        data, = struct.unpack('<h', f.read(2))
-        header["VersionNumber"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["DocumentType"] = data
-
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["NrOfSubMaps"] = data  # number of sub-maps/component maps
-        data, = struct.unpack('<i', f.read(4))
-        header["NrOfTimePoints"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["NrOfComponentParams"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["ShowParamsRangeFrom"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["ShowParamsRangeTo"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["UseForFingerprintParamsRangeFrom"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["UseForFingerprintParamsRangeTo"] = data
-
-        data, = struct.unpack('<i', f.read(4))
-        header["XStart"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["XEnd"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["YStart"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["YEnd"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["ZStart"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["ZEnd"] = data
-
-        data, = struct.unpack('<i', f.read(4))
-        header["Resolution"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["DimX"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["DimY"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["DimZ"] = data
-
-        # Expected binary data: variable-length string
-        data = read_variable_length_string(f)
-        header["NameOfVTCFile"] = data
-        data = read_variable_length_string(f)
-        header["NameOfProtocolFile"] = data
-        data = read_variable_length_string(f)
-        header["NameOfVOIFile"] = data
-
-        # Store each map as a dictionary element of a list
-        header["Map"] = []
-        for m in range(header["NrOfSubMaps"]):
-            header["Map"].append(dict())
-
-            # Expected binary data: int (4 bytes)
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["TypeOfMap"] = data
-
-            # Expected binary data: float (4 bytes)
-            data, = struct.unpack('<f', f.read(4))
-            header["Map"][m]["MapThreshold"] = data
-            data, = struct.unpack('<f', f.read(4))
-            header["Map"][m]["UpperThreshold"] = data
-
-            # Expected binary data: variable-length string
-            data = read_variable_length_string(f)
-            header["Map"][m]["MapName"] = data
-
-            # Expected binary data: char (1 byte) x 3
-            data = read_RGB_bytes(f)
-            header["Map"][m]["RGB positive min"] = data
-            data = read_RGB_bytes(f)
-            header["Map"][m]["RGB positive max"] = data
-            data = read_RGB_bytes(f)
-            header["Map"][m]["RGB negative min"] = data
-            data = read_RGB_bytes(f)
-            header["Map"][m]["RGB negative max"] = data
-
-            # Expected binary data: char (1 byte)
-            data, = struct.unpack('<B', f.read(1))
-            header["Map"][m]["UseVMPColor"] = data
-
-            # Expected binary data: variable-length string
-            data = read_variable_length_string(f)
-            header["Map"][m]["LUTFileName"] = data
-
-            # Expected binary data: float (4 bytes)
-            data, = struct.unpack('<f', f.read(4))
-            header["Map"][m]["TransparentColorFactor"] = data
-
-            # Expected binary data: int (4 bytes)
-            if header["Map"][m]["TypeOfMap"] == 3:  # cross-correlation values
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["NrOfLags"] = data
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["DisplayMinLag"] = data
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["DisplayMaxLag"] = data
-                data, = struct.unpack('<i', f.read(4))
-                header["Map"][m]["ShowCorrelationOrLag"] = data
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["ClusterSizeThreshold"] = data
-
-            # Expected binary data: char (1 byte)
-            data, = struct.unpack('<b', f.read(1))
-            header["Map"][m]["EnableClusterSizeThreshold"] = data
-
-            # Expected binary data: int (4 bytes)
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["ShowValuesAboveUpperThreshold"] = data
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["DF1"] = data
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["DF2"] = data
-
-            # Expected binary data: char (1 byte)
-            data, = struct.unpack('<b', f.read(1))
-            header["Map"][m]["ShowPosNegValues"] = data
-
-            # Expected binary data: int (4 bytes)
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["NrOfUsedVoxels"] = data
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["SizeOfFDRTable"] = data
-
-            # Expected binary data: float (4 bytes) x SizeOfFDRTable x 3
-            # (q, crit std, crit conservative)
-            # TODO: Check FDR Tables
-            temp = np.zeros((header["Map"][m]["SizeOfFDRTable"], 3))
-            for i in range(header["Map"][m]["SizeOfFDRTable"]):
-                for j in range(3):
-                    data, = struct.unpack('<f', f.read(4))
-                    temp[i, j] = data
-            header["Map"][m]["FDRTableInfo"] = temp
-
-            # Expected binary data: int (4 bytes)
-            data, = struct.unpack('<i', f.read(4))
-            header["Map"][m]["UseFDRTableIndex"] = data
-
-            # Time course values associated with component "c"
-            if header["NrOfTimePoints"] > 0:
-                header["ComponentTimeCourseValues"] = []
-                for i in range(header["NrOfSubMaps"]):
-                    data = np.zeros(header["NrOfTimePoints"])
-                    for j in range(header["NrOfTimePoints"]):
-                        data[j], = struct.unpack('<f', f.read(4))
-                    header["ComponentTimeCourseValues"].append(data)
-
-            # Component parameters
-            if header["NrOfComponentParams"] > 0:
-                header["ComponentTimeCourseParams"] = []
-                for i in range(header["NrOfComponentParams"]):
-                    header["ComponentTimeCourseParams"].append(dict())
-
-                    name = read_variable_length_string(f)
-                    header["ComponentTimeCourseParams"][i]["Name"] = name
-
-                    for j in range(header["NrOfSubMaps"]):
-                        data, = struct.unpack('<f', f.read(4))
-                        header["ComponentTimeCourseParams"][i]["Values"].append(data)
+    with open_file(filename, zero_copy, gzip_index=gzip_index) as f:
+        header = _read_vmp_header(f)
 
         # ---------------------------------------------------------------------
         # Read VMP image data
@@ -215,14 +164,30 @@ def read_vmp(filename):
         #   BV (X front -> back) [axis 2 after np.reshape] = Y in Tal space
         #   BV (Y top -> bottom) [axis 1 after np.reshape] = Z in Tal space
         #   BV (Z left -> right) [axis 0 after np.reshape] = X in Tal space
-        VMP_resolution = header["Resolution"]
-        DimX = (header["XEnd"] - header["XStart"]) // VMP_resolution
-        DimY = (header["YEnd"] - header["YStart"]) // VMP_resolution
-        DimZ = (header["ZEnd"] - header["ZStart"]) // VMP_resolution
+        DimX, DimY, DimZ = _get_dims(header)
         DimT = header["NrOfSubMaps"]
-        data_img = np.zeros(DimT * DimZ * DimY * DimX)
-        data_img = np.fromfile(f, dtype='<f', count=data_img.size, sep="",
-                               offset=0)
+        if maps is None:
+            data_img = read_data_array(f, '<f', DimT * DimZ * DimY * DimX)
+        else:
+            map_names = [header["Map"][m]["MapName"] for m in range(DimT)]
+            idx_maps = select_maps(maps, map_names)
+            header["Map"] = [header["Map"][m] for m in idx_maps]
+            header["NrOfSubMaps"] = DimT = len(idx_maps)
+
+            # Component values are stored per map as well
+            if header["NrOfTimePoints"] > 0:
+                header["ComponentTimeCourseValues"] = \
+                    header["ComponentTimeCourseValues"][idx_maps]
+            for params in header.get("ComponentTimeCourseParams", []):
+                params["Values"] = params["Values"][idx_maps]
+
+            # Seek to each selected map volume, skipping the others
+            nr_voxels = DimZ * DimY * DimX
+            data_offset = f.tell()
+            data_img = np.empty((DimT, nr_voxels), dtype='<f')
+            for i, m in enumerate(idx_maps):
+                f.seek(data_offset + m * nr_voxels * 4)
+                read_data_array(f, '<f', nr_voxels, out=data_img[i])
         data_img = np.reshape(data_img, (DimT, DimZ, DimY, DimX))
         data_img = np.transpose(data_img, (1, 3, 2, 0))  # BV to Tal
         data_img = data_img[::-1, ::-1, ::-1, :]  # Flip BV axes
@@ -230,172 +195,220 @@ def read_vmp(filename):
     return header, data_img
 
 
+# =============================================================================
+def read_vmp_header(filename):
+    """Read BrainVoyager VMP file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Pre-data headers.
+
+    """
+    with open_file(filename) as f:
+        header = _read_vmp_header(f)
+    return header
+
+
+def _get_dims(header):
+    """Dimensions of the map volumes in BrainVoyager axes."""
+    VMP_resolution = header["Resolution"]
+    DimX = (header["XEnd"] - header["XStart"]) // VMP_resolution
+    DimY = (header["YEnd"] - header["YStart"]) // VMP_resolution
+    DimZ = (header["ZEnd"] - header["ZStart"]) // VMP_resolution
+    return DimX, DimY, DimZ
+
+
+def _read_vmp_header(f):
+    """Read VMP header, leaving the file at the start of the data."""
+    # -------------------------------------------------------------------------
+    # NR-VMP Header (Version 6)
+    # -------------------------------------------------------------------------
+    header = _VMP_HEADER.read(f)
+
+    # Store each map as a dictionary element of a list
+    header["Map"] = []
+    for m in range(header["NrOfSubMaps"]):
+        header["Map"].append(_VMP_MAP_HEADER.read(f))
+
+        # Expected binary data: float (4 bytes) x SizeOfFDRTable x 3
+        # (q, crit std, crit conservative)
+        # TODO: Check FDR Tables
+        nr_rows = header["Map"][m]["SizeOfFDRTable"]
+        header["Map"][m]["FDRTableInfo"] = np.reshape(
+            read_data_array(f, '<f', nr_rows * 3), (nr_rows, 3))
+
+        _VMP_MAP_HEADER_END.read(f, header["Map"][m])
+
+        # Time course values associated with component "c"
+        # Expected binary data: float (4 bytes) x NrOfSubMaps x NrOfTimePoints
+        if header["NrOfTimePoints"] > 0:
+            dims = (header["NrOfSubMaps"], header["NrOfTimePoints"])
+            header["ComponentTimeCourseValues"] = np.reshape(
+                read_data_array(f, '<f', dims[0] * dims[1]), dims)
+
+        # Component parameters
+        if header["NrOfComponentParams"] > 0:
+            header["ComponentTimeCourseParams"] = []
+            for i in range(header["NrOfComponentParams"]):
+                header["ComponentTimeCourseParams"].append(dict())
+
+                name = read_variable_length_string(f)
+                header["ComponentTimeCourseParams"][i]["Name"] = name
+
+                # Expected binary data: float (4 bytes) x NrOfSubMaps
+                header["ComponentTimeCourseParams"][i]["Values"] = \
+                    read_data_array(f, '<f', header["NrOfSubMaps"])
+
+    return header
+
+
+def _get_header_layout(f):
+    """Header parts as (key prefix, offset, schema, header) for patching."""
+    header = _VMP_HEADER.read(f)
+    layout = [((), 0, _VMP_HEADER, header)]
+    for m in range(header["NrOfSubMaps"]):
+        offset = f.tell()
+        map_header = _VMP_MAP_HEADER.read(f)
+        layout.append((("Map", m), offset, _VMP_MAP_HEADER, map_header))
+        f.seek(map_header["SizeOfFDRTable"] * 3 * 4, 1)  # Skip FDR table
+
+        layout.append((("Map", m), f.tell(), _VMP_MAP_HEADER_END,
+                       map_header))
+        _VMP_MAP_HEADER_END.read(f, map_header)
+
+        # Skip component time courses and parameters
+        f.seek(header["NrOfSubMaps"] * header["NrOfTimePoints"] * 4, 1)
+        for i in range(header["NrOfComponentParams"]):
+            read_variable_length_string(f)
+            f.seek(header["NrOfSubMaps"] * 4, 1)
+    return layout
+
+
+# =============================================================================
+class VMPFile(object):
+    """BrainVoyager VMP file with maps that are read on access.
+
+    The map volumes are memory mapped, nothing is read until a map is
+    indexed. Each map is returned as an oriented view, without the copy that
+    `read_vmp` makes to rearrange all maps at once.
+
+    Parameters
+    ----------
+    filename : string
+        Path to (uncompressed) VMP file.
+
+    Attributes
+    ----------
+    header : dictionary
+        Pre-data headers, as returned by `read_vmp_header`.
+    data : 4D numpy.memmap, [maps, BV Z, BV Y, BV X]
+        Read-only map volumes as stored in the file.
+
+    Examples
+    --------
+    >>> with bvbabel.vmp.VMPFile("contrasts.vmp") as vmp:
+    ...     data = vmp["Faces > Houses"]  # or vmp[12]
+    ...     print(len(vmp), data.shape)
+
+    """
+
+    def __init__(self, filename):
+        if not can_memmap(filename):
+            raise ValueError("Memory mapping needs an uncompressed file path.")
+        with open_file(filename) as f:
+            self.header = _read_vmp_header(f)
+            data_offset = f.tell()
+        DimX, DimY, DimZ = _get_dims(self.header)
+        self.data = np.memmap(filename, dtype='<f', mode='r',
+                              offset=data_offset,
+                              shape=(self.header["NrOfSubMaps"], DimZ, DimY,
+                                     DimX))
+
+        # Index of each map name, the first map when names repeat
+        self._names = dict()
+        for m, map_header in enumerate(self.header["Map"]):
+            self._names.setdefault(map_header["MapName"], m)
+
+    def __len__(self):
+        return self.header["NrOfSubMaps"]
+
+    def __getitem__(self, key):
+        """Map volume [x, y, z] by index or name, as in `read_vmp`."""
+        if isinstance(key, str):
+            if key not in self._names:
+                raise ValueError("Map '{}' is not found.".format(key))
+            m = self._names[key]
+        elif isinstance(key, numbers.Integral):
+            if not -len(self) <= key < len(self):
+                raise ValueError("Map index {} is out of range.".format(key))
+            m = key
+        else:
+            raise TypeError("A single map is indexed by an integer or a "
+                            "name, not {!r}.".format(key))
+        data_map = np.transpose(self.data[m], (0, 2, 1))  # BV to Tal
+        return data_map[::-1, ::-1, ::-1]  # Flip BV axes
+
+    def __iter__(self):
+        for m in range(len(self)):
+            yield self[m]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Release the memory map."""
+        self.data = None
+
+
 # =============================================================================
 def write_vmp(filename, header, data_img):
     """Protocol to write BrainVoyager VMP file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Pre-data and post-data headers.
     data_img : 3D numpy.array
         Image data.
 
     """
-    with open(filename, 'wb') as f:
+    with create_file(filename) as f:
         # ---------------------------------------------------------------------
         # NR-VMP Header (Version 6)
         # ---------------------------------------------------------------------
-
-        # Expected binary data: int (4 bytes)
-        data = header["NR-VMP identifier"]
-        f.write(struct.pack('<i', data))
-
-        # Expected binary data: short int (2 bytes)
-        data = header["VersionNumber"]
-        f.write(struct.pack('<h', data))
-        data = header["DocumentType"]
-        f.write(struct.pack('<h', data))
-
-        # Expected binary data: int (4 bytes)
-        data = header["NrOfSubMaps"]  # number of sub-maps/component maps
-        f.write(struct.pack('<i', data))
-        data = header["NrOfTimePoints"]
-        f.write(struct.pack('<i', data))
-        data = header["NrOfComponentParams"]
-        f.write(struct.pack('<i', data))
-        data = header["ShowParamsRangeFrom"]
-        f.write(struct.pack('<i', data))
-        data = header["ShowParamsRangeTo"]
-        f.write(struct.pack('<i', data))
-        data = header["UseForFingerprintParamsRangeFrom"]
-        f.write(struct.pack('<i', data))
-        data = header["UseForFingerprintParamsRangeTo"]
-        f.write(struct.pack('<i', data))
-
-        data = header["XStart"]
-        f.write(struct.pack('<i', data))
-        data = header["XEnd"]
-        f.write(struct.pack('<i', data))
-        data = header["YStart"]
-        f.write(struct.pack('<i', data))
-        data = header["YEnd"]
-        f.write(struct.pack('<i', data))
-        data = header["ZStart"]
-        f.write(struct.pack('<i', data))
-        data = header["ZEnd"]
-        f.write(struct.pack('<i', data))
-
-        data = header["Resolution"]
-        f.write(struct.pack('<i', data))
-        data = header["DimX"]
-        f.write(struct.pack('<i', data))
-        data = header["DimY"]
-        f.write(struct.pack('<i', data))
-        data = header["DimZ"]
-        f.write(struct.pack('<i', data))
-
-        # Expected binary data: variable-length string
-        data = header["NameOfVTCFile"]
-        write_variable_length_string(f, data)
-        data = header["NameOfProtocolFile"]
-        write_variable_length_string(f, data)
-        data = header["NameOfVOIFile"]
-        write_variable_length_string(f, data)
+        _VMP_HEADER.write(f, header)
 
         # Store each map as a dictionary element of a list
         for m in range(header["NrOfSubMaps"]):
-
-            # Expected binary data: int (4 bytes)
-            data = header["Map"][m]["TypeOfMap"]
-            f.write(struct.pack('<i', data))
-
-            # Expected binary data: float (4 bytes)
-            data = header["Map"][m]["MapThreshold"]
-            f.write(struct.pack('<f', data))
-            data = header["Map"][m]["UpperThreshold"]
-            f.write(struct.pack('<f', data))
-
-            # Expected binary data: variable-length string
-            write_variable_length_string(f, header["Map"][m]["MapName"])
-
-            # Expected binary data: char (1 byte) x 3
-            data = header["Map"][m]["RGB positive min"]
-            write_RGB_bytes(f, data)
-            data = header["Map"][m]["RGB positive max"]
-            write_RGB_bytes(f, data)
-            data = header["Map"][m]["RGB negative min"]
-            write_RGB_bytes(f, data)
-            data = header["Map"][m]["RGB negative max"]
-            write_RGB_bytes(f, data)
-
-            # Expected binary data: char (1 byte)
-            data = header["Map"][m]["UseVMPColor"]
-            f.write(struct.pack('<B', data))
-
-            # Expected binary data: variable-length string
-            data = header["Map"][m]["LUTFileName"]
-            write_variable_length_string(f, data)
-
-            # Expected binary data: float (4 bytes)
-            data = header["Map"][m]["TransparentColorFactor"]
-            f.write(struct.pack('<f', data))
-
-            # Expected binary data: int (4 bytes)
-            if header["Map"][m]["TypeOfMap"] == 3:  # cross-correlation values
-                data = header["Map"][m]["NrOfLags"]
-                f.write(struct.pack('<i', data))
-                data = header["Map"][m]["DisplayMinLag"]
-                f.write(struct.pack('<i', data))
-                data = header["Map"][m]["DisplayMaxLag"]
-                f.write(struct.pack('<i', data))
-                data = header["Map"][m]["ShowCorrelationOrLag"]
-                f.write(struct.pack('<i', data))
-            data = header["Map"][m]["ClusterSizeThreshold"]
-            f.write(struct.pack('<i', data))
-
-            # Expected binary data: char (1 byte)
-            data = header["Map"][m]["EnableClusterSizeThreshold"]
-            f.write(struct.pack('<b', data))
-
-            # Expected binary data: int (4 bytes)
-            data = header["Map"][m]["ShowValuesAboveUpperThreshold"]
-            f.write(struct.pack('<i', data))
-            data = header["Map"][m]["DF1"]
-            f.write(struct.pack('<i', data))
-            data = header["Map"][m]["DF2"]
-            f.write(struct.pack('<i', data))
-
-            # Expected binary data: char (1 byte)
-            data = header["Map"][m]["ShowPosNegValues"]
-            f.write(struct.pack('<b', data))
-
-            # Expected binary data: int (4 bytes)
-            data = header["Map"][m]["NrOfUsedVoxels"]
-            f.write(struct.pack('<i', data))
-            data = header["Map"][m]["SizeOfFDRTable"]
-            f.write(struct.pack('<i', data))
+            _VMP_MAP_HEADER.write(f, header["Map"][m])
 
             # Expected binary data: float (4 bytes) x SizeOfFDRTable x 3
             # (q, crit std, crit conservative)
             # TODO: Check FDR Tables
-            data = header["Map"][m]["FDRTableInfo"]
-            for i in range(header["Map"][m]["SizeOfFDRTable"]):
-                for j in range(3):
-                    f.write(struct.pack('<f', data[i, j]))
+            nr_rows = header["Map"][m]["SizeOfFDRTable"]
+            data = np.asarray(header["Map"][m]["FDRTableInfo"])
+            write_data_array(f, data[:nr_rows, :3], '<f')
 
-            # Expected binary data: int (4 bytes)
-            data = header["Map"][m]["UseFDRTableIndex"]
-            f.write(struct.pack('<i', data))
+            _VMP_MAP_HEADER_END.write(f, header["Map"][m])
 
             # Time course values associated with component "c"
             if header["NrOfTimePoints"] > 0:
-                data = header["ComponentTimeCourseValues"]
-                for i in range(header["NrOfSubMaps"]):
-                    for j in range(header["NrOfTimePoints"]):
-                        f.write(struct.pack('<f', data[i, j]))
+                dims = (header["NrOfSubMaps"], header["NrOfTimePoints"])
+                data = np.asarray(header["ComponentTimeCourseValues"])
+                write_data_array(f, data[:dims[0], :dims[1]], '<f')
 
             # Component parameters
             if header["NrOfComponentParams"] > 0:
@@ -403,16 +416,74 @@ def write_vmp(filename, header, data_img):
                     name = header["ComponentTimeCourseParams"][i]["Name"]
                     write_variable_length_string(f, name)
 
-                    data = header["ComponentTimeCourseParams"][i]["Values"]
-                    for j in range(header["NrOfSubMaps"]):
-                        f.write(struct.pack('<f', data[j]))
+                    data = np.asarray(
+                        header["ComponentTimeCourseParams"][i]["Values"])
+                    write_data_array(f, data[:header["NrOfSubMaps"]], '<f')
 
         # ---------------------------------------------------------------------
         # Write VMP image data
         # ---------------------------------------------------------------------
         data_img = data_img[::-1, ::-1, ::-1, :]  # Flip BV axes
         data_img = np.transpose(data_img, (3, 0, 2, 1))  # TAL to BV
-        data_img = np.reshape(data_img, data_img.size)
+        write_data_array(f, data_img, '<f')
+
 
-        for i in range(data_img.size):
-            f.write(struct.pack('<f', data_img[i]))
+# =============================================================================
+def append_vmp_map(filename, map_header, volume, chunk_size=2**20):
+    """Append a map to a BrainVoyager VMP file.
+
+    Parameters
+    ----------
+    filename : string
+        Path to (uncompressed) VMP file.
+    map_header : dictionary
+        Header of the new map, with the entries of a "Map" element of the
+        VMP header (including "SizeOfFDRTable" and "FDRTableInfo").
+    volume : 3D numpy.array
+        Values of the new map, axes as a map of `read_vmp` data.
+    chunk_size : int
+        Number of bytes copied at once.
+
+    Notes
+    -----
+    All map headers precede the map volumes in a VMP file, so a map cannot
+    be added at the end like in `append_smp_map`. Instead, the file is
+    streamed into a copy with the new map header inserted and the new volume
+    added, which then replaces the file. This costs one sequential copy of
+    the file (not O(1)), but existing maps are not parsed or converted and
+    the original file stays intact when appending fails. Files with
+    component time courses or parameters (whose size depends on the number
+    of maps) are not supported.
+
+    """
+    if not can_memmap(filename):
+        raise ValueError("Appending needs an uncompressed file path.")
+    with open(filename, 'rb') as f:
+        header = _read_vmp_header(f)
+        data_offset = f.tell()
+    if header["NrOfTimePoints"] > 0 or header["NrOfComponentParams"] > 0:
+        raise ValueError("Cannot append maps to VMP files with component "
+                         "time courses or parameters.")
+    DimX, DimY, DimZ = _get_dims(header)
+    if np.shape(volume) != (DimZ, DimX, DimY):
+        raise ValueError("Map needs shape {}, got shape {}."
+                         .format((DimZ, DimX, DimY), np.shape(volume)))
+
+    # New map header, as in write_vmp
+    nr_rows = map_header["SizeOfFDRTable"]
+    fdr_table = np.asarray(map_header["FDRTableInfo"])[:nr_rows, :3]
+    buffer = (_VMP_MAP_HEADER.pack(map_header)
+              + np.ascontiguousarray(fdr_table, dtype='<f').tobytes()
+              + _VMP_MAP_HEADER_END.pack(map_header))
+
+    # Expected binary data: float (4 bytes) x DimZ x DimY x DimX
+    volume = np.asarray(volume)[::-1, ::-1, ::-1]  # Flip BV axes
+    volume = np.ascontiguousarray(np.transpose(volume, (0, 2, 1)), '<f')
+
+    offset, size = _VMP_HEADER.locate(header, "NrOfSubMaps")
+    data_end = data_offset + header["NrOfSubMaps"] * DimZ * DimY * DimX * 4
+    rewrite_file(filename, [
+        (offset, size, struct.pack('<i', header["NrOfSubMaps"] + 1)),
+        (data_offset, 0, buffer),  # After the last map header
+        (data_end, 0, volume.tobytes()),  # After the last map volume
+        ], chunk_size)
@@ -1,19 +1,133 @@
 """Read, write, create BrainVoyager VMR file format."""
 
-import struct
 import numpy as np
-from bvbabel.utils import (read_variable_length_string,
-                           write_variable_length_string)
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file, get_out_array
+from bvbabel.utils import can_memmap, check_mmap_mode
 
 
 # =============================================================================
-def read_vmr(filename):
+# VMR header layout
+# =============================================================================
+def _is_version_3(header):
+    """Entries added in VMR file version 3."""
+    return header["File version"] >= 3
+
+
+def _is_version_4(header):
+    """Entries added in VMR file version 4."""
+    return header["File version"] >= 4
+
+
+_VMR_PRE_DATA_HEADER = HeaderSchema([
+    # Expected binary data: unsigned short int (2 bytes)
+    HeaderField("File version", 'H'),
+    HeaderField("DimX", 'H'),
+    HeaderField("DimY", 'H'),
+    HeaderField("DimZ", 'H'),
+    ])
+
+_VMR_POST_DATA_HEADER = HeaderSchema([
+    # Expected binary data: short int (2 bytes)
+    HeaderField("OffsetX", 'h', _is_version_3),
+    HeaderField("OffsetY", 'h', _is_version_3),
+    HeaderField("OffsetZ", 'h', _is_version_3),
+    HeaderField("FramingCubeDim", 'h', _is_version_3),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("PosInfosVerified", 'i'),
+    HeaderField("CoordinateSystem", 'i'),
+
+    # Expected binary data: float (4 bytes)
+    HeaderField("Slice1CenterX", 'f'),  # First slice center X coordinate
+    HeaderField("Slice1CenterY", 'f'),  # First slice center Y coordinate
+    HeaderField("Slice1CenterZ", 'f'),  # First slice center Z coordinate
+    HeaderField("SliceNCenterX", 'f'),  # Last slice center X coordinate
+    HeaderField("SliceNCenterY", 'f'),  # Last slice center Y coordinate
+    HeaderField("SliceNCenterZ", 'f'),  # Last slice center Z coordinate
+    HeaderField("RowDirX", 'f'),  # Slice row direction vector X component
+    HeaderField("RowDirY", 'f'),  # Slice row direction vector Y component
+    HeaderField("RowDirZ", 'f'),  # Slice row direction vector Z component
+    HeaderField("ColDirX", 'f'),  # Slice column direction vector X component
+    HeaderField("ColDirY", 'f'),  # Slice column direction vector Y component
+    HeaderField("ColDirZ", 'f'),  # Slice column direction vector Z component
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("NRows", 'i'),  # Nr of rows of slice image matrix
+    HeaderField("NCols", 'i'),  # Nr of columns of slice image matrix
+
+    # Expected binary data: float (4 bytes)
+    HeaderField("FoVRows", 'f'),  # Field of view extent in row direction [mm]
+    HeaderField("FoVCols", 'f'),  # Field of view extent in column dir. [mm]
+    HeaderField("SliceThickness", 'f'),  # Slice thickness [mm]
+    HeaderField("GapThickness", 'f'),  # Gap thickness [mm]
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("NrOfPastSpatialTransformations", 'i'),
+    ])
+
+_VMR_PAST_TRANSFORMATION = HeaderSchema([
+    # Expected binary data: variable-length string
+    HeaderField("Name", 'z'),
+    # Expected binary data: int (4 bytes)
+    HeaderField("Type", 'i'),
+    # Expected binary data: variable-length string
+    HeaderField("SourceFileName", 'z'),
+    # Expected binary data: int (4 bytes)
+    HeaderField("NrOfValues", 'i'),
+    ])
+
+_VMR_POST_DATA_HEADER_END = HeaderSchema([
+    # Expected binary data: char (1 byte)
+    HeaderField("LeftRightConvention", 'B'),  # modified in v4
+
+    HeaderField("ReferenceSpaceVMR", 'B', _is_version_4),  # new in v4
+
+    # Expected binary data: float (4 bytes)
+    HeaderField("VoxelSizeX", 'f'),  # Voxel resolution along X axis
+    HeaderField("VoxelSizeY", 'f'),  # Voxel resolution along Y axis
+    HeaderField("VoxelSizeZ", 'f'),  # Voxel resolution along Z axis
+
+    # Expected binary data: char (1 byte)
+    HeaderField("VoxelResolutionVerified", 'B'),
+    HeaderField("VoxelResolutionInTALmm", 'B'),
+
+    # Expected binary data: int (4 bytes)
+    HeaderField("VMROrigV16MinValue", 'i'),  # 16-bit data min intensity
+    HeaderField("VMROrigV16MeanValue", 'i'),  # 16-bit data mean intensity
+    HeaderField("VMROrigV16MaxValue", 'i'),  # 16-bit data max intensity
+    ])
+
+
+# =============================================================================
+def read_vmr(filename, zero_copy=False, out=None, mmap=False, mode='r'):
     """Read BrainVoyager VMR file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
+    out : numpy.array or bvbabel.BufferPool, optional
+        Preallocated C-contiguous uint8 array with DimX * DimY * DimZ values
+        (e.g. the buffer of a same-shaped VMR). The data is read into it and
+        the returned data is a view of it. When a pool is given, a recycled
+        buffer of the pool is used.
+    mmap : bool
+        When 'True', the data is not loaded into memory. Instead a
+        numpy.memmap of the data section is returned (read-only unless
+        `mode` is given, axes are rearranged as views of the memmap). Needs
+        an uncompressed file path.
+    mode : string
+        Mode of the memmap when `mmap` is 'True'. 'r+' opens the data for
+        writing: changes to the returned data go straight to the file and
+        the headers (and their offsets) are not touched.
+        'c' is copy-on-write.
 
     Returns
     -------
@@ -23,41 +137,8 @@ def read_vmr(filename):
         Image data.
 
     """
-    header = dict()
-    with open(filename, 'rb') as f:
-        # ---------------------------------------------------------------------
-        # VMR Pre-Data Header
-        # ---------------------------------------------------------------------
-        # NOTE(Developer Guide 2.6): VMR files contain anatomical 3D data sets,
-        # typically containing the whole brain (head) of subjects. The
-        # intensity values are stored as a series of bytes. See the V16 format
-        # for a version storing each intensity value with two bytes (short
-        # integers). The VMR format contains a small header followed by the
-        # actual data followed by a second, more extensive, header. The current
-        # version of VMR files is "4", which is only slightly different from
-        # version 3 (as indicated below). Version 3 added offset values to
-        # format 2 in order to represent large data sets efficiently, e.g. in
-        # the context of advanced segmentation processing. Compared to the
-        # original file version "1", file versions 2 and higher contain
-        # additional header information after the actual data ("post-data
-        # header"). This allows to read VMR data sets with minimal header
-        # checking if the extended information is not needed. The information
-        # in the post-data header contains position information (if available)
-        # and stores a series of spatial transformations, which might have been
-        # performed to the original data set ("history record"). The
-        # post-header data can be probably ignored for custom routines, but is
-        # important in BrainVoyager QX for spatial transformation and
-        # coregistration routines as well as for proper visualization.
-
-        # Expected binary data: unsigned short int (2 bytes)
-        data, = struct.unpack('<H', f.read(2))
-        header["File version"] = data
-        data, = struct.unpack('<H', f.read(2))
-        header["DimX"] = data
-        data, = struct.unpack('<H', f.read(2))
-        header["DimY"] = data
-        data, = struct.unpack('<H', f.read(2))
-        header["DimZ"] = data
+    with open_file(filename, zero_copy) as f:
+        header = _read_vmr_pre_data_header(f)
 
         # ---------------------------------------------------------------------
         # VMR Data
@@ -75,199 +156,179 @@ def read_vmr(filename):
         #   BV (Z left -> right) [axis 0 after np.reshape] = X in Tal space
 
         # Expected binary data: unsigned char (1 byte)
-        data_img = np.zeros((header["DimZ"] * header["DimY"] * header["DimX"]),
-                            dtype='<B')
-        data_img = np.fromfile(f, dtype='<B', count=data_img.size, sep="",
-                               offset=0)
-        data_img = np.reshape(
-            data_img, (header["DimZ"], header["DimY"], header["DimX"]))
+        dims = (header["DimZ"], header["DimY"], header["DimX"])
+        if mmap is True and (out is not None or not can_memmap(filename)):
+            raise ValueError("Memory mapping needs an uncompressed file path "
+                             "and no output array.")
+        check_mmap_mode(mmap, mode)
+        if mmap is True:
+            # NOTE: Only the data section is mapped, post-data header stays
+            # at its place after it.
+            data_img = np.memmap(filename, dtype='<B', mode=mode,
+                                 offset=f.tell(), shape=dims)
+            f.seek(data_img.size, 1)  # Skip data
+        elif out is not None:
+            data_img = get_out_array(out, dims, '<B')
+            read_data_array(f, '<B', data_img.size, out=data_img)
+        else:
+            data_img = read_data_array(f, '<B', int(np.prod(dims)))
+            data_img = np.reshape(data_img, dims)
 
         data_img = np.transpose(data_img, (0, 2, 1))  # BV to Tal
         data_img = data_img[::-1, ::-1, ::-1]  # Flip BV axes
 
-        # ---------------------------------------------------------------------
-        # VMR Post-Data Header
-        # ---------------------------------------------------------------------
-        # NOTE(Developer Guide 2.6): The first four entries of the post-data
-        # header are new since file version "3" and contain offset values for
-        # each dimension as well as a value indicating the size of a cube with
-        # iso-dimensions to which the data set will be internally "expanded"
-        # for certain operations. The axes labels are in terms of
-        # BrainVoyager's internal format. These four entries are followed by
-        # scan position information from the original file headers, e.g. from
-        # DICOM files. The coordinate axes labels in these entries are not in
-        # terms of BrainVoyager's internal conventions but follow the DICOM
-        # standard. Then follows eventually a section listing spatial
-        # transformations which have been eventually performed to create the
-        # current VMR (e.g. ACPC transformation). Finally, additional
-        # information further descries the data set, including the assumed
-        # left-right convention, the reference space (e.g. Talairach after
-        # normalization) and voxel resolution.
-
-        if header["File version"] >= 3:
-            # NOTE(Developer Guide 2.6): These four entries have been added in
-            # file version "3" with BrainVoyager QX 1.7. All other entries are
-            # identical to file version "2".
-
-            # Expected binary data: short int (2 bytes)
-            data, = struct.unpack('<h', f.read(2))
-            header["OffsetX"] = data
-            data, = struct.unpack('<h', f.read(2))
-            header["OffsetY"] = data
-            data, = struct.unpack('<h', f.read(2))
-            header["OffsetZ"] = data
-            data, = struct.unpack('<h', f.read(2))
-            header["FramingCubeDim"] = data
-
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["PosInfosVerified"] = data
-        data, = struct.unpack('<i', f.read(4))
-        header["CoordinateSystem"] = data
-
-        # Expected binary data: float (4 bytes)
-        data, = struct.unpack('<f', f.read(4))
-        header["Slice1CenterX"] = data  # First slice center X coordinate
-        data, = struct.unpack('<f', f.read(4))
-        header["Slice1CenterY"] = data  # First slice center Y coordinate
-        data, = struct.unpack('<f', f.read(4))
-        header["Slice1CenterZ"] = data  # First slice center Z coordinate
-        data, = struct.unpack('<f', f.read(4))
-        header["SliceNCenterX"] = data  # Last slice center X coordinate
-        data, = struct.unpack('<f', f.read(4))
-        header["SliceNCenterY"] = data  # Last slice center Y coordinate
-        data, = struct.unpack('<f', f.read(4))
-        header["SliceNCenterZ"] = data  # Last slice center Z coordinate
-        data, = struct.unpack('<f', f.read(4))
-        header["RowDirX"] = data  # Slice row direction vector X component
-        data, = struct.unpack('<f', f.read(4))
-        header["RowDirY"] = data  # Slice row direction vector Y component
-        data, = struct.unpack('<f', f.read(4))
-        header["RowDirZ"] = data  # Slice row direction vector Z component
-        data, = struct.unpack('<f', f.read(4))
-        header["ColDirX"] = data  # Slice column direction vector X component
-        data, = struct.unpack('<f', f.read(4))
-        header["ColDirY"] = data  # Slice column direction vector Y component
-        data, = struct.unpack('<f', f.read(4))
-        header["ColDirZ"] = data  # Slice column direction vector Z component
-
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["NRows"] = data  # Nr of rows of slice image matrix
-        data, = struct.unpack('<i', f.read(4))
-        header["NCols"] = data  # Nr of columns of slice image matrix
-
-        # Expected binary data: float (4 bytes)
-        data, = struct.unpack('<f', f.read(4))
-        header["FoVRows"] = data  # Field of view extent in row direction [mm]
-        data, = struct.unpack('<f', f.read(4))
-        header["FoVCols"] = data  # Field of view extent in column dir. [mm]
-        data, = struct.unpack('<f', f.read(4))
-        header["SliceThickness"] = data  # Slice thickness [mm]
-        data, = struct.unpack('<f', f.read(4))
-        header["GapThickness"] = data  # Gap thickness [mm]
-
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["NrOfPastSpatialTransformations"] = data
-
-        if header["NrOfPastSpatialTransformations"] != 0:
-            # NOTE(Developer Guide 2.6): For each past transformation, the
-            # information specified in the following table is stored. The
-            # "type of transformation" is a value determining how many
-            # subsequent values define the transformation:
-            #   "1": Rigid body+scale (3 translation, 3 rotation, 3 scale)
-            #   "2": Affine transformation (16 values, 4x4 matrix)
-            #   "4": Talairach transformation
-            #   "5": Un-Talairach transformation (1 - 5 -> BV axes)
-            header["PastTransformation"] = []
-            for i in range(header["NrOfPastSpatialTransformations"]):
-                header["PastTransformation"].append(dict())
-
-                # Expected binary data: variable-length string
-                data = read_variable_length_string(f)
-                header["PastTransformation"][i]["Name"] = data
-
-                # Expected binary data: int (4 bytes)
-                data, = struct.unpack('<i', f.read(4))
-                header["PastTransformation"][i]["Type"] = data
-
-                # Expected binary data: variable-length string
-                data = read_variable_length_string(f)
-                header["PastTransformation"][i]["SourceFileName"] = data
-
-                # Expected binary data: int (4 bytes)
-                data, = struct.unpack('<i', f.read(4))
-                header["PastTransformation"][i]["NrOfValues"] = data
-
-                # Store transformation values as a list
-                trans_values = []
-                for j in range(header["PastTransformation"][i]["NrOfValues"]):
-                    # Expected binary data: float (4 bytes)
-                    data, = struct.unpack('<f', f.read(4))
-                    trans_values.append(data)
-                header["PastTransformation"][i]["Values"] = trans_values
-
-        # Expected binary data: char (1 byte)
-        data, = struct.unpack('<B', f.read(1))
-        header["LeftRightConvention"] = data  # modified in v4
-
-        if header["File version"] >= 4:
-            data, = struct.unpack('<B', f.read(1))
-            header["ReferenceSpaceVMR"] = data  # new in v4
-
-        # Expected binary data: float (4 bytes)
-        data, = struct.unpack('<f', f.read(4))
-        header["VoxelSizeX"] = data  # Voxel resolution along X axis
-        data, = struct.unpack('<f', f.read(4))
-        header["VoxelSizeY"] = data  # Voxel resolution along Y axis
-        data, = struct.unpack('<f', f.read(4))
-        header["VoxelSizeZ"] = data  # Voxel resolution along Z axis
-
-        # Expected binary data: char (1 byte)
-        data, = struct.unpack('<B', f.read(1))
-        header["VoxelResolutionVerified"] = data
-        data, = struct.unpack('<B', f.read(1))
-        header["VoxelResolutionInTALmm"] = data
-
-        # Expected binary data: int (4 bytes)
-        data, = struct.unpack('<i', f.read(4))
-        header["VMROrigV16MinValue"] = data  # 16-bit data min intensity
-        data, = struct.unpack('<i', f.read(4))
-        header["VMROrigV16MeanValue"] = data  # 16-bit data mean intensity
-        data, = struct.unpack('<i', f.read(4))
-        header["VMROrigV16MaxValue"] = data  # 16-bit data max intensity
+        _read_vmr_post_data_header(f, header)
 
     return header, data_img
 
 
+# =============================================================================
+def read_vmr_header(filename):
+    """Read BrainVoyager VMR file headers without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Pre-data and post-data headers. In addition, "Data offset" is the
+        position of the first data byte in the file and "Data size" the size
+        of the data in bytes. Post-data header starts right after the data.
+
+    """
+    with open_file(filename) as f:
+        header = _read_vmr_pre_data_header(f)
+        data_offset = f.tell()
+        data_size = header["DimZ"] * header["DimY"] * header["DimX"]
+        f.seek(data_size, 1)  # Skip data
+        _read_vmr_post_data_header(f, header)
+    header["Data offset"] = data_offset
+    header["Data size"] = data_size
+    return header
+
+
+def _read_vmr_pre_data_header(f):
+    """Read VMR pre-data header, leaving the file at the start of the data."""
+    # -------------------------------------------------------------------------
+    # VMR Pre-Data Header
+    # -------------------------------------------------------------------------
+    # NOTE(Developer Guide 2.6): VMR files contain anatomical 3D data sets,
+    # typically containing the whole brain (head) of subjects. The
+    # intensity values are stored as a series of bytes. See the V16 format
+    # for a version storing each intensity value with two bytes (short
+    # integers). The VMR format contains a small header followed by the
+    # actual data followed by a second, more extensive, header. The current
+    # version of VMR files is "4", which is only slightly different from
+    # version 3 (as indicated below). Version 3 added offset values to
+    # format 2 in order to represent large data sets efficiently, e.g. in
+    # the context of advanced segmentation processing. Compared to the
+    # original file version "1", file versions 2 and higher contain
+    # additional header information after the actual data ("post-data
+    # header"). This allows to read VMR data sets with minimal header
+    # checking if the extended information is not needed. The information
+    # in the post-data header contains position information (if available)
+    # and stores a series of spatial transformations, which might have been
+    # performed to the original data set ("history record"). The
+    # post-header data can be probably ignored for custom routines, but is
+    # important in BrainVoyager QX for spatial transformation and
+    # coregistration routines as well as for proper visualization.
+
+    return _VMR_PRE_DATA_HEADER.read(f)
+
+
+def _read_vmr_post_data_header(f, header):
+    """Read VMR post-data header into the header dictionary."""
+    # -------------------------------------------------------------------------
+    # VMR Post-Data Header
+    # -------------------------------------------------------------------------
+    # NOTE(Developer Guide 2.6): The first four entries of the post-data
+    # header are new since file version "3" and contain offset values for
+    # each dimension as well as a value indicating the size of a cube with
+    # iso-dimensions to which the data set will be internally "expanded"
+    # for certain operations. The axes labels are in terms of
+    # BrainVoyager's internal format. These four entries are followed by
+    # scan position information from the original file headers, e.g. from
+    # DICOM files. The coordinate axes labels in these entries are not in
+    # terms of BrainVoyager's internal conventions but follow the DICOM
+    # standard. Then follows eventually a section listing spatial
+    # transformations which have been eventually performed to create the
+    # current VMR (e.g. ACPC transformation). Finally, additional
+    # information further descries the data set, including the assumed
+    # left-right convention, the reference space (e.g. Talairach after
+    # normalization) and voxel resolution.
+
+    # NOTE(Developer Guide 2.6): The first four entries have been added in
+    # file version "3" with BrainVoyager QX 1.7. All other entries are
+    # identical to file version "2".
+    _VMR_POST_DATA_HEADER.read(f, header)
+
+    if header["NrOfPastSpatialTransformations"] != 0:
+        # NOTE(Developer Guide 2.6): For each past transformation, the
+        # information specified in the following table is stored. The
+        # "type of transformation" is a value determining how many
+        # subsequent values define the transformation:
+        #   "1": Rigid body+scale (3 translation, 3 rotation, 3 scale)
+        #   "2": Affine transformation (16 values, 4x4 matrix)
+        #   "4": Talairach transformation
+        #   "5": Un-Talairach transformation (1 - 5 -> BV axes)
+        header["PastTransformation"] = []
+        for i in range(header["NrOfPastSpatialTransformations"]):
+            data = _VMR_PAST_TRANSFORMATION.read(f)
+
+            # Store transformation values as a list
+            # Expected binary data: float (4 bytes)
+            trans_values = read_data_array(f, '<f', data["NrOfValues"])
+            data["Values"] = trans_values.tolist()
+            header["PastTransformation"].append(data)
+
+    _VMR_POST_DATA_HEADER_END.read(f, header)
+
+    return header
+
+
+def _get_header_layout(f):
+    """Header parts as (key prefix, offset, schema, header) for patching."""
+    header = _read_vmr_pre_data_header(f)
+    layout = [((), 0, _VMR_PRE_DATA_HEADER, header)]
+    f.seek(header["DimZ"] * header["DimY"] * header["DimX"], 1)  # Skip data
+
+    layout.append(((), f.tell(), _VMR_POST_DATA_HEADER, header))
+    _VMR_POST_DATA_HEADER.read(f, header)
+    for i in range(header["NrOfPastSpatialTransformations"]):
+        offset = f.tell()
+        data = _VMR_PAST_TRANSFORMATION.read(f)
+        layout.append((("PastTransformation", i), offset,
+                       _VMR_PAST_TRANSFORMATION, data))
+        f.seek(data["NrOfValues"] * 4, 1)  # Skip transformation values
+
+    layout.append(((), f.tell(), _VMR_POST_DATA_HEADER_END, header))
+    return layout
+
+
 # =============================================================================
 def write_vmr(filename, header, data_img):
     """Protocol to write BrainVoyager VMR file.
 
     Parameters
     ----------
-    filename : string
-        Output filename.
+    filename : string or file object
+        Output filename ('.gz' files are compressed on the fly) or an open
+        file object.
     header : dictionary
         Header of VMR file.
     data_img : numpy.array, 3D
         Image.
 
     """
-    with open(filename, 'wb') as f:
+    with create_file(filename) as f:
         # ---------------------------------------------------------------------
         # VMR Pre-Data Header
         # ---------------------------------------------------------------------
-        # Expected binary data: unsigned short int (2 bytes)
-        data = header["File version"]
-        f.write(struct.pack('<H', data))
-        data = header["DimX"]
-        f.write(struct.pack('<H', data))
-        data = header["DimY"]
-        f.write(struct.pack('<H', data))
-        data = header["DimZ"]
-        f.write(struct.pack('<H', data))
+        _VMR_PRE_DATA_HEADER.write(f, header)
 
         # ---------------------------------------------------------------------
         # VMR Data
@@ -276,129 +337,24 @@ def write_vmr(filename, header, data_img):
         data_img = data_img[::-1, ::-1, ::-1]  # Flip BV axes
         data_img = np.transpose(data_img, (0, 2, 1))  # BV to Tal
 
-        # Expected binary data: unsigned char (1 or 2 byte)
-        data_img = data_img.flatten()
-        for i in range(data_img.size):
-            f.write(struct.pack('<B', data_img[i]))
+        # Expected binary data: unsigned char (1 byte)
+        write_data_array(f, data_img, '<B')
 
         # ---------------------------------------------------------------------
         # VMR Post-Data Header
         # ---------------------------------------------------------------------
-        if header["File version"] >= 3:
-            # Expected binary data: short int (2 bytes)
-            data = header["OffsetX"]
-            f.write(struct.pack('<h', data))
-            data = header["OffsetY"]
-            f.write(struct.pack('<h', data))
-            data = header["OffsetZ"]
-            f.write(struct.pack('<h', data))
-            data = header["FramingCubeDim"]
-            f.write(struct.pack('<h', data))
-
-        # Expected binary data: int (4 bytes)
-        data = header["PosInfosVerified"]
-        f.write(struct.pack('<i', data))
-        data = header["CoordinateSystem"]
-        f.write(struct.pack('<i', data))
-
-        # Expected binary data: float (4 bytes)
-        data = header["Slice1CenterX"]
-        f.write(struct.pack('<f', data))
-        data = header["Slice1CenterY"]
-        f.write(struct.pack('<f', data))
-        data = header["Slice1CenterZ"]
-        f.write(struct.pack('<f', data))
-        data = header["SliceNCenterX"]
-        f.write(struct.pack('<f', data))
-        data = header["SliceNCenterY"]
-        f.write(struct.pack('<f', data))
-        data = header["SliceNCenterZ"]
-        f.write(struct.pack('<f', data))
-        data = header["RowDirX"]
-        f.write(struct.pack('<f', data))
-        data = header["RowDirY"]
-        f.write(struct.pack('<f', data))
-        data = header["RowDirZ"]
-        f.write(struct.pack('<f', data))
-        data = header["ColDirX"]
-        f.write(struct.pack('<f', data))
-        data = header["ColDirY"]
-        f.write(struct.pack('<f', data))
-        data = header["ColDirZ"]
-        f.write(struct.pack('<f', data))
-
-        # Expected binary data: int (4 bytes)
-        data = header["NRows"]
-        f.write(struct.pack('<i', data))
-        data = header["NCols"]
-        f.write(struct.pack('<i', data))
-
-        # Expected binary data: float (4 bytes)
-        data = header["FoVRows"]
-        f.write(struct.pack('<f', data))
-        data = header["FoVCols"]
-        f.write(struct.pack('<f', data))
-        data = header["SliceThickness"]
-        f.write(struct.pack('<f', data))
-        data = header["GapThickness"]
-        f.write(struct.pack('<f', data))
-
-        # Expected binary data: int (4 bytes)
-        data = header["NrOfPastSpatialTransformations"]
-        f.write(struct.pack('<i', data))
+        _VMR_POST_DATA_HEADER.write(f, header)
 
         if header["NrOfPastSpatialTransformations"] != 0:
             for i in range(header["NrOfPastSpatialTransformations"]):
-                # Expected binary data: variable-length string
-                data = header["PastTransformation"][i]["Name"]
-                write_variable_length_string(f, data)
-
-                # Expected binary data: int (4 bytes)
-                data = header["PastTransformation"][i]["Type"]
-                f.write(struct.pack('<i', data))
-
-                # Expected binary data: variable-length string
-                data = header["PastTransformation"][i]["SourceFileName"]
-                write_variable_length_string(f, data)
-
-                # Expected binary data: int (4 bytes)
-                data = header["PastTransformation"][i]["NrOfValues"]
-                f.write(struct.pack('<i', data))
+                data = header["PastTransformation"][i]
+                _VMR_PAST_TRANSFORMATION.write(f, data)
 
                 # Transformation values are stored as a list
-                trans_values = header["PastTransformation"][i]["Values"]
-                for j in range(header["PastTransformation"][i]["NrOfValues"]):
-                    # Expected binary data: float (4 bytes)
-                    f.write(struct.pack('<f', trans_values[j]))
-
-        # Expected binary data: char (1 byte)
-        data = header["LeftRightConvention"]
-        f.write(struct.pack('<B', data))
-
-        if header["File version"] >= 4:
-            data = header["ReferenceSpaceVMR"]
-            f.write(struct.pack('<B', data))
-
-        # Expected binary data: float (4 bytes)
-        data = header["VoxelSizeX"]
-        f.write(struct.pack('<f', data))
-        data = header["VoxelSizeY"]
-        f.write(struct.pack('<f', data))
-        data = header["VoxelSizeZ"]
-        f.write(struct.pack('<f', data))
-
-        # Expected binary data: char (1 byte)
-        data = header["VoxelResolutionVerified"]
-        f.write(struct.pack('<B', data))
-        data = header["VoxelResolutionInTALmm"]
-        f.write(struct.pack('<B', data))
-
-        # Expected binary data: int (4 bytes)
-        data = header["VMROrigV16MinValue"]
-        f.write(struct.pack('<i', data))
-        data = header["VMROrigV16MeanValue"]
-        f.write(struct.pack('<i', data))
-        data = header["VMROrigV16MaxValue"]
-        f.write(struct.pack('<i', data))
+                # Expected binary data: float (4 bytes)
+                trans_values = data["Values"][:data["NrOfValues"]]
+                write_data_array(f, trans_values, '<f')
+
+        _VMR_POST_DATA_HEADER_END.write(f, header)
 
     return print("VMR saved.")
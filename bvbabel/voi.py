@@ -1,6 +1,8 @@
 """Read BrainVoyager VOI file format."""
 
 import numpy as np
+from bvbabel.utils import read_text_lines, parse_text_header
+from bvbabel.utils import open_file, create_file
 
 
 # =============================================================================
@@ -9,8 +11,9 @@ def read_voi(filename):
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
 
     Returns
     -------
@@ -22,19 +25,12 @@ def read_voi(filename):
 
     """
     # Read non-empty lines of the input text file
-    with open(filename, 'r') as f:
-        lines = [r for r in (line.strip() for line in f) if r]
+    with open_file(filename, text=True) as f:
+        lines = read_text_lines(f)
 
     # VOI header
-    header = dict()
     header_rows = 12  # NOTE: Only counting non empty rows
-    for line in lines[0:header_rows]:
-        content = line.split(":")
-        content = [i.strip() for i in content]
-        if content[1].isdigit():
-            header[content[0]] = int(content[1])
-        else:
-            header[content[0]] = content[1]
+    header = parse_text_header(lines[0:header_rows])
 
     # VOI data (x, y, z coordinates of voxels)
     count_voi = -1
@@ -86,13 +82,35 @@ def read_voi(filename):
     return header, data_voi
 
 
+# =============================================================================
+def read_voi_header(filename):
+    """Read BrainVoyager VOI file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Volumes of interest (VOI) header.
+
+    """
+    with open_file(filename, text=True) as f:
+        lines = read_text_lines(f, nr_lines=12)
+    return parse_text_header(lines)
+
+
 def write_voi(filename, header, data_voi):
     """Protocol to write BrainVoyager VOI file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Voxels of interest (VOI) header.
     data_voi : list of dictionaries
@@ -100,7 +118,7 @@ def write_voi(filename, header, data_voi):
         interest.
 
     """
-    with open(filename, 'w') as f:
+    with create_file(filename, text=True) as f:
         f.write("\n")
 
         data = header["FileVersion"]
@@ -1,19 +1,72 @@
 """Read, write, create BrainVoyager VTC file format."""
 
-import struct
+import os
+import numbers
+import shutil
+import tempfile
 import numpy as np
-from bvbabel.utils import read_variable_length_string
-from bvbabel.utils import write_variable_length_string
+from bvbabel.utils import open_file, read_data_array, write_data_array
+from bvbabel.utils import HeaderField, HeaderSchema
+from bvbabel.utils import create_file, can_memmap, is_gzip_path
+from bvbabel.utils import get_out_array, check_mmap_mode
+from bvbabel.nifti import create_nifti_header, write_nifti_header
 
 
 # =============================================================================
-def read_vtc(filename, rearrange_data_axes=True):
+# VTC header layout
+# =============================================================================
+def _has_protocol(header):
+    """Protocol name is only stored when a protocol is attached."""
+    return header["Protocol attached"] > 0
+
+
+_VTC_HEADER = HeaderSchema([
+    # Expected binary data: short int (2 bytes)
+    HeaderField("File version", 'h'),
+
+    # Expected binary data: variable-length string
+    HeaderField("Source FMR name", 'z'),
+
+    # Expected binary data: short int (2 bytes)
+    HeaderField("Protocol attached", 'h'),
+
+    # Expected binary data: variable-length string
+    HeaderField("Protocol name", 'z', _has_protocol, default=""),
+
+    # Expected binary data: short int (2 bytes)
+    HeaderField("Current protocol index", 'h'),
+    HeaderField("Data type (1:short int, 2:float)", 'h'),
+    HeaderField("Nr time points", 'h'),
+    HeaderField("VTC resolution relative to VMR (1, 2, or 3)", 'h'),
+
+    HeaderField("XStart", 'h'),
+    HeaderField("XEnd", 'h'),
+    HeaderField("YStart", 'h'),
+    HeaderField("YEnd", 'h'),
+    HeaderField("ZStart", 'h'),
+    HeaderField("ZEnd", 'h'),
+
+    # Expected binary data: char (1 byte)
+    HeaderField("L-R convention (0:unknown, 1:radiological, 2:neurological)",
+                'B'),
+    HeaderField("Reference space (0:unknown, 1:native, 2:ACPC, 3:Tal, 4:MNI)",
+                'B'),
+
+    # Expected binary data: char (4 bytes)
+    HeaderField("TR (ms)", 'f'),
+    ])
+
+
+# =============================================================================
+def read_vtc(filename, rearrange_data_axes=True, mmap=False, zero_copy=False,
+             bbox=None, volumes=None, gzip_index=False, out=None, mode='r'):
     """Read BrainVoyager VTC file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
     rearrange_data_axes : bool
         When 'False', axes are intended to follow LIP+ terminology used
         internally in BrainVoyager (however see the notes below):
@@ -24,12 +77,44 @@ def read_vtc(filename, rearrange_data_axes=True):
             - 1st axis is Left to "R"ight.
             - 2nd axis is Posterior to "A"nterior.
             - 3rd axis is Inferior to "S"uperior.
+    mmap : bool
+        When 'True', the data is not loaded into memory. Instead a
+        numpy.memmap of the data section is returned (read-only unless
+        `mode` is given, rearranged axes are views of the memmap). Only the
+        voxels that are accessed are read from the disk. Needs an
+        uncompressed file path.
+    zero_copy : bool
+        When 'True', the file is mapped into memory once and parsed from
+        there. Data arrays are views into the (copy-on-write) mapping
+        instead of copies.
+    bbox : tuple of 6 ints, optional
+        (x0, x1, y0, y1, z0, z1) index ranges (end excluded) along the 1st,
+        2nd and 3rd axes of the returned data, i.e. in the orientation set by
+        `rearrange_data_axes`. Only this block of voxels is read.
+    volumes : slice or int, optional
+        Time points to be read, e.g. `slice(10, 20)`. A single time point
+        (e.g. `10`) is returned with a time axis of length one.
+    gzip_index : bool or bvbabel.utils.GzipIndex
+        For '.gz' files, partial reads seek into the compressed data through
+        the checkpoints of a random access index instead of decompressing
+        everything before the requested voxels. When 'True', the side-car
+        index `filename + '.idx'` is used, it is built on first use.
+    out : numpy.array or bvbabel.BufferPool, optional
+        Preallocated C-contiguous array with as many values of the data type
+        as the file holds (e.g. the buffer of a same-shaped VTC). The data
+        is read into it and the returned data is a view of it. When a pool
+        is given, a recycled buffer of the pool is used. Cannot be combined
+        with `mmap`, `bbox` or `volumes`.
+    mode : string
+        Mode of the memmap when `mmap` is 'True'. 'r+' opens the data for
+        writing: changes to the returned (rearranged) data go straight to the
+        file, the header is not touched. 'c' is copy-on-write.
 
     Returns
     -------
     header : dictionary
         Pre-data and post-data headers.
-    data : 3D numpy.array
+    data : 4D numpy.array
         Image data.
 
     Notes
@@ -45,59 +130,8 @@ def read_vtc(filename, rearrange_data_axes=True):
 
 
     """
-    header = dict()
-    with open(filename, 'rb') as f:
-        # Expected binary data: short int (2 bytes)
-        data, = struct.unpack('<h', f.read(2))
-        header["File version"] = data
-
-        # Expected binary data: variable-length string
-        data = read_variable_length_string(f)
-        header["Source FMR name"] = data
-
-        # Expected binary data: short int (2 bytes)
-        data, = struct.unpack('<h', f.read(2))
-        header["Protocol attached"] = data
-
-        if header["Protocol attached"] > 0:
-            # Expected binary data: variable-length string
-            data = read_variable_length_string(f)
-            header["Protocol name"] = data
-        else:
-            header["Protocol name"] = ""
-
-        # Expected binary data: short int (2 bytes)
-        data, = struct.unpack('<h', f.read(2))
-        header["Current protocol index"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["Data type (1:short int, 2:float)"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["Nr time points"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["VTC resolution relative to VMR (1, 2, or 3)"] = data
-
-        data, = struct.unpack('<h', f.read(2))
-        header["XStart"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["XEnd"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["YStart"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["YEnd"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["ZStart"] = data
-        data, = struct.unpack('<h', f.read(2))
-        header["ZEnd"] = data
-
-        # Expected binary data: char (1 byte)
-        data, = struct.unpack('<B', f.read(1))
-        header["L-R convention (0:unknown, 1:radiological, 2:neurological)"] = data
-        data, = struct.unpack('<B', f.read(1))
-        header["Reference space (0:unknown, 1:native, 2:ACPC, 3:Tal, 4:MNI)"] = data
-
-        # Expected binary data: char (4 bytes)
-        data, = struct.unpack('<f', f.read(4))
-        header["TR (ms)"] = data
+    with open_file(filename, zero_copy, gzip_index=gzip_index) as f:
+        header = _read_vtc_header(f)
 
         # ---------------------------------------------------------------------
         # Read VTC data
@@ -117,26 +151,45 @@ def read_vtc(filename, rearrange_data_axes=True):
         #   BV (Z left -> right) [axis 0 after np.reshape] = X in Tal space
 
         # Prepare dimensions of VTC data array
-        VTC_resolution = header["VTC resolution relative to VMR (1, 2, or 3)"]
-        DimX = (header["XEnd"] - header["XStart"]) // VTC_resolution
-        DimY = (header["YEnd"] - header["YStart"]) // VTC_resolution
-        DimZ = (header["ZEnd"] - header["ZStart"]) // VTC_resolution
-        DimT = header["Nr time points"]
-
-        data_img = np.zeros(DimZ * DimY * DimX * DimT)
-
-        if header["Data type (1:short int, 2:float)"] == 1:
-            data_img = np.fromfile(f, dtype='<h', count=data_img.size, sep="",
-                                   offset=0)
-        elif header["Data type (1:short int, 2:float)"] == 2:
-            data_img = np.fromfile(f, dtype='<f', count=data_img.size, sep="",
-                                   offset=0)
+        (DimZ, DimY, DimX, DimT), data_type = _get_data_layout(header)
+
+        partial = bbox is not None or volumes is not None
+        if out is not None and (mmap is True or partial):
+            raise ValueError("Output array is only used for full reads.")
+        if mmap is True and not can_memmap(filename):
+            raise ValueError("Memory mapping needs an uncompressed file path.")
+        check_mmap_mode(mmap, mode)
+        dims = (DimZ, DimY, DimX, DimT)
+        if mmap is True or (partial and can_memmap(filename)):
+            # NOTE: Data starts right after the header. Only the mapping is
+            # created here, voxels are paged in from disk on access.
+            data_img = np.memmap(filename, dtype=data_type,
+                                 mode=mode if mmap is True else 'r',
+                                 offset=f.tell(), shape=dims)
+        elif partial:
+            # NOTE: Compressed files and file objects are read by seeking to
+            # each run of requested voxels.
+            data_img = _read_data_runs(f, dims, data_type, _get_data_slices(
+                dims, bbox, volumes, rearrange_data_axes))
+        elif out is not None:
+            data_img = get_out_array(out, dims, data_type)
+            read_data_array(f, data_type, data_img.size, out=data_img)
         else:
-            raise("Unrecognized VTC data_img type.")
-
-        data_img = np.reshape(data_img, (DimZ, DimY, DimX, DimT))
+            data_img = read_data_array(f, data_type,
+                                       DimZ * DimY * DimX * DimT)
+            data_img = np.reshape(data_img, dims)
+
+        if partial and can_memmap(filename):
+            # NOTE: Only the pages holding the requested voxels and time
+            # points are read from the disk.
+            data_img = data_img[_get_data_slices(
+                dims, bbox, volumes, rearrange_data_axes)]
+            if mmap is not True:
+                data_img = np.array(data_img)
 
         # TODO[Faruk]: I need to triple check this part with various data
+        # NOTE: Transposing and flipping only change the strides, the data
+        # is not copied (memmap stays a memmap).
         if rearrange_data_axes is True:
             # TODO[Faruk] PIR+ to RAS+ ? I am not sure
             data_img = np.transpose(data_img, (0, 2, 1, 3))
@@ -145,14 +198,123 @@ def read_vtc(filename, rearrange_data_axes=True):
     return header, data_img
 
 
+# =============================================================================
+def read_vtc_header(filename):
+    """Read BrainVoyager VTC file header without reading the data.
+
+    Parameters
+    ----------
+    filename : string, file object or bytes-like
+        Path to file ('.gz' files are decompressed on the fly), an open file
+        object or the file content.
+
+    Returns
+    -------
+    header : dictionary
+        Pre-data headers. In addition, "Data offset" is the position of the
+        first data byte in the file and "Data size" the expected size of the
+        data in bytes. A file smaller than their sum is truncated.
+
+    """
+    with open_file(filename) as f:
+        header = _read_vtc_header(f)
+        header["Data offset"] = f.tell()
+    dims, data_type = _get_data_layout(header)
+    header["Data size"] = int(np.prod(dims)) * np.dtype(data_type).itemsize
+    return header
+
+
+def _read_vtc_header(f):
+    """Read VTC header, leaving the file at the start of the data."""
+    return _VTC_HEADER.read(f)
+
+
+def _get_data_layout(header):
+    """Dimensions (DimZ, DimY, DimX, DimT) and binary type of VTC data."""
+    VTC_resolution = header["VTC resolution relative to VMR (1, 2, or 3)"]
+    DimX = (header["XEnd"] - header["XStart"]) // VTC_resolution
+    DimY = (header["YEnd"] - header["YStart"]) // VTC_resolution
+    DimZ = (header["ZEnd"] - header["ZStart"]) // VTC_resolution
+    DimT = header["Nr time points"]
+
+    if header["Data type (1:short int, 2:float)"] == 1:
+        data_type = '<h'
+    elif header["Data type (1:short int, 2:float)"] == 2:
+        data_type = '<f'
+    else:
+        raise ValueError("Unrecognized VTC data_img type.")
+    return (DimZ, DimY, DimX, DimT), data_type
+
+
+def _get_data_slices(dims, bbox, volumes, rearrange_data_axes):
+    """Convert bounding box and volumes to slices of the stored data."""
+    DimZ, DimY, DimX, DimT = dims
+    if bbox is None:
+        slices = [slice(None)] * 3
+    else:
+        if rearrange_data_axes is True:
+            dims_out = (DimZ, DimX, DimY)
+        else:
+            dims_out = (DimZ, DimY, DimX)
+        for i in range(3):
+            if not 0 <= bbox[2 * i] < bbox[2 * i + 1] <= dims_out[i]:
+                raise ValueError("Bounding box {} is out of the data range {}."
+                                 .format(tuple(bbox), dims_out))
+
+        if rearrange_data_axes is True:
+            # Returned axes are flipped stored axes in (Z, X, Y) order
+            x0, x1, y0, y1, z0, z1 = bbox
+            slices = [slice(DimZ - x1, DimZ - x0), slice(DimY - z1, DimY - z0),
+                      slice(DimX - y1, DimX - y0)]
+        else:
+            slices = [slice(bbox[0], bbox[1]), slice(bbox[2], bbox[3]),
+                      slice(bbox[4], bbox[5])]
+
+    if volumes is None:
+        volumes = slice(None)
+    elif isinstance(volumes, numbers.Integral):
+        if not -DimT <= volumes < DimT:
+            raise ValueError("Volume {} is out of range for {} time points."
+                             .format(volumes, DimT))
+        volumes = slice(volumes % DimT, volumes % DimT + 1)
+    elif not isinstance(volumes, slice):
+        raise ValueError("Volumes are selected by a slice or an integer "
+                         "index, not {!r}.".format(volumes))
+    return tuple(slices) + (volumes,)
+
+
+def _read_data_runs(f, dims, data_type, slices):
+    """Read a block of stored data by seeking to each run of voxels."""
+    DimZ, DimY, DimX, DimT = dims
+    itemsize = np.dtype(data_type).itemsize
+    z_range = range(*slices[0].indices(DimZ))
+    y_range = range(*slices[1].indices(DimY))
+    x0, x1, _ = slices[2].indices(DimX)
+    data_offset = f.tell()
+
+    # NOTE: A run holds all time points of consecutive voxels along X
+    run = np.empty((x1 - x0, DimT), dtype=data_type)
+    data_img = np.empty((len(z_range), len(y_range), x1 - x0,
+                         len(range(*slices[3].indices(DimT)))),
+                        dtype=data_type)
+    for i, z in enumerate(z_range):
+        for j, y in enumerate(y_range):
+            voxel = (z * DimY + y) * DimX + x0
+            f.seek(data_offset + voxel * DimT * itemsize)
+            read_data_array(f, data_type, run.size, out=run)
+            data_img[i, j] = run[:, slices[3]]
+    return data_img
+
+
 # =============================================================================
 def write_vtc(filename, header, data_img, rearrange_data_axes=True):
     """Protocol to write BrainVoyager VTC file.
 
     Parameters
     ----------
-    filename : string
-        Path to file.
+    filename : string or file object
+        Path to file ('.gz' files are compressed on the fly) or an open file
+        object.
     header : dictionary
         Pre-data and post-data headers.
     data_img : 3D numpy.array
@@ -169,56 +331,8 @@ def write_vtc(filename, header, data_img, rearrange_data_axes=True):
             - 3rd axis is Inferior to "S"uperior.
 
     """
-    with open(filename, 'wb') as f:
-        # Expected binary data: short int (2 bytes)
-        data = header["File version"]
-        f.write(struct.pack('<h', data))
-
-        # Expected binary data: variable-length string
-        data = header["Source FMR name"]
-        write_variable_length_string(f, data)
-
-        # Expected binary data: short int (2 bytes)
-        data = header["Protocol attached"]
-        f.write(struct.pack('<h', data))
-
-        if header["Protocol attached"] > 0:
-            # Expected binary data: variable-length string
-            data = header["Protocol name"]
-            write_variable_length_string(f, data)
-
-        # Expected binary data: short int (2 bytes)
-        data = header["Current protocol index"]
-        f.write(struct.pack('<h', data))
-        data = header["Data type (1:short int, 2:float)"]
-        f.write(struct.pack('<h', data))
-        data = header["Nr time points"]
-        f.write(struct.pack('<h', data))
-        data = header["VTC resolution relative to VMR (1, 2, or 3)"]
-        f.write(struct.pack('<h', data))
-
-        data = header["XStart"]
-        f.write(struct.pack('<h', data))
-        data = header["XEnd"]
-        f.write(struct.pack('<h', data))
-        data = header["YStart"]
-        f.write(struct.pack('<h', data))
-        data = header["YEnd"]
-        f.write(struct.pack('<h', data))
-        data = header["ZStart"]
-        f.write(struct.pack('<h', data))
-        data = header["ZEnd"]
-        f.write(struct.pack('<h', data))
-
-        # Expected binary data: char (1 byte)
-        data = header["L-R convention (0:unknown, 1:radiological, 2:neurological)"]
-        f.write(struct.pack('<B', data))
-        data = header["Reference space (0:unknown, 1:native, 2:ACPC, 3:Tal, 4:MNI)"]
-        f.write(struct.pack('<B', data))
-
-        # Expected binary data: char (4 bytes)
-        data = header["TR (ms)"]
-        f.write(struct.pack('<f', data))
+    with create_file(filename) as f:
+        _VTC_HEADER.write(f, header)
 
         # ---------------------------------------------------------------------
         # Write VTC data
@@ -227,16 +341,12 @@ def write_vtc(filename, header, data_img, rearrange_data_axes=True):
             data_img = data_img[::-1, ::-1, ::-1, :]
             data_img = np.transpose(data_img, (0, 2, 1, 3))
 
-        data_img = np.reshape(data_img, data_img.size)
-
         if header["Data type (1:short int, 2:float)"] == 1:
-            for i in range(data_img.size):
-                f.write(struct.pack('<h', data_img[i]))
+            write_data_array(f, data_img, '<h')
         elif header["Data type (1:short int, 2:float)"] == 2:
-            for i in range(data_img.size):
-                f.write(struct.pack('<f', data_img[i]))
+            write_data_array(f, data_img, '<f')
         else:
-            raise("Unrecognized VTC data_img type.")
+            raise ValueError("Unrecognized VTC data_img type.")
 
 
 def create_vtc(rearrange_data_axes=True):
@@ -308,3 +418,141 @@ def create_vtc(rearrange_data_axes=True):
     data = data.astype(np.short)  # NOTE: float vtc does not seem to work in BV
 
     return header, data
+
+
+def get_affine(header):
+    """Voxel to world (RAS+, mm) affine of VTC data with rearranged axes.
+
+    Parameters
+    ----------
+    header : dictionary
+        VTC header.
+
+    Returns
+    -------
+    affine : 2D numpy.array, [4, 4]
+        Affine of the data returned by `read_vtc(rearrange_data_axes=True)`.
+        World coordinates are centered in the 256^3 VMR framing cube.
+
+    """
+    res = header["VTC resolution relative to VMR (1, 2, or 3)"]
+    (DimZ, DimY, DimX, _), _ = _get_data_layout(header)
+
+    # NOTE: The rearranged axes are the flipped BV Z, X and Y axes
+    affine = np.eye(4)
+    affine[:3, :3] *= res
+    affine[0, 3] = 128 - header["ZStart"] - res * (DimZ - 1)
+    affine[1, 3] = 128 - header["XStart"] - res * (DimX - 1)
+    affine[2, 3] = 128 - header["YStart"] - res * (DimY - 1)
+    return affine
+
+
+def get_nifti_header(header):
+    """NIfTI-1 header of VTC data with rearranged axes.
+
+    Parameters
+    ----------
+    header : dictionary
+        VTC header.
+
+    Returns
+    -------
+    nii_header : dictionary
+        NIfTI-1 header of the data returned by
+        `read_vtc(rearrange_data_axes=True)`, with the affine of `get_affine`
+        and the TR, as used by `export_nifti`.
+
+    """
+    (DimZ, DimY, DimX, DimT), data_type = _get_data_layout(header)
+    affine = get_affine(header)
+    nii_header = create_nifti_header((DimZ, DimX, DimY, DimT), data_type,
+                                     affine)
+    nii_header["pixdim"][4] = header["TR (ms)"]
+    nii_header["xyzt_units"] = 2 | 16  # mm and ms
+    nii_header["descrip"] = b"bvbabel VTC export"
+
+    # NIfTI xform codes: 1 scanner, 2 aligned, 3 Talairach, 4 MNI
+    space = header[
+        "Reference space (0:unknown, 1:native, 2:ACPC, 3:Tal, 4:MNI)"]
+    nii_header["sform_code"] = space if space in (2, 3, 4) else 1
+    # NOTE: Affine has no rotation, qform is the identity quaternion
+    nii_header["qform_code"] = nii_header["sform_code"]
+    return nii_header
+
+
+# =============================================================================
+def export_nifti(vtc_path, nii_path, chunk_voxels=2**16):
+    """Export BrainVoyager VTC file to NIfTI-1 while keeping memory bounded.
+
+    Parameters
+    ----------
+    vtc_path : string
+        Path to (uncompressed) VTC file.
+    nii_path : string
+        Path to the output NIfTI-1 file. Paths ending with '.gz' are
+        exported uncompressed next to the output first and then compressed.
+    chunk_voxels : int
+        Number of voxel time courses held in memory at once. Peak memory is
+        about `chunk_voxels * Nr time points` values (at least one row of
+        voxels), independent of the size of the input.
+
+    Notes
+    -----
+    The exported data has the axes of `read_vtc(rearrange_data_axes=True)`
+    and the affine of `get_affine`. VTC data is stored voxel-major (time
+    fastest) whereas NIfTI stores volumes one after the other. Blocks of
+    whole rows or planes of the output are read from a memmap of the VTC,
+    transposed to time-first order and written to their place in each of the
+    output volumes.
+
+    """
+    if not can_memmap(vtc_path):
+        raise ValueError("Streaming export needs an uncompressed VTC path.")
+    if is_gzip_path(nii_path):
+        # NOTE: Export uncompressed first, then compress in a single stream
+        with tempfile.TemporaryDirectory(
+                dir=os.path.dirname(os.path.abspath(nii_path))) as tmp_dir:
+            tmp_path = os.path.join(tmp_dir, "export.nii")
+            export_nifti(vtc_path, tmp_path, chunk_voxels)
+            with open(tmp_path, 'rb') as f_in, create_file(nii_path) as f_out:
+                shutil.copyfileobj(f_in, f_out, 2**20)
+        return
+
+    header = read_vtc_header(vtc_path)
+    data_offset = header["Data offset"]
+    (DimZ, DimY, DimX, DimT), data_type = _get_data_layout(header)
+
+    # Rearranged (RAS+) view of the VTC data, nothing is read yet
+    data_img = np.memmap(vtc_path, dtype=data_type, mode='r',
+                         offset=data_offset, shape=(DimZ, DimY, DimX, DimT))
+    data_img = np.transpose(data_img, (0, 2, 1, 3))[::-1, ::-1, ::-1, :]
+    ni, nj, nk = DimZ, DimX, DimY
+    itemsize = np.dtype(data_type).itemsize
+    volume_size = ni * nj * nk * itemsize
+
+    # Chunks are whole planes along the 3rd axis, or rows within one plane
+    chunk_voxels = max(int(chunk_voxels), ni)
+    if chunk_voxels >= ni * nj:
+        nr_planes = chunk_voxels // (ni * nj)
+        chunks = [(k, min(k + nr_planes, nk), 0, nj)
+                  for k in range(0, nk, nr_planes)]
+    else:
+        nr_rows = chunk_voxels // ni
+        chunks = [(k, k + 1, j, min(j + nr_rows, nj))
+                  for k in range(nk) for j in range(0, nj, nr_rows)]
+
+    nii_header = get_nifti_header(header)
+    data_offset = int(nii_header["vox_offset"])
+    with open(nii_path, 'wb') as f:
+        write_nifti_header(f, nii_header)
+        f.truncate(data_offset + volume_size * DimT)
+        for k0, k1, j0, j1 in chunks:
+            # NOTE: One bounded copy, [time, k, j, i] order is contiguous
+            # per volume in the NIfTI file.
+            block = np.ascontiguousarray(
+                np.transpose(data_img[:, j0:j1, k0:k1, :], (3, 2, 1, 0)))
+            offset = data_offset + (k0 * nj + j0) * ni * itemsize
+            for t in range(DimT):
+                f.seek(offset + t * volume_size)
+                f.write(block[t].data)
+            del block
@@ -2,7 +2,6 @@
 
 import os
 import numpy as np
-import nibabel as nb
 import bvbabel
 
 FILE = "/home/faruk/Documents/test_bvbabel/fmr/nifti_converted.fmr"
@@ -16,8 +15,9 @@ basename = FILE.split(os.extsep, 1)[0]
 outname = "{}_bvbabel.nii.gz".format(basename)
 
 # Export nifti (assign an identity matrix as affine with default header)
-img = nb.Nifti1Image(data, affine=np.eye(4))
-nb.save(img, outname)
+nii_header = bvbabel.nifti.create_nifti_header(data.shape, data.dtype,
+                                               affine=np.eye(4))
+bvbabel.nifti.write_nifti(outname, nii_header, data)
 
 # -----------------------------------------------------------------------------
 # NOTE[Faruk]: I need to think about exporting nifti with a header that matches
@@ -25,8 +25,9 @@ nb.save(img, outname)
 
 # Export nifti (Pull affine matrix from fmr header)
 # affine = header["Transformation information"]["Transformation matrix"]
-# img = nb.Nifti1Image(data, affine=affine)
-# nb.save(img, outname)
+# nii_header = bvbabel.nifti.create_nifti_header(data.shape, data.dtype,
+#                                                affine=affine)
+# bvbabel.nifti.write_nifti(outname, nii_header, data)
 # -----------------------------------------------------------------------------
 
 print("Finished.")
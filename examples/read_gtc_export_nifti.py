@@ -2,7 +2,6 @@
 
 import os
 import numpy as np
-import nibabel as nb
 import bvbabel
 from pprint import pprint
 
@@ -18,7 +17,9 @@ pprint(header)
 # Export nifti
 basename = FILE.split(os.extsep, 1)[0]
 outname = "{}_bvbabel.nii.gz".format(basename)
-img = nb.Nifti1Image(data_img, affine=np.eye(4))
-nb.save(img, outname)
+nii_header = bvbabel.nifti.create_nifti_header(data_img.shape,
+                                               data_img.dtype,
+                                               affine=np.eye(4))
+bvbabel.nifti.write_nifti(outname, nii_header, data_img)
 
 print("Finished.")
@@ -24,4 +24,6 @@ setup(name='bvbabel',
       license='MIT',
       packages=['bvbabel'],
       install_requires=['numpy'],
+      entry_points={
+          'console_scripts': ['bvbabel-convert=bvbabel.convert:main']},
       zip_safe=False)
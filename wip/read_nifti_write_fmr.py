@@ -2,15 +2,12 @@
 
 import os
 import bvbabel
-import nibabel as nb
-import numpy as np
 
-FILE = "/home/faruk/Documents/test_bvbabel/nifti_to_fmr/BOLD_interp.nii.gz"
+FILE = "/home/faruk/Documents/test_bvbabel/nifti_to_fmr/BOLD_interp.nii"
 
 # =============================================================================
 # Load Nifti
-nii = nb.load(FILE)
-data = np.asarray(nii.dataobj)
+nii_header, data = bvbabel.nifti.read_nifti(FILE, mmap=True)
 
 # Create FMR
 
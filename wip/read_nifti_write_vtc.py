@@ -2,15 +2,12 @@
 
 import os
 import bvbabel
-import nibabel as nb
-import numpy as np
 
-FILE = "/home/faruk/Documents/test_bvbabel/vtc2/sub-02_task-unamb_acq-3dvaso_run-avg_BOLD_interp_5vol.nii.gz"
+FILE = "/home/faruk/Documents/test_bvbabel/vtc2/sub-02_task-unamb_acq-3dvaso_run-avg_BOLD_interp_5vol.nii"
 
 # =============================================================================
 # Load Nifti
-nii = nb.load(FILE)
-nii_data = np.asarray(nii.dataobj)
+nii_header, nii_data = bvbabel.nifti.read_nifti(FILE, mmap=True)
 dims = nii_data.shape
 
 # Create VTC
@@ -25,12 +22,11 @@ vtc_header["YEnd"] = dims[2]
 vtc_header["ZStart"] = 0
 vtc_header["ZEnd"] = dims[0]
 
-# Typecast when necessary and update the VTC header
-vtc_data = nii_data.astype(np.float32)
+# Update the VTC header (data is typecast while writing)
 vtc_header["Data type (1:short int, 2:float)"] = 2
 
-# Mirror dimensions when necessary
-vtc_data = vtc_data[::-1, :, :, :]
+# Mirror dimensions when necessary (a view of the memmap, nothing is copied)
+vtc_data = nii_data[::-1, :, :, :]
 
 # Save VTC
 basename = FILE.split(os.extsep, 1)[0]